@@ -0,0 +1,90 @@
+# This file is part of obs_base.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Compare per-detector and batched projection of detector corners onto the
+sky, as done when computing visit regions.
+
+Example::
+
+    python benchmarks/benchCornerProjection.py REPO INSTRUMENT
+
+The instrument's nominal camera is used (or, with no arguments, the small test
+camera from `lsst.afw.cameraGeom.testUtils`), with a simple TAN WCS attached to
+its first detector.  This reports the best time per exposure for each method
+and the largest separation between corresponding corners.
+"""
+
+import argparse
+import time
+
+import lsst.geom
+from lsst.afw.cameraGeom import FOCAL_PLANE, PIXELS
+from lsst.afw.geom import makeCdMatrix, makeSkyWcs
+
+from lsst.obs.base.defineVisits import _projectDetectorCorners, _projectDetectorCornersIndividually
+
+
+def makeCamera(repo, instrumentName):
+    """Return the camera to benchmark with."""
+    if repo is None:
+        from lsst.afw.cameraGeom.testUtils import CameraWrapper
+        return CameraWrapper(isLsstLike=True).camera
+    from lsst.daf.butler import Butler
+    from lsst.obs.base import Instrument
+    return Instrument.fromName(instrumentName, Butler(repo).registry).getCamera()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("repo", nargs="?", help="Butler repository with the instrument registered.")
+    parser.add_argument("instrument", nargs="?", help="Short name of the instrument.")
+    parser.add_argument("--padding", type=int, default=0, help="Padding of detector bounding boxes.")
+    parser.add_argument("--repeat", type=int, default=20, help="Number of timing passes.")
+    args = parser.parse_args()
+    if (args.repo is None) != (args.instrument is None):
+        parser.error("Give both a repository and an instrument, or neither.")
+
+    camera = makeCamera(args.repo, args.instrument)
+    wcsDetector = next(iter(camera))
+    wcs = makeSkyWcs(crpix=lsst.geom.Box2D(wcsDetector.getBBox()).getCenter(),
+                     crval=lsst.geom.SpherePoint(30.0, -45.0, lsst.geom.degrees),
+                     cdMatrix=makeCdMatrix(scale=0.2*lsst.geom.arcseconds))
+    fpToSky = wcsDetector.getTransform(FOCAL_PLANE, PIXELS).then(wcs.getTransform())
+
+    results = {}
+    for name, func in (("per-detector", _projectDetectorCornersIndividually),
+                       ("batched", _projectDetectorCorners)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            results[name] = func(camera, fpToSky, args.padding)
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:>12}: {1e3*best:10.2f} ms/exposure ({len(camera)} detectors)")
+
+    maxSeparation = max((a - b).getNorm()
+                        for detectorId, bounds in results["per-detector"].items()
+                        for a, b in zip(bounds, results["batched"][detectorId]))
+    print(f"Largest corner separation: {maxSeparation*206264.806e6:.3g} micro-arcseconds")
+
+
+if __name__ == "__main__":
+    main()
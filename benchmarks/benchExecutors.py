@@ -0,0 +1,65 @@
+# This file is part of obs_base.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare executor backends for the read-only stages of raw ingest.
+
+Example::
+
+    python benchmarks/benchExecutors.py REPO /path/to/raws/*.fits --processes 8
+
+For each backend this runs `RawIngestTask.prep` (metadata extraction,
+grouping and data ID expansion) over the given files, which only reads from
+the repository, and reports the wall-clock time and files/sec.  Pool start-up
+is included, since that is what dominates for small ingests.
+"""
+
+import argparse
+import time
+
+from lsst.daf.butler import Butler
+
+from lsst.obs.base import RawIngestTask
+from lsst.obs.base.workerPool import EXECUTORS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("repo", help="Butler repository with the instrument registered.")
+    parser.add_argument("files", nargs="+", help="Raw files to read.")
+    parser.add_argument("--processes", type=int, default=4, help="Number of workers.")
+    parser.add_argument("--executors", nargs="+", default=list(EXECUTORS), choices=list(EXECUTORS),
+                        help="Backends to compare.")
+    args = parser.parse_args()
+
+    butler = Butler(args.repo)
+    config = RawIngestTask.ConfigClass()
+    for executor in args.executors:
+        task = RawIngestTask(config=config, butler=butler)
+        start = time.perf_counter()
+        exposures, bad = task.prep(args.files, processes=args.processes, executor=executor)
+        nExposures = len(list(exposures))
+        elapsed = time.perf_counter() - start
+        print(f"{executor:>10}: {len(args.files)/elapsed:10.1f} files/s ({elapsed:.3f} s, "
+              f"{nExposures} exposures, {len(bad)} bad files)")
+
+
+if __name__ == "__main__":
+    main()
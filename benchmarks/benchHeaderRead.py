@@ -0,0 +1,71 @@
+# This file is part of obs_base.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare the throughput of the afw and header-only raw header readers.
+
+Example::
+
+    python benchmarks/benchHeaderRead.py /path/to/raws/*.fits.fz
+
+Each reader is run over all files ``--repeat`` times and the best files/sec
+is reported, so the numbers reflect warm-cache parsing cost rather than disk
+speed.  Run on a cold cache (e.g. after dropping the page cache) to include
+I/O.
+"""
+
+import argparse
+import time
+
+from astro_metadata_translator import merge_headers
+from lsst.afw.fits import readMetadata
+
+from lsst.obs.base.fitsHeaders import readRawHeader
+
+
+def readAfw(filename):
+    return merge_headers([readMetadata(filename, 0), readMetadata(filename)], mode="overwrite")
+
+
+READERS = {
+    "afw": readAfw,
+    "header-only": readRawHeader,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="+", help="FITS files to read.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of passes per reader.")
+    args = parser.parse_args()
+
+    for name, reader in READERS.items():
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for filename in args.files:
+                reader(filename)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{name:>12}: {len(args.files)/best:10.1f} files/s ({best:.3f} s for {len(args.files)} files)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# This file is part of obs_base.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare cold-cache header read rates for random and locality-aware file
+orders.
+
+Example::
+
+    python benchmarks/benchLocality.py /path/to/raws/*.fits --repeat 3
+
+Before each pass every file is evicted from the page cache with
+``posix_fadvise(POSIX_FADV_DONTNEED)`` (which does not need root, but only
+works on local filesystems), so the reads go to disk.  Each pass reads the
+primary and first data headers of every file with
+`lsst.obs.base.fitsHeaders.readRawHeader`; ``--full`` reads whole files
+instead, approximating a copy.
+"""
+
+import argparse
+import os
+import random
+import time
+
+from lsst.obs.base.fileOrdering import orderByLocality
+from lsst.obs.base.fitsHeaders import readRawHeader
+
+
+def evict(files):
+    """Drop the given files from the page cache.
+    """
+    for filename in files:
+        fd = os.open(filename, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def readAll(files, full):
+    """Read every file in order, returning the elapsed time.
+    """
+    start = time.perf_counter()
+    for filename in files:
+        if full:
+            with open(filename, "rb") as stream:
+                while stream.read(1 << 20):
+                    pass
+        else:
+            readRawHeader(filename)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="+", help="Raw files to read.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of passes per order.")
+    parser.add_argument("--full", action="store_true", help="Read whole files rather than headers.")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the random order.")
+    args = parser.parse_args()
+
+    shuffled = list(args.files)
+    random.Random(args.seed).shuffle(shuffled)
+    orders = {"random": shuffled, "locality": orderByLocality(args.files)}
+    for name, files in orders.items():
+        times = []
+        for _ in range(args.repeat):
+            evict(files)
+            times.append(readAll(files, args.full))
+        best = min(times)
+        print(f"{name:>10}: {len(files)/best:10.1f} files/s (best of {args.repeat}: {best:.3f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# This file is part of obs_base.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare raw ingest throughput for each transfer mode.
+
+Example::
+
+    python benchmarks/benchTransfer.py REPO /path/to/raws/*.fits \
+        --staging-dir REPO/staging --threads 1 4 16
+
+For every choice of the ``transfer`` field created by
+`lsst.obs.base.makeTransferChoiceField` (except "move", which would consume
+the input files), this ingests the given files into a new RUN collection and
+reports files/sec and bytes/sec.  If ``--staging-dir`` is given, "copy" is
+also run with staging, once for each ``--threads`` value of
+``transferThreads``.  The repository must already have the instrument
+registered; each measurement writes new datasets, so use a scratch
+repository.
+"""
+
+import argparse
+import time
+import uuid
+
+from lsst.daf.butler import Butler
+
+from lsst.obs.base import RawIngestTask
+from lsst.obs.base.ingest import makeTransferChoiceField
+
+
+def runOnce(butler, files, label, **overrides):
+    """Ingest the files once with the given config overrides and print the
+    throughput.
+    """
+    config = RawIngestTask.ConfigClass()
+    config.update(**overrides)
+    task = RawIngestTask(config=config, butler=butler)
+    run = f"bench/transfer/{label}/{uuid.uuid4().hex[:8]}"
+    start = time.perf_counter()
+    try:
+        refs = task.run(files, run=run)
+    except Exception as e:
+        print(f"{label:>24}: failed ({e})")
+        return
+    elapsed = time.perf_counter() - start
+    stats = task.statistics.stages
+    nbytes = sum(stats[name].bytes for name in ("ingest", "stage") if name in stats)
+    print(f"{label:>24}: {len(files)/elapsed:10.1f} files/s, {nbytes/elapsed/1e6:10.1f} MB/s "
+          f"({elapsed:.3f} s, {len(refs)} datasets)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("repo", help="Scratch Butler repository with the instrument registered.")
+    parser.add_argument("files", nargs="+", help="Raw files to ingest.")
+    parser.add_argument("--staging-dir", default=None,
+                        help="Staging directory on the datastore's filesystem, to also test staged copies.")
+    parser.add_argument("--threads", nargs="+", type=int, default=[1, 4],
+                        help="transferThreads values to test staged copies with.")
+    args = parser.parse_args()
+
+    butler = Butler(args.repo, writeable=True)
+    choices = [t for t in makeTransferChoiceField().allowed if t != "move"]
+    for transfer in choices:
+        runOnce(butler, args.files, transfer, transfer=transfer)
+    if args.staging_dir is not None:
+        for threads in args.threads:
+            runOnce(butler, args.files, f"copy+staging/{threads}", transfer="copy",
+                    stagingDirectory=args.staging_dir, transferThreads=threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# This file is part of obs_base.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Measure the cost of returning extracted metadata from worker processes.
+
+Example::
+
+    python benchmarks/benchTransport.py REPO /path/to/raws/*.fits
+
+Metadata is extracted from the given files once, serially.  Then, for both the
+full `RawFileData` form and the compact form used when
+``RawIngestConfig.compactTransport`` is set, this reports the pickled size
+per file, and the time to pickle in a worker plus unpickle (and, for the
+compact form, reconstruct) in the parent.
+"""
+
+import argparse
+import pickle
+import time
+
+from lsst.daf.butler import Butler
+
+from lsst.obs.base import RawIngestTask
+from lsst.obs.base.ingest import _CompactRawFileData
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("repo", help="Butler repository with the instrument registered.")
+    parser.add_argument("files", nargs="+", help="Raw files to read.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timing passes.")
+    args = parser.parse_args()
+
+    task = RawIngestTask(config=RawIngestTask.ConfigClass(), butler=Butler(args.repo))
+    full = [task.extractMetadata(f) for f in args.files]
+    compact = [_CompactRawFileData(data) for data in full]
+
+    def roundTripFull():
+        return [pickle.loads(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)) for data in full]
+
+    def roundTripCompact():
+        return list(task._expandCompactMetadata(
+            pickle.loads(pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)) for item in compact
+        ))
+
+    nFiles = len(args.files)
+    for name, items, func in (("full", full, roundTripFull), ("compact", compact, roundTripCompact)):
+        size = sum(len(pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)) for item in items)
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:>8}: {size/nFiles:10.0f} bytes/file, {1e6*best/nFiles:10.1f} us/file round trip")
+
+
+if __name__ == "__main__":
+    main()
@@ -30,5 +30,8 @@ from .makeRawVisitInfo import *
 from .makeRawVisitInfoViaObsInfo import *
 from ._fitsRawFormatterBase import *
 from .utils import *
+from .fitsHeaders import *
+from .ingestStatistics import *
+from .workerPool import *
 from .ingest import *
 from .defineVisits import *
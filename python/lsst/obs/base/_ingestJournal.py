@@ -0,0 +1,214 @@
+# This file is part of obs_base.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from __future__ import annotations
+
+__all__ = ("IngestJournal", "JOURNAL_STATUSES")
+
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+JOURNAL_STATUSES = ("extracted", "transferred", "committed", "failed")
+"""Statuses recorded for each file, in the order they are reached
+(`tuple` [`str`]).
+
+"extracted" files have had their metadata read and been grouped into an
+exposure; "transferred" files have been handed to the butler, but the
+transaction that registers them had not been seen to finish when they were
+recorded; "committed" files have been ingested; "failed" files could not be
+ingested, for the recorded reason.
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_journal (
+    path TEXT PRIMARY KEY,
+    exposure TEXT,
+    status TEXT NOT NULL,
+    reason TEXT,
+    updated REAL NOT NULL
+)
+"""
+
+
+class IngestJournal:
+    """A durable record of the progress of a raw ingest, used to resume it
+    after a crash or to retry only the files that failed.
+
+    Parameters
+    ----------
+    filename : `str`
+        Path to the SQLite file holding the journal.  Created if it does not
+        exist.
+
+    Notes
+    -----
+    Entries are keyed by absolute path, and each call to `record` is
+    committed immediately, so the journal reflects everything that happened
+    up to a crash.  The journal is separate from the data repository, so
+    statuses are recorded outside its transactions: a file is "transferred"
+    just before the transaction that ingests it begins, and "committed" once
+    that transaction has finished.  Files left "extracted" by an interrupted
+    run were never ingested and are simply ingested again, while files left
+    "transferred" may or may not have been, so the repository must be checked
+    before they are retried.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._connection = sqlite3.connect(filename)
+        with self._connection:
+            self._connection.execute(_SCHEMA)
+
+    def __enter__(self) -> IngestJournal:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the journal.
+        """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def record(self, filenames: Iterable[str], status: str, *, exposure: Optional[str] = None,
+               reason: Optional[str] = None) -> None:
+        """Record a new status for some files.
+
+        Parameters
+        ----------
+        filenames : iterable of `str`
+            Paths to the files.
+        status : `str`
+            New status; one of `JOURNAL_STATUSES`.
+        exposure : `str`, optional
+            Human-readable identifier of the exposure the files belong to.
+            If `None`, any exposure already recorded is kept.
+        reason : `str`, optional
+            Why the files failed, for the "failed" status.
+
+        Raises
+        ------
+        ValueError
+            Raised if ``status`` is not recognized.
+        """
+        if status not in JOURNAL_STATUSES:
+            raise ValueError(f"Unrecognized ingest journal status {status!r}; "
+                             f"expected one of {JOURNAL_STATUSES}.")
+        now = time.time()
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO ingest_journal (path, exposure, status, reason, updated) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (path) DO UPDATE SET exposure = COALESCE(excluded.exposure, exposure), "
+                "status = excluded.status, reason = excluded.reason, updated = excluded.updated",
+                [(os.path.abspath(filename), exposure, status, reason, now) for filename in filenames],
+            )
+
+    def getStatus(self, filename: str) -> Optional[Tuple[str, Optional[str]]]:
+        """Return the recorded status of a file.
+
+        Parameters
+        ----------
+        filename : `str`
+            Path to the file.
+
+        Returns
+        -------
+        status : `tuple` [`str`, `str` or `None`] or `None`
+            The status and failure reason, or `None` if the file has never
+            been recorded.
+        """
+        row = self._connection.execute(
+            "SELECT status, reason FROM ingest_journal WHERE path = ?", (os.path.abspath(filename),)
+        ).fetchone()
+        return None if row is None else tuple(row)
+
+    def filterFiles(self, files: Iterable[str], *, retryFailedOnly: bool = False) -> List[str]:
+        """Drop files that do not need to be ingested again.
+
+        Parameters
+        ----------
+        files : iterable of `str`
+            Paths to the files that were asked to be ingested.
+        retryFailedOnly : `bool`, optional
+            If `True`, keep only files recorded as "failed".  If `False`,
+            keep every file not recorded as "committed".
+
+        Returns
+        -------
+        remaining : `list` of `str`
+            The files to ingest, in their original order.
+        """
+        statuses = dict(self._connection.execute("SELECT path, status FROM ingest_journal"))
+        if retryFailedOnly:
+            return [f for f in files if statuses.get(os.path.abspath(f)) == "failed"]
+        return [f for f in files if statuses.get(os.path.abspath(f)) != "committed"]
+
+    def selectFiles(self, files: Iterable[str], status: str) -> List[str]:
+        """Return the files recorded with a given status.
+
+        Parameters
+        ----------
+        files : iterable of `str`
+            Paths to the files to consider.
+        status : `str`
+            Status to select; one of `JOURNAL_STATUSES`.
+
+        Returns
+        -------
+        selected : `list` of `str`
+            Those of ``files`` recorded with ``status``, in their original
+            order.
+        """
+        paths = {row[0] for row in self._connection.execute(
+            "SELECT path FROM ingest_journal WHERE status = ?", (status,)
+        )}
+        return [f for f in files if os.path.abspath(f) in paths]
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of files with each status.
+
+        Returns
+        -------
+        counts : `dict` [`str`, `int`]
+            Number of files recorded with each of `JOURNAL_STATUSES`.
+        """
+        result = dict.fromkeys(JOURNAL_STATUSES, 0)
+        result.update(self._connection.execute("SELECT status, COUNT(*) FROM ingest_journal GROUP BY status"))
+        return result
+
+    def failures(self) -> List[Tuple[str, Optional[str], Optional[str]]]:
+        """Return the files that failed.
+
+        Returns
+        -------
+        failures : `list` [`tuple` [`str`, `str` or `None`, `str` or `None`]]
+            Absolute path, exposure and reason for each failed file, sorted
+            by path.
+        """
+        return [tuple(row) for row in self._connection.execute(
+            "SELECT path, exposure, reason FROM ingest_journal WHERE status = 'failed' ORDER BY path"
+        )]
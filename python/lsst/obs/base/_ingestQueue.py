@@ -0,0 +1,264 @@
+# This file is part of obs_base.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from __future__ import annotations
+
+__all__ = ("IngestWorkQueue", "shardOf")
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import time
+import zlib
+from typing import Any, Iterable, List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS work_queue (
+    path TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'pending',
+    claimed_by INTEGER,
+    claimed_at REAL,
+    exposure TEXT,
+    data BLOB
+);
+CREATE TABLE IF NOT EXISTS shards (
+    shard INTEGER PRIMARY KEY,
+    n_shards INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL
+);
+"""
+
+
+def shardOf(exposure: str, nShards: int) -> int:
+    """Return the shard responsible for ingesting an exposure.
+
+    Parameters
+    ----------
+    exposure : `str`
+        Identifier of the exposure, of the form "instrument:exposure_id".
+    nShards : `int`
+        Total number of shards.
+
+    Returns
+    -------
+    shard : `int`
+        Index of the shard, in ``[0, nShards)``.  The same on every host and
+        Python process, unlike `hash`.
+    """
+    return zlib.crc32(exposure.encode()) % nShards
+
+
+class IngestWorkQueue:
+    """A work queue, held in a SQLite file, that lets several independent
+    ingest processes share the work of ingesting one set of files.
+
+    Parameters
+    ----------
+    filename : `str`
+        Path to the SQLite file holding the queue, on a filesystem all
+        processes can see and that supports POSIX locks.  Created if it does
+        not exist.
+    timeout : `float`, optional
+        Seconds to wait for another process to release a lock on the queue.
+
+    Notes
+    -----
+    Every process must `register` the same list of files.  Files are then
+    claimed a few at a time by whichever process asks next, and their
+    extracted metadata (pickled ``RawFileData``) is written back along with
+    the exposure the file belongs to.  Once every process has registered and
+    every file has been extracted, each process ingests the exposures that
+    `shardOf` assigns to it, so no exposure is ever split between processes
+    and no two processes register the same exposure.  Files that could not
+    be read are reported by the process that tried to read them.
+
+    Waiting for every process to register is what makes this safe: a
+    process that finds nothing left to extract before the others have added
+    their files could otherwise load its shard while files belonging to it
+    are still missing from the queue.
+    """
+
+    def __init__(self, filename: str, *, timeout: float = 600.0):
+        self.filename = filename
+        # Transactions are managed explicitly, so claims can take the write
+        # lock before reading.
+        self._connection = sqlite3.connect(filename, timeout=timeout, isolation_level=None)
+        self._connection.create_function(
+            "shard_of", 2, lambda exposure, nShards: None if exposure is None else shardOf(exposure, nShards)
+        )
+        self._connection.executescript(_SCHEMA)
+
+    def __enter__(self) -> IngestWorkQueue:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the queue.
+        """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def register(self, shard: int, nShards: int, files: Iterable[str]) -> None:
+        """Add files to the queue on behalf of a process, and record that it
+        has done so.
+
+        Parameters
+        ----------
+        shard : `int`
+            Index of the process, in ``[0, nShards)``.
+        nShards : `int`
+            Total number of processes.
+        files : iterable of `str`
+            Paths to the files to ingest.  Must be the same, up to order and
+            duplicates, for every process sharing the queue.
+
+        Raises
+        ------
+        ValueError
+            Raised if another process has registered a different list of
+            files.
+        """
+        paths = sorted({os.path.abspath(f) for f in files})
+        fingerprint = hashlib.sha256("\n".join(paths).encode()).hexdigest()
+        with self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            for other, in self._connection.execute(
+                "SELECT shard FROM shards WHERE fingerprint != ? AND shard != ?", (fingerprint, shard)
+            ):
+                raise ValueError(f"Shard {shard} was given different files from shard {other} in "
+                                 f"{self.filename}; every shard must be given the same files.")
+            self._connection.executemany("INSERT OR IGNORE INTO work_queue (path) VALUES (?)",
+                                         [(path,) for path in paths])
+            self._connection.execute("INSERT OR REPLACE INTO shards (shard, n_shards, fingerprint) "
+                                     "VALUES (?, ?, ?)", (shard, nShards, fingerprint))
+
+    def countUnregistered(self, nShards: int) -> int:
+        """Return the number of processes that have yet to `register`.
+
+        Parameters
+        ----------
+        nShards : `int`
+            Total number of processes.
+        """
+        nRegistered, = self._connection.execute(
+            "SELECT COUNT(*) FROM shards WHERE n_shards = ? AND shard < ?", (nShards, nShards)
+        ).fetchone()
+        return nShards - nRegistered
+
+    def claim(self, shard: int, n: int, staleAfter: Optional[float] = None) -> List[str]:
+        """Claim files whose metadata has yet to be extracted.
+
+        Parameters
+        ----------
+        shard : `int`
+            Index of the claiming process.
+        n : `int`
+            Maximum number of files to claim.
+        staleAfter : `float`, optional
+            If not `None`, also claim files that another process claimed more
+            than this many seconds ago without storing their metadata, on the
+            assumption that it has died.
+
+        Returns
+        -------
+        paths : `list` of `str`
+            Absolute paths of the claimed files; empty if there is nothing
+            left to claim.
+        """
+        now = time.time()
+        staleBefore = -1.0 if staleAfter is None else now - staleAfter
+        with self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            paths = [row[0] for row in self._connection.execute(
+                "SELECT path FROM work_queue "
+                "WHERE status = 'pending' OR (status = 'claimed' AND claimed_at < ?) "
+                "ORDER BY rowid LIMIT ?", (staleBefore, n)
+            )]
+            self._connection.executemany(
+                "UPDATE work_queue SET status = 'claimed', claimed_by = ?, claimed_at = ? WHERE path = ?",
+                [(shard, now, path) for path in paths],
+            )
+        return paths
+
+    def store(self, shard: int, fileData: Iterable[Any]) -> None:
+        """Store the metadata extracted from claimed files.
+
+        Parameters
+        ----------
+        shard : `int`
+            Index of the process that extracted the metadata.
+        fileData : iterable of `RawFileData`
+            Extracted metadata, including entries with no datasets for files
+            that could not be read.
+        """
+        rows = []
+        for data in fileData:
+            exposure = None
+            if data.datasets:
+                dataId = data.datasets[0].dataId
+                exposure = f"{dataId['instrument']}:{dataId['exposure']}"
+            rows.append((shard, exposure, pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL),
+                         os.path.abspath(data.filename)))
+        with self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._connection.executemany(
+                "UPDATE work_queue SET status = 'extracted', claimed_by = ?, exposure = ?, data = ? "
+                "WHERE path = ?", rows
+            )
+
+    def countRemaining(self) -> int:
+        """Return the number of files whose metadata has yet to be stored.
+        """
+        return self._connection.execute(
+            "SELECT COUNT(*) FROM work_queue WHERE status != 'extracted'"
+        ).fetchone()[0]
+
+    def loadShard(self, shard: int, nShards: int) -> List[Any]:
+        """Return the metadata of the files a process should ingest.
+
+        Parameters
+        ----------
+        shard : `int`
+            Index of the process, in ``[0, nShards)``.
+        nShards : `int`
+            Total number of processes.
+
+        Returns
+        -------
+        fileData : `list` of `RawFileData`
+            Metadata for all files of the exposures assigned to ``shard`` by
+            `shardOf`, and for the files ``shard`` failed to read.
+
+        Notes
+        -----
+        Only complete once `countUnregistered` and `countRemaining` are both
+        zero.
+        """
+        return [pickle.loads(row[0]) for row in self._connection.execute(
+            "SELECT data FROM work_queue WHERE status = 'extracted' AND "
+            "(shard_of(exposure, ?) = ? OR (exposure IS NULL AND claimed_by = ?)) ORDER BY rowid",
+            (nShards, shard, shard)
+        )]
@@ -0,0 +1,232 @@
+# This file is part of obs_base.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+__all__ = ("RawMetadataCache",)
+
+import hashlib
+import os
+import pickle
+import sqlite3
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS raw_metadata (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    context TEXT NOT NULL,
+    data BLOB NOT NULL
+)
+"""
+
+_Key = Tuple[int, int, str]
+
+
+class RawMetadataCache:
+    """An on-disk cache of the metadata extracted from raw files, used to
+    avoid re-reading headers when an ingest is rerun.
+
+    Parameters
+    ----------
+    filename : `str`
+        Path to the SQLite file holding the cache.  Created if it does not
+        exist.
+    useHash : `bool`, optional
+        If `True`, also require the SHA-256 hash of a file's content to match
+        before a cached entry is used.  This guards against files being
+        rewritten in place without changing size or modification time, at the
+        cost of reading every file in full.
+    commitInterval : `int`, optional
+        Number of new entries to accumulate before committing them.
+    context : `str`, optional
+        Description of everything other than the file itself that the cached
+        metadata depends on, such as the versions of the metadata translators
+        and the configuration used to extract it.  Entries written with a
+        different context are treated as misses, and replaced when the file
+        is read again.
+
+    Notes
+    -----
+    Entries are keyed by absolute path and validated against the file's size
+    and modification time (and optionally its hash) and the context.  Values
+    are pickled ``RawFileData`` instances, so entries written by an
+    incompatible version of the code are also silently treated as misses.
+    Cache files written before the context was recorded are emptied.
+    """
+
+    def __init__(self, filename: str, *, useHash: bool = False, commitInterval: int = 100,
+                 context: str = ""):
+        self.filename = filename
+        self.useHash = useHash
+        self.context = context
+        self._commitInterval = commitInterval
+        self._nUncommitted = 0
+        self._keys: Dict[str, _Key] = {}
+        self._connection = sqlite3.connect(filename)
+        with self._connection:
+            columns = {row[1] for row in self._connection.execute("PRAGMA table_info(raw_metadata)")}
+            if columns and "context" not in columns:
+                self._connection.execute("DROP TABLE raw_metadata")
+            self._connection.execute(_SCHEMA)
+
+    def __enter__(self) -> RawMetadataCache:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Commit any outstanding entries and close the database.
+        """
+        if self._connection is not None:
+            self._connection.commit()
+            self._connection.close()
+            self._connection = None
+
+    def _makeKey(self, path: str) -> _Key:
+        """Compute the size, modification time and (optional) hash used to
+        validate entries for the given absolute path.
+        """
+        key = self._keys.get(path)
+        if key is None:
+            stat = os.stat(path)
+            digest = ""
+            if self.useHash:
+                sha = hashlib.sha256()
+                with open(path, "rb") as stream:
+                    for chunk in iter(lambda: stream.read(1 << 20), b""):
+                        sha.update(chunk)
+                digest = sha.hexdigest()
+            key = (stat.st_size, stat.st_mtime_ns, digest)
+            self._keys[path] = key
+        return key
+
+    def get(self, filename: str) -> Optional[Any]:
+        """Return the cached metadata for a file.
+
+        Parameters
+        ----------
+        filename : `str`
+            Path to the file.
+
+        Returns
+        -------
+        data : `RawFileData` or `None`
+            The cached metadata, or `None` if there is no entry or the file has
+            changed since it was written.
+        """
+        path = os.path.abspath(filename)
+        try:
+            key = self._makeKey(path)
+        except OSError:
+            return None
+        row = self._connection.execute(
+            "SELECT size, mtime_ns, hash, context, data FROM raw_metadata WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None or tuple(row[:3]) != key or row[3] != self.context:
+            return None
+        try:
+            data = pickle.loads(row[4])
+        except Exception:
+            return None
+        del self._keys[path]
+        # The cached filename may have been relative to a different directory.
+        data.filename = filename
+        return data
+
+    def put(self, data: Any) -> None:
+        """Add or replace the cached metadata for a file.
+
+        Parameters
+        ----------
+        data : `RawFileData`
+            Metadata extracted from a file.  Entries with no datasets (i.e.
+            failed extractions) are not cached, so they are retried next time.
+        """
+        if not data.datasets:
+            return
+        path = os.path.abspath(data.filename)
+        try:
+            key = self._makeKey(path)
+        except OSError:
+            return
+        finally:
+            # Keys are only remembered between a miss and the matching put.
+            self._keys.pop(path, None)
+        self._connection.execute(
+            "INSERT OR REPLACE INTO raw_metadata (path, size, mtime_ns, hash, context, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (path, *key, self.context, pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)),
+        )
+        self._nUncommitted += 1
+        if self._nUncommitted >= self._commitInterval:
+            self._connection.commit()
+            self._nUncommitted = 0
+
+    def partition(self, files: Iterable[str]) -> Tuple[List[Any], List[str]]:
+        """Split files into those with valid cache entries and those that
+        must be read.
+
+        Parameters
+        ----------
+        files : iterable of `str`
+            Paths to raw files.
+
+        Returns
+        -------
+        cached : `list` of `RawFileData`
+            Metadata for files with valid cache entries.
+        missing : `list` of `str`
+            Files with no valid cache entry.
+        """
+        cached = []
+        missing = []
+        for filename in files:
+            data = self.get(filename)
+            if data is None:
+                missing.append(filename)
+            else:
+                cached.append(data)
+        return cached, missing
+
+    def storeAll(self, fileData: Iterable[Any]) -> Iterator[Any]:
+        """Cache each element of an iterable of metadata as it is consumed,
+        closing the cache once it is exhausted.
+
+        Parameters
+        ----------
+        fileData : iterable of `RawFileData`
+            Newly-extracted metadata.
+
+        Yields
+        ------
+        data : `RawFileData`
+            The elements of ``fileData``, unchanged.
+        """
+        try:
+            for data in fileData:
+                self.put(data)
+                yield data
+        finally:
+            self.close()
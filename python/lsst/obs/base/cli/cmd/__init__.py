@@ -19,6 +19,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-__all__ = ["convert", "define_visits", "ingest_raws", "register_instrument", "write_curated_calibrations"]
+__all__ = ["convert", "define_visits", "ingest_raws", "register_instrument", "watch_raws",
+           "write_curated_calibrations"]
 
-from .commands import convert, define_visits, ingest_raws, register_instrument, write_curated_calibrations
+from .commands import (convert, define_visits, ingest_raws, register_instrument, watch_raws,
+                       write_curated_calibrations)
@@ -36,7 +36,7 @@ from lsst.daf.butler.cli.utils import (
     split_commas,
     typeStrAcceptsMultiple
 )
-from ..opt import instrument_argument
+from ..opt import executor_option, instrument_argument
 from ... import script
 
 
@@ -63,6 +63,7 @@ fits_re = r"\.fit[s]?\b"
                     "be used."))
 @transfer_option(help="Mode to use to transfer files into the new repository.")
 @processes_option()
+@executor_option()
 @config_file_option(help="Path to a `ConvertRepoConfig` override to be included after the Instrument config "
                     "overrides are applied.")
 @options_file_option()
@@ -88,6 +89,7 @@ def convert(*args, **kwargs):
               callback=split_commas,
               metavar=typeStrAcceptsMultiple)
 @processes_option()
+@executor_option()
 @options_file_option()
 def define_visits(*args, **kwargs):
     """Define visits from exposures in the butler registry."""
@@ -96,8 +98,9 @@ def define_visits(*args, **kwargs):
 
 @click.command(short_help="Ingest raw frames.", cls=ButlerCommand)
 @repo_argument(required=True)
-@locations_argument(help="LOCATIONS specifies files to ingest and/or locations to search for files.",
-                    required=True)
+@locations_argument(help="LOCATIONS specifies files to ingest and/or locations to search for files. "
+                         "Required unless --manifest is given.",
+                    required=False)
 @regex_option(default=fits_re,
               help="Regex string used to find files in directories listed in LOCATIONS. "
                    "Searches for fits files by default.")
@@ -106,14 +109,67 @@ def define_visits(*args, **kwargs):
 @run_option(required=False)
 @transfer_option()
 @processes_option()
+@executor_option()
 @click.option("--ingest-task", default="lsst.obs.base.RawIngestTask", help="The fully qualified class name "
               "of the ingest task to use.")
+@click.option("--manifest", type=click.Path(exists=True, file_okay=True, dir_okay=False),
+              help="A JSON, CSV or Parquet manifest of files and their metadata to ingest instead of "
+                   "LOCATIONS.  Headers are not read, so this is much faster.  Cannot be combined "
+                   "with --processes.")
+@click.option("--dry-run", "--benchmark", "dry_run", is_flag=True,
+              help="Read metadata, group files into exposures and expand their data IDs, then report the "
+                   "throughput of each step without writing anything to the repository.")
+@click.option("--scratch-dir", type=click.Path(file_okay=False),
+              help="With --dry-run, also time copying the files of each exposure into this directory. "
+                   "The copies are deleted immediately.")
+@click.option("--shard-queue", type=click.Path(dir_okay=False),
+              help="Cooperate with other ingest-raws invocations given the same LOCATIONS and this work "
+                   "queue file (created if needed, on a filesystem all of them can see), each ingesting "
+                   "the whole exposures assigned to its --shard.")
+@click.option("--shard", type=click.IntRange(min=0), default=0,
+              help="Index of this invocation, from 0 to --num-shards - 1.  Ignored unless --shard-queue "
+                   "is given.")
+@click.option("--num-shards", type=click.IntRange(min=1), default=1,
+              help="Total number of invocations sharing --shard-queue.  Each waits for all of them to "
+                   "start before ingesting.")
 @options_file_option()
 def ingest_raws(*args, **kwargs):
     """Ingest raw frames into from a directory into the butler registry"""
     script.ingestRaws(*args, **kwargs)
 
 
+@click.command(short_help="Watch directories and ingest raw frames as they appear.", cls=ButlerCommand)
+@repo_argument(required=True)
+@locations_argument(help="LOCATIONS specifies directories to watch (recursively) for new files.",
+                    required=True)
+@regex_option(default=fits_re,
+              help="Regex string used to select files to ingest. Selects fits files by default.")
+@config_option(metavar="TEXT=TEXT", multiple=True)
+@config_file_option(type=click.Path(exists=True, writable=False, file_okay=True, dir_okay=False))
+@run_option(required=False)
+@transfer_option()
+@click.option("--ingest-task", default="lsst.obs.base.RawIngestTask", help="The fully qualified class name "
+              "of the ingest task to use.")
+@click.option("--poll-interval", type=float, default=1.0, show_default=True,
+              help="Seconds between checks for new files.")
+@click.option("--settle-time", type=float, default=0.5, show_default=True,
+              help="Seconds a file must be unchanged before it is ingested, when polling.")
+@click.option("--batch-size", type=int, default=50, show_default=True,
+              help="Maximum number of files to ingest at once.")
+@click.option("--inotify/--no-inotify", default=True, show_default=True,
+              help="Use inotify notifications instead of polling, if the inotify_simple package is "
+                   "available.")
+@click.option("--ingest-existing/--no-ingest-existing", default=True, show_default=True,
+              help="Also ingest files already present when watching starts.")
+@click.option("--duration", type=float, default=None,
+              help="Stop after this many seconds instead of running until interrupted.")
+@options_file_option()
+def watch_raws(*args, **kwargs):
+    """Watch directories and ingest raw frames into the butler registry as
+    they appear, keeping the ingest task warm between batches."""
+    script.watchRaws(*args, **kwargs)
+
+
 @click.command(short_help="Add an instrument to the repository", cls=ButlerCommand)
 @repo_argument(required=True)
 @instrument_argument(required=True, nargs=-1, help="The fully-qualified name of an Instrument subclass.")
@@ -19,8 +19,19 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import click
+
 from lsst.daf.butler.cli.utils import MWOptionDecorator
 
+from ...workerPool import EXECUTORS
+
 
 instrument_option = MWOptionDecorator("--instrument",
                                       help="The name or fully-qualified class name of an instrument.")
+
+executor_option = MWOptionDecorator("--executor",
+                                    type=click.Choice(list(EXECUTORS)),
+                                    default="processes",
+                                    show_default=True,
+                                    help="How to parallelize work when --processes is greater than one: "
+                                         + "; ".join(f"'{k}' to {v}" for k, v in EXECUTORS.items()) + ".")
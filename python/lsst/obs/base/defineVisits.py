@@ -33,9 +33,12 @@ from abc import ABCMeta, abstractmethod
 from collections import defaultdict
 import itertools
 import dataclasses
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
 from multiprocessing import Pool
 
+import numpy as np
+
 from lsst.daf.butler import (
     Butler,
     DataCoordinate,
@@ -48,10 +51,11 @@ from lsst.daf.butler import (
 import lsst.geom
 from lsst.geom import Box2D
 from lsst.pex.config import Config, Field, makeRegistry, registerConfigurable
-from lsst.afw.cameraGeom import FOCAL_PLANE, PIXELS
+from lsst.afw.cameraGeom import Camera, FOCAL_PLANE, PIXELS
 from lsst.pipe.base import Task
 from lsst.sphgeom import ConvexPolygon, Region, UnitVector3d
 from ._instrument import loadCamera, Instrument
+from .workerPool import WorkerPool
 
 
 @dataclasses.dataclass
@@ -198,6 +202,11 @@ class ComputeVisitRegionsTask(Task, metaclass=ABCMeta):
         Task.__init__(self, config=config, **kwargs)
         self.butler = butler
         self.instrumentMap = {}
+        # Serializes butler access when this task is shared by the threads of
+        # a thread pool (see `lsst.obs.base.workerPool`).  Subclasses should
+        # hold it only while talking to the butler, so that the region
+        # computations themselves can run concurrently.
+        self.butlerLock = threading.Lock()
 
     ConfigClass = ComputeVisitRegionsConfig
 
@@ -229,7 +238,8 @@ class ComputeVisitRegionsTask(Task, metaclass=ABCMeta):
         """
         instrument = self.instrumentMap.get(instrumentName)
         if instrument is None:
-            instrument = Instrument.fromName(instrumentName, self.butler.registry)
+            with self.butlerLock:
+                instrument = Instrument.fromName(instrumentName, self.butler.registry)
             self.instrumentMap[instrumentName] = instrument
         return instrument
 
@@ -276,6 +286,35 @@ class DefineVisitsConfig(Config):
         optional=False,
         default=True,
     )
+    exposureQueryChunkSize = Field(
+        doc=("Maximum number of exposures whose records are fetched from the "
+             "registry with a single query."),
+        dtype=int,
+        default=1000,
+        check=lambda x: x > 0,
+    )
+    visitBatchSize = Field(
+        doc=("Number of visits whose records are inserted together, with "
+             "bulk inserts in a single transaction.  Visits that already "
+             "exist are still compared with the new definitions one at a "
+             "time.  If 1, each visit is synced in its own transaction."),
+        dtype=int,
+        default=1,
+        check=lambda x: x > 0,
+    )
+    incremental = Field(
+        doc=("If True, query the registry for exposures that already belong "
+             "to a visit in the visit system used by groupExposures before "
+             "doing anything else, and silently skip them, so re-running on "
+             "a whole collection only costs time for new exposures.  Only "
+             "safe if a visit's exposures are all present when it is first "
+             "defined; a new exposure that belongs to an existing visit will "
+             "be grouped without the visit's old exposures, and will usually "
+             "cause a conflict with the existing visit."),
+        dtype=bool,
+        optional=False,
+        default=False,
+    )
 
 
 class DefineVisitsTask(Task):
@@ -318,7 +357,9 @@ class DefineVisitsTask(Task):
     Defining the same visit the same way multiple times (e.g. via multiple
     invocations of this task on the same exposures, with the same
     configuration) is safe, but it may be inefficient, as most of the work must
-    be done before new visits can be compared to existing visits.
+    be done before new visits can be compared to existing visits.  Setting
+    ``config.incremental`` avoids this by skipping exposures that already
+    have visits up front.
     """
     def __init__(self, config: Optional[DefineVisitsConfig] = None, *, butler: Butler, **kwargs: Any):
         config.validate()  # Not a CmdlineTask nor PipelineTask, so have to validate the config here.
@@ -327,6 +368,10 @@ class DefineVisitsTask(Task):
         self.universe = self.butler.registry.dimensions
         self.makeSubtask("groupExposures")
         self.makeSubtask("computeVisitRegions", butler=self.butler)
+        # Serializes butler access when this task is shared by the threads of
+        # a thread pool (see `lsst.obs.base.workerPool`).  The subtask uses
+        # the same butler, so its lock is shared.
+        self._registryLock = self.computeVisitRegions.butlerLock
 
     def _reduce_kwargs(self):
         # Add extra parameters to pickle
@@ -427,24 +472,77 @@ class DefineVisitsTask(Task):
             ]
         )
 
-    def _expandExposureId(self, dataId: DataId) -> DataCoordinate:
-        """Return the expanded version of an exposure ID.
-
-        A private method to allow ID expansion in a pool without resorting
-        to local callables.
+    def _fetchExposureRecords(self, dataIds: Iterable[DataId]) -> List[DimensionRecord]:
+        """Fetch the exposure records for some data IDs in bulk.
 
         Parameters
         ----------
-        dataId : `dict` or `DataCoordinate`
-            Exposure-level data ID.
+        dataIds : iterable of `dict` or `DataCoordinate`
+            Exposure-level data IDs.  Duplicates are ignored.
 
         Returns
         -------
-        expanded : `DataCoordinate`
-            A data ID that includes full metadata for all exposure dimensions.
+        records : `list` [`DimensionRecord`]
+            One exposure record for each distinct data ID, in no particular
+            order.
+
+        Raises
+        ------
+        LookupError
+            Raised if any of the exposures is not in the registry.
+
+        Notes
+        -----
+        Records are fetched with one query per
+        ``config.exposureQueryChunkSize`` exposures, instead of one
+        `~lsst.daf.butler.Registry.expandDataId` call for each.
         """
         dimensions = DimensionGraph(self.universe, names=["exposure"])
-        return self.butler.registry.expandDataId(dataId, graph=dimensions)
+        idsByInstrument = defaultdict(set)
+        for dataId in dataIds:
+            dataId = DataCoordinate.standardize(dataId, graph=dimensions)
+            idsByInstrument[dataId["instrument"]].add(dataId["exposure"])
+        records = []
+        for instrument, ids in idsByInstrument.items():
+            # Sorting keeps each chunk to a narrow range of IDs, which makes
+            # the best use of the index on them.
+            ids = sorted(ids)
+            found = set()
+            for start in range(0, len(ids), self.config.exposureQueryChunkSize):
+                chunk = ids[start:start + self.config.exposureQueryChunkSize]
+                where = "exposure IN ({})".format(", ".join(str(int(i)) for i in chunk))
+                for record in self.butler.registry.queryDimensionRecords("exposure", where=where,
+                                                                         instrument=instrument):
+                    if record.id not in found:
+                        found.add(record.id)
+                        records.append(record)
+            missing = set(ids) - found
+            if missing:
+                raise LookupError(f"Exposure(s) {sorted(missing)} of instrument {instrument} "
+                                  "not found in the registry.")
+        return records
+
+    def _queryDefinedExposures(self, instrument: str, visitSystemId: int) -> Set[int]:
+        """Return the IDs of exposures that already belong to a visit.
+
+        Parameters
+        ----------
+        instrument : `str`
+            Name of the instrument.
+        visitSystemId : `int`
+            ID of the visit system to consider.
+
+        Returns
+        -------
+        exposureIds : `set` [`int`]
+            IDs of exposures associated with a visit in ``visitSystemId``.
+        """
+        return {
+            record.exposure
+            for record in self.butler.registry.queryDimensionRecords("visit_definition",
+                                                                     instrument=instrument,
+                                                                     visit_system=visitSystemId)
+        }
 
     def _buildVisitRecordsSingle(self, args) -> _VisitRecords:
         """Build the DimensionRecords associated with a visit and collection.
@@ -463,13 +561,20 @@ class DefineVisitsTask(Task):
         records : `_VisitRecords`
             Struct containing DimensionRecords for the visit, including
             associated dimension elements.
+
+        Notes
+        -----
+        This may be called from several threads at once; the region
+        computation subtask only holds ``self._registryLock`` while it reads
+        from the butler.
         """
         return self._buildVisitRecords(args[0], collections=args[1])
 
     def run(self, dataIds: Iterable[DataId], *,
-            pool: Optional[Pool] = None,
+            pool: Optional[Union[Pool, WorkerPool]] = None,
             processes: int = 1,
-            collections: Optional[str] = None):
+            collections: Optional[str] = None,
+            executor: str = "processes"):
         """Add visit definitions to the registry for the given exposures.
 
         Parameters
@@ -477,9 +582,8 @@ class DefineVisitsTask(Task):
         dataIds : `Iterable` [ `dict` or `DataCoordinate` ]
             Exposure-level data IDs.  These must all correspond to the same
             instrument, and are expected to be on-sky science exposures.
-        pool : `multiprocessing.Pool`, optional
-            If not `None`, a process pool with which to parallelize some
-            operations.
+        pool : `multiprocessing.Pool` or `~lsst.obs.base.WorkerPool`, optional
+            If not `None`, a pool with which to parallelize some operations.
         processes : `int`, optional
             The number of processes to use.  Ignored if ``pool`` is not `None`.
         collections : Any, optional
@@ -487,35 +591,44 @@ class DefineVisitsTask(Task):
             ``self.butler.collections``.
             Can be any of the types supported by the ``collections`` argument
             to butler construction.
+        executor : `str`, optional
+            Kind of pool to create if ``pool`` is `None` and ``processes`` is
+            greater than one; one of the keys of
+            `lsst.obs.base.workerPool.EXECUTORS`.  "threads" suits visits
+            whose regions are dominated by reading raw WCSs, and "processes"
+            those dominated by computing them.
 
         Raises
         ------
         lsst.daf.butler.registry.ConflictingDefinitionError
             Raised if a visit ID conflict is detected and the existing visit
             differs from the new one.
+        LookupError
+            Raised if any of the given exposures is not in the registry.
         """
-        # Set up multiprocessing, if desired.
+        # Set up multiprocessing, if desired, making sure any pool we create
+        # is shut down when we are done with it.
         if pool is None and processes > 1:
-            pool = Pool(processes)
+            with WorkerPool(processes, executor, butler=self.butler) as pool:
+                return self.run(dataIds, pool=pool, collections=collections)
         mapFunc = map if pool is None else pool.imap_unordered
-        # Normalize, expand, and deduplicate data IDs.
+        # Normalize and deduplicate data IDs, and fetch their records.
         self.log.info("Preprocessing data IDs.")
-        dataIds = set(mapFunc(self._expandExposureId, dataIds))
-        if not dataIds:
+        records = self._fetchExposureRecords(dataIds)
+        if not records:
             raise RuntimeError("No exposures given.")
-        # Extract exposure DimensionRecords, check that there's only one
-        # instrument in play, and check for non-science exposures.
+        # Check that there's only one instrument in play, and check for
+        # non-science exposures.
         exposures = []
         instruments = set()
-        for dataId in dataIds:
-            record = dataId.records["exposure"]
+        for record in records:
             if record.observation_type != "science":
                 if self.config.ignoreNonScienceExposures:
                     continue
                 else:
-                    raise RuntimeError(f"Input exposure {dataId} has observation_type "
+                    raise RuntimeError(f"Input exposure {record.dataId} has observation_type "
                                        f"{record.observation_type}, not 'science'.")
-            instruments.add(dataId["instrument"])
+            instruments.add(record.instrument)
             exposures.append(record)
         if not exposures:
             self.log.info("No science exposures found after filtering.")
@@ -526,9 +639,20 @@ class DefineVisitsTask(Task):
                 f"from the same instrument; got {instruments}."
             )
         instrument, = instruments
+        visitSystemId, visitSystemName = self.groupExposures.getVisitSystem()
+        if self.config.incremental:
+            # Drop exposures that already have visits before doing any of the
+            # expensive work for them.
+            defined = self._queryDefinedExposures(instrument, visitSystemId)
+            nBefore = len(exposures)
+            exposures = [record for record in exposures if record.id not in defined]
+            self.log.info("Skipping %d exposure(s) already assigned to visits in visit_system %d.",
+                          nBefore - len(exposures), visitSystemId)
+            if not exposures:
+                self.log.info("No new exposures to define visits for.")
+                return
         # Ensure the visit_system our grouping algorithm uses is in the
         # registry, if it wasn't already.
-        visitSystemId, visitSystemName = self.groupExposures.getVisitSystem()
         self.log.info("Registering visit_system %d: %s.", visitSystemId, visitSystemName)
         self.butler.registry.syncDimensionData(
             "visit_system",
@@ -544,14 +668,86 @@ class DefineVisitsTask(Task):
         allRecords = mapFunc(self._buildVisitRecordsSingle,
                              zip(definitions, itertools.repeat(collections)))
         # Iterate over visits and insert dimension data, one transaction per
-        # visit.  If a visit already exists, we skip all other inserts.
-        for visitRecords in allRecords:
-            with self.butler.registry.transaction():
-                if self.butler.registry.syncDimensionData("visit", visitRecords.visit):
-                    self.butler.registry.insertDimensionData("visit_definition",
-                                                             *visitRecords.visit_definition)
-                    self.butler.registry.insertDimensionData("visit_detector_region",
-                                                             *visitRecords.visit_detector_region)
+        # visit (or batch of visits).
+        allRecords = iter(allRecords)
+        while True:
+            batch = list(itertools.islice(allRecords, self.config.visitBatchSize))
+            if not batch:
+                break
+            if len(batch) == 1:
+                self._syncVisitRecords(batch[0])
+            else:
+                self._insertVisitRecordsBatch(instrument, batch)
+
+    def _syncVisitRecords(self, visitRecords: _VisitRecords) -> None:
+        """Insert the records for one visit in their own transaction, unless
+        the visit already exists.
+
+        Parameters
+        ----------
+        visitRecords : `_VisitRecords`
+            Records for the visit.
+
+        Raises
+        ------
+        lsst.daf.butler.registry.ConflictingDefinitionError
+            Raised if the visit already exists and differs from the new one.
+        """
+        # If a visit already exists, we skip all other inserts.
+        with self._registryLock, self.butler.registry.transaction():
+            if self.butler.registry.syncDimensionData("visit", visitRecords.visit):
+                self.butler.registry.insertDimensionData("visit_definition",
+                                                         *visitRecords.visit_definition)
+                self.butler.registry.insertDimensionData("visit_detector_region",
+                                                         *visitRecords.visit_detector_region)
+
+    def _insertVisitRecordsBatch(self, instrument: str, batch: List[_VisitRecords]) -> None:
+        """Insert the records for several visits with bulk inserts in a
+        single transaction.
+
+        Parameters
+        ----------
+        instrument : `str`
+            Name of the instrument all visits belong to.
+        batch : `list` [`_VisitRecords`]
+            Records for the visits.
+
+        Raises
+        ------
+        lsst.daf.butler.registry.ConflictingDefinitionError
+            Raised if a visit already exists and differs from the new one.
+
+        Notes
+        -----
+        Visits that already exist are found with a single query up front and
+        handled by `_syncVisitRecords`, which checks that they match the
+        existing ones.  If the bulk insert of the rest fails anyway (e.g.
+        because another process defined one of them in the meantime), the
+        transaction is rolled back and they are synced one at a time, too.
+        """
+        where = "visit IN ({})".format(", ".join(str(int(r.visit.id)) for r in batch))
+        with self._registryLock:
+            existing = {record.id for record in self.butler.registry.queryDimensionRecords(
+                "visit", where=where, instrument=instrument
+            )}
+        new = [r for r in batch if r.visit.id not in existing]
+        if new:
+            try:
+                with self._registryLock, self.butler.registry.transaction():
+                    self.butler.registry.insertDimensionData("visit", *[r.visit for r in new])
+                    self.butler.registry.insertDimensionData(
+                        "visit_definition", *[d for r in new for d in r.visit_definition]
+                    )
+                    self.butler.registry.insertDimensionData(
+                        "visit_detector_region", *[d for r in new for d in r.visit_detector_region]
+                    )
+            except Exception as err:
+                self.log.debug("Batch insert of %d visit(s) failed; syncing them individually: %s",
+                               len(new), err)
+                existing.update(r.visit.id for r in new)
+        for visitRecords in batch:
+            if visitRecords.visit.id in existing:
+                self._syncVisitRecords(visitRecords)
 
 
 def _reduceOrNone(func, iterable):
@@ -570,6 +766,72 @@ def _reduceOrNone(func, iterable):
     return r
 
 
+def _projectDetectorCorners(camera: Camera, fpToSky: Any, padding: int) -> Dict[int, List[UnitVector3d]]:
+    """Project the padded corners of every detector in a camera onto the sky
+    with a single call to a focal-plane-to-sky transform.
+
+    Parameters
+    ----------
+    camera : `lsst.afw.cameraGeom.Camera`
+        Camera whose detectors should be projected.
+    fpToSky : `lsst.afw.geom.TransformPoint2ToSpherePoint`
+        Transform from focal plane coordinates to the sky.
+    padding : `int`
+        Number of pixels by which to grow each detector's bounding box.
+
+    Returns
+    -------
+    bounds : `dict` [`int`, `list` [`lsst.sphgeom.UnitVector3d`]]
+        Unit vectors for the sky positions of each detector's corners, keyed
+        by detector ID.
+
+    Notes
+    -----
+    Equivalent to `_projectDetectorCornersIndividually`, but only the cheap
+    per-detector pixel-to-focal-plane step is done one detector at a time,
+    instead of composing and applying a full pixel-to-sky transform for each
+    detector.
+    """
+    detectorIds = []
+    nCorners = []
+    fpCorners = []
+    for detector in camera:
+        pixCorners = Box2D(detector.getBBox().dilatedBy(padding)).getCorners()
+        fpCorners.extend(detector.transform(pixCorners, PIXELS, FOCAL_PLANE))
+        detectorIds.append(detector.getId())
+        nCorners.append(len(pixCorners))
+    fpArray = np.array([[point.getX() for point in fpCorners], [point.getY() for point in fpCorners]])
+    # Array transforms return sky coordinates as (longitude, latitude) rows,
+    # in radians.
+    ra, dec = fpToSky.applyForward(fpArray)
+    cosDec = np.cos(dec)
+    vectors = [UnitVector3d(x, y, z) for x, y, z in zip(cosDec*np.cos(ra), cosDec*np.sin(ra), np.sin(dec))]
+    bounds = {}
+    start = 0
+    for detectorId, n in zip(detectorIds, nCorners):
+        bounds[detectorId] = vectors[start:start + n]
+        start += n
+    return bounds
+
+
+def _projectDetectorCornersIndividually(camera: Camera, fpToSky: Any,
+                                        padding: int) -> Dict[int, List[UnitVector3d]]:
+    """Project the padded corners of every detector in a camera onto the sky,
+    one detector at a time.
+
+    Parameters and return value are the same as for
+    `_projectDetectorCorners`.
+    """
+    bounds = {}
+    for detector in camera:
+        pixelsToSky = detector.getTransform(PIXELS, FOCAL_PLANE).then(fpToSky)
+        pixCorners = Box2D(detector.getBBox().dilatedBy(padding)).getCorners()
+        bounds[detector.getId()] = [
+            skyCorner.getVector() for skyCorner in pixelsToSky.applyForward(pixCorners)
+        ]
+    return bounds
+
+
 class _GroupExposuresOneToOneConfig(GroupExposuresConfig):
     visitSystemId = Field(
         doc=("Integer ID of the visit_system implemented by this grouping "
@@ -680,6 +942,23 @@ class _ComputeVisitRegionsFromSingleRawWcsConfig(ComputeVisitRegionsConfig):
         optional=False,
         default=False,
     )
+    cacheCameras = Field(
+        doc=("If True, keep each distinct camera geometry dataset (and each "
+             "instrument's nominal camera) in memory once loaded, so it is "
+             "read only once for all the exposures in its validity range.  "
+             "If False, load the camera anew for every exposure."),
+        dtype=bool,
+        default=True,
+    )
+    batchCornerProjection = Field(
+        doc=("If True, transform the corners of all detectors to focal plane "
+             "coordinates and project them onto the sky with a single call, "
+             "instead of building a pixel-to-sky transform for each "
+             "detector.  The results agree to within floating-point "
+             "round-off."),
+        dtype=bool,
+        default=True,
+    )
 
 
 @registerConfigurable("single-raw-wcs", ComputeVisitRegionsTask.registry)
@@ -700,6 +979,65 @@ class _ComputeVisitRegionsFromSingleRawWcsTask(ComputeVisitRegionsTask):
 
     ConfigClass = _ComputeVisitRegionsFromSingleRawWcsConfig
 
+    def __init__(self, config: _ComputeVisitRegionsFromSingleRawWcsConfig, *, butler: Butler,
+                 **kwargs: Any):
+        super().__init__(config, butler=butler, **kwargs)
+        self._versionedCameras: Dict[Any, Camera] = {}
+        self._nominalCameras: Dict[str, Camera] = {}
+
+    def getCamera(self, exposure: DimensionRecord, *, collections: Any = None) -> Tuple[Camera, bool]:
+        """Return the camera geometry valid for an exposure.
+
+        Parameters
+        ----------
+        exposure : `DimensionRecord`
+            Dimension record for the exposure.
+        collections : Any, optional
+            Collections to be searched for camera geometry, overriding
+            ``self.butler.collections``.
+
+        Returns
+        -------
+        camera : `lsst.afw.cameraGeom.Camera`
+            Camera object.
+        versioned : `bool`
+            If `True`, the camera was obtained from the butler; if `False`,
+            it is the nominal camera from the `Instrument` class.  See
+            `lsst.obs.base.loadCamera`.
+
+        Notes
+        -----
+        If ``config.cacheCameras`` is `True`, the registry is still searched
+        for the camera dataset whose validity range contains the exposure,
+        but the dataset is only read the first time it is found, and the
+        nominal camera is only constructed once per instrument.  Otherwise
+        this is equivalent to `lsst.obs.base.loadCamera`.
+        """
+        if collections is None:
+            collections = self.butler.collections
+        if not self.config.cacheCameras:
+            with self.butlerLock:
+                return loadCamera(self.butler, exposure.dataId, collections=collections)
+        try:
+            with self.butlerLock:
+                ref = self.butler.registry.findDataset("camera", instrument=exposure.instrument,
+                                                       collections=collections, timespan=exposure.timespan)
+        except LookupError:
+            # No camera dataset type is registered.
+            ref = None
+        if ref is not None:
+            camera = self._versionedCameras.get(ref.id)
+            if camera is None:
+                with self.butlerLock:
+                    camera = self.butler.getDirect(ref)
+                self._versionedCameras[ref.id] = camera
+            return camera, True
+        camera = self._nominalCameras.get(exposure.instrument)
+        if camera is None:
+            camera = self.getInstrument(exposure.instrument).getCamera()
+            self._nominalCameras[exposure.instrument] = camera
+        return camera, False
+
     def computeExposureBounds(self, exposure: DimensionRecord, *, collections: Any = None
                               ) -> Dict[int, List[UnitVector3d]]:
         """Compute the lists of unit vectors on the sphere that correspond to
@@ -723,7 +1061,7 @@ class _ComputeVisitRegionsFromSingleRawWcsTask(ComputeVisitRegionsTask):
         """
         if collections is None:
             collections = self.butler.collections
-        camera, versioned = loadCamera(self.butler, exposure.dataId, collections=collections)
+        camera, versioned = self.getCamera(exposure, collections=collections)
         if not versioned and self.config.requireVersionedCamera:
             raise LookupError(f"No versioned camera found for exposure {exposure.dataId}.")
 
@@ -751,27 +1089,24 @@ class _ComputeVisitRegionsFromSingleRawWcsTask(ComputeVisitRegionsTask):
 
         else:
             if self.config.detectorId is None:
-                wcsRefsIter = self.butler.registry.queryDatasets("raw.wcs", dataId=exposure.dataId,
-                                                                 collections=collections)
-                if not wcsRefsIter:
-                    raise LookupError(f"No raw.wcs datasets found for data ID {exposure.dataId} "
-                                      f"in collections {collections}.")
-                wcsRef = next(iter(wcsRefsIter))
+                with self.butlerLock:
+                    wcsRefsIter = self.butler.registry.queryDatasets("raw.wcs", dataId=exposure.dataId,
+                                                                     collections=collections)
+                    if not wcsRefsIter:
+                        raise LookupError(f"No raw.wcs datasets found for data ID {exposure.dataId} "
+                                          f"in collections {collections}.")
+                    wcsRef = next(iter(wcsRefsIter))
+                    wcs = self.butler.getDirect(wcsRef)
                 wcsDetector = camera[wcsRef.dataId["detector"]]
-                wcs = self.butler.getDirect(wcsRef)
             else:
                 wcsDetector = camera[self.config.detectorId]
-                wcs = self.butler.get("raw.wcs", dataId=exposure.dataId, detector=self.config.detectorId,
-                                      collections=collections)
+                with self.butlerLock:
+                    wcs = self.butler.get("raw.wcs", dataId=exposure.dataId,
+                                          detector=self.config.detectorId, collections=collections)
         fpToSky = wcsDetector.getTransform(FOCAL_PLANE, PIXELS).then(wcs.getTransform())
-        bounds = {}
-        for detector in camera:
-            pixelsToSky = detector.getTransform(PIXELS, FOCAL_PLANE).then(fpToSky)
-            pixCorners = Box2D(detector.getBBox().dilatedBy(self.config.padding)).getCorners()
-            bounds[detector.getId()] = [
-                skyCorner.getVector() for skyCorner in pixelsToSky.applyForward(pixCorners)
-            ]
-        return bounds
+        if self.config.batchCornerProjection:
+            return _projectDetectorCorners(camera, fpToSky, self.config.padding)
+        return _projectDetectorCornersIndividually(camera, fpToSky, self.config.padding)
 
     def compute(self, visit: VisitDefinitionData, *, collections: Any = None
                 ) -> Tuple[Region, Dict[int, Region]]:
@@ -0,0 +1,66 @@
+# This file is part of obs_base.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Ordering of input files so that they are read roughly in the order they
+are laid out on disk.
+"""
+
+__all__ = ("orderByLocality",)
+
+import os
+from typing import Iterable, List, Tuple
+
+
+def _localityKey(path: str) -> Tuple:
+    """Return a sort key that groups files by device and directory, then
+    orders them by inode within a directory.
+
+    Files that cannot be stat'ed (e.g. non-local URIs) sort after all others,
+    by name.
+    """
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return (1, 0, str(path), 0)
+    # Inode numbers are usually allocated in creation order, and most
+    # filesystems place data for consecutively-allocated inodes close
+    # together, which makes them a cheap proxy for physical block order.
+    return (0, stat.st_dev, os.path.dirname(path), stat.st_ino)
+
+
+def orderByLocality(files: Iterable[str]) -> List[str]:
+    """Sort files so that reading them in order is as sequential as
+    possible.
+
+    Parameters
+    ----------
+    files : iterable of `str`
+        Paths to order.  Consumed immediately.
+
+    Returns
+    -------
+    ordered : `list` of `str`
+        The same paths, grouped by device and then directory, and ordered by
+        inode number within each directory.  Raw files from one exposure are
+        usually written together into one directory, so this also keeps
+        exposures together.
+    """
+    return sorted(files, key=_localityKey)
@@ -0,0 +1,197 @@
+# This file is part of obs_base.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Lightweight, header-only FITS reading for use during raw ingest.
+
+These functions read only the header blocks of a FITS file, skipping over
+data units by seeking, and return plain `dict` headers instead of
+`lsst.daf.base.PropertyList` objects.  That is all that is needed to
+construct an `astro_metadata_translator.ObservationInfo`, and is
+considerably cheaper than opening the file with `lsst.afw.fits` (once per
+HDU) when only a few header keywords are of interest.
+"""
+
+__all__ = ("iterFitsHeaders", "readRawHeader")
+
+import gzip
+import re
+from typing import Any, BinaryIO, Dict, Iterator
+
+from astropy.io.fits import Header
+from astropy.io.fits.card import Undefined
+
+FITS_BLOCK_SIZE = 2880
+"""Size in bytes of a FITS header or data block (`int`).
+"""
+
+_CARD_SIZE = 80
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+# Keywords that only describe the binary table used to store a tile-
+# compressed image, and that have no meaning for the image itself.
+_COMPRESSION_KEYWORDS = re.compile(
+    r"^(ZIMAGE|ZSIMPLE|ZTENSION|ZEXTEND|ZBLOCKED|ZCMPTYPE|ZQUANTIZ|ZDITHER0|ZHECKSUM|ZDATASUM|"
+    r"ZBITPIX|ZNAXIS\d*|ZPCOUNT|ZGCOUNT|ZTILE\d+|ZNAME\d+|ZVAL\d+|"
+    r"TFIELDS|TTYPE\d+|TFORM\d+|TUNIT\d+|TSCAL\d+|TZERO\d+|TNULL\d+|TDIM\d+|THEAP)$"
+)
+
+
+def _openFits(filename: str) -> BinaryIO:
+    """Open a possibly gzip-compressed FITS file for binary reading.
+    """
+    stream = open(filename, "rb")
+    if stream.read(len(_GZIP_MAGIC)) == _GZIP_MAGIC:
+        stream.close()
+        return gzip.open(filename, "rb")
+    stream.seek(0)
+    return stream
+
+
+def _readHeaderBytes(stream: BinaryIO) -> bytes:
+    """Read header blocks from the current position up to and including the
+    one containing the END card.
+
+    Returns an empty `bytes` if the stream is already at end-of-file.
+    """
+    blocks = []
+    while True:
+        block = stream.read(FITS_BLOCK_SIZE)
+        if not block:
+            if blocks:
+                raise OSError("FITS header is missing its END card.")
+            return b""
+        if len(block) < FITS_BLOCK_SIZE:
+            raise OSError("FITS file is truncated within a header.")
+        blocks.append(block)
+        for start in range(0, FITS_BLOCK_SIZE, _CARD_SIZE):
+            if block[start:start + 8].rstrip() == b"END":
+                return b"".join(blocks)
+
+
+def _dataSize(header: Header) -> int:
+    """Return the size in bytes of the (padded) data unit that follows a
+    header.
+    """
+    naxis = header.get("NAXIS", 0)
+    if naxis == 0:
+        return 0
+    nElements = 1
+    for i in range(1, naxis + 1):
+        nElements *= header.get(f"NAXIS{i}", 0)
+    nBits = abs(header["BITPIX"]) * header.get("GCOUNT", 1) * (header.get("PCOUNT", 0) + nElements)
+    nBytes = nBits // 8
+    return -(-nBytes // FITS_BLOCK_SIZE) * FITS_BLOCK_SIZE
+
+
+def _toDict(header: Header) -> Dict[str, Any]:
+    """Convert an astropy header to a plain `dict`, translating the headers
+    of tile-compressed images to those of the images they contain.
+
+    Commentary cards are dropped; for repeated keywords the last value wins,
+    as with `lsst.afw.fits.readMetadata`.
+    """
+    result = {}
+    for card in header.cards:
+        if card.keyword in ("", "COMMENT", "HISTORY"):
+            continue
+        result[card.keyword] = None if isinstance(card.value, Undefined) else card.value
+    if result.get("ZIMAGE"):
+        image = {"XTENSION": "IMAGE", "BITPIX": result["ZBITPIX"], "NAXIS": result["ZNAXIS"]}
+        for i in range(1, result["ZNAXIS"] + 1):
+            image[f"NAXIS{i}"] = result[f"ZNAXIS{i}"]
+        image["PCOUNT"] = result.get("ZPCOUNT", 0)
+        image["GCOUNT"] = result.get("ZGCOUNT", 1)
+        for key, value in result.items():
+            if key in image or key in ("XTENSION", "NAXIS", "BITPIX", "PCOUNT", "GCOUNT"):
+                continue
+            if key.startswith("NAXIS") or _COMPRESSION_KEYWORDS.match(key):
+                continue
+            image[key] = value
+        result = image
+    return result
+
+
+def iterFitsHeaders(filename: str) -> Iterator[Dict[str, Any]]:
+    """Iterate over the headers of all HDUs in a FITS file, opening it only
+    once and never reading data units.
+
+    Parameters
+    ----------
+    filename : `str`
+        Name of the file to read.  May be gzip-compressed.
+
+    Yields
+    ------
+    header : `dict` [`str`, `object`]
+        Header for the next HDU.  Headers for tile-compressed images
+        describe the image, not the binary table used to store it.
+
+    Raises
+    ------
+    OSError
+        Raised if the file could not be read or is not a valid FITS file.
+    """
+    with _openFits(filename) as stream:
+        while True:
+            data = _readHeaderBytes(stream)
+            if not data:
+                return
+            header = Header.fromstring(data.decode("ascii"))
+            if "SIMPLE" not in header and "XTENSION" not in header:
+                raise OSError(f"{filename} is not a FITS file.")
+            # Convert before seeking, so the caller sees a header even if
+            # the file is truncated after it.
+            yield _toDict(header)
+            stream.seek(_dataSize(header), 1)
+
+
+def readRawHeader(filename: str) -> Dict[str, Any]:
+    """Read the merged primary and first-data-HDU header of a raw file.
+
+    Parameters
+    ----------
+    filename : `str`
+        Name of the file to read.  May be gzip-compressed.
+
+    Returns
+    -------
+    header : `dict` [`str`, `object`]
+        Keywords from the primary HDU, overridden by those in the first
+        HDU with data.  This is equivalent to merging the results of
+        ``lsst.afw.fits.readMetadata(filename, 0)`` and
+        ``lsst.afw.fits.readMetadata(filename)`` with
+        `astro_metadata_translator.merge_headers` in "overwrite" mode.
+    """
+    headers = iterFitsHeaders(filename)
+    try:
+        header = next(headers)
+        if header.get("NAXIS", 0) == 0:
+            # Like afw, only look past the primary HDU if it is empty.
+            try:
+                header.update(next(headers))
+            except StopIteration:
+                pass
+    except StopIteration:
+        raise OSError(f"{filename} is empty.") from None
+    finally:
+        headers.close()
+    return header
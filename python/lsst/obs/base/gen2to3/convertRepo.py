@@ -26,7 +26,7 @@ import os
 import fnmatch
 from dataclasses import dataclass
 from multiprocessing import Pool
-from typing import Iterable, Optional, List, Tuple
+from typing import Iterable, Optional, List, Tuple, Union
 
 from lsst.daf.butler import (
     Butler as Butler3,
@@ -45,6 +45,7 @@ from .rootRepoConverter import RootRepoConverter
 from .calibRepoConverter import CalibRepoConverter
 from .standardRepoConverter import StandardRepoConverter
 from .._instrument import Instrument
+from ..workerPool import WorkerPool
 
 
 @dataclass
@@ -570,8 +571,9 @@ class ConvertRepoTask(Task):
             calibs: Optional[List[CalibRepo]] = None,
             reruns: Optional[List[Rerun]] = None,
             visits: Optional[Iterable[int]] = None,
-            pool: Optional[Pool] = None,
-            processes: int = 1):
+            pool: Optional[Union[Pool, WorkerPool]] = None,
+            processes: int = 1,
+            executor: str = "processes"):
         """Convert a group of related data repositories.
 
         Parameters
@@ -591,14 +593,22 @@ class ConvertRepoTask(Task):
         visits : iterable of `int`, optional
             The integer IDs of visits to convert.  If not provided, all visits
             in the Gen2 root repository will be converted.
-        pool : `multiprocessing.Pool`, optional
-            If not `None`, a process pool with which to parallelize some
-            operations.
+        pool : `multiprocessing.Pool` or `~lsst.obs.base.WorkerPool`, optional
+            If not `None`, a pool with which to parallelize some operations.
         processes : `int`, optional
             The number of processes to use for conversion.
+        executor : `str`, optional
+            Kind of pool to create if ``pool`` is `None` and ``processes`` is
+            greater than one; one of the keys of
+            `lsst.obs.base.workerPool.EXECUTORS`.
         """
         if pool is None and processes > 1:
-            pool = Pool(processes)
+            # One pool serves every stage, so workers (and the butler and
+            # instrument imports they are warmed up with) are reused, and it
+            # is shut down once conversion is complete.
+            butler = self.raws.butler if self.raws is not None else self.butler3
+            with WorkerPool(processes, executor, butler=butler) as pool:
+                return self.run(root, calibs=calibs, reruns=reruns, visits=visits, pool=pool)
         if calibs is None:
             calibs = [CalibRepo(path=None)]
         if visits is not None:
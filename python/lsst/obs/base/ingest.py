@@ -22,16 +22,29 @@
 
 __all__ = ("RawIngestTask", "RawIngestConfig", "makeTransferChoiceField")
 
+import functools
+import itertools
+import json
+import logging
 import os.path
-from dataclasses import dataclass, InitVar
-from typing import List, Iterator, Iterable, Type, Optional, Any
-from collections import defaultdict
+import shutil
+import tempfile
+import sys
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field, InitVar
+from typing import Deque, Dict, List, Iterator, Iterable, Set, Tuple, Type, Optional, Any, Union
+from collections import defaultdict, deque
 from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
 
-from astro_metadata_translator import ObservationInfo, merge_headers
+import astropy.time
+from astro_metadata_translator import MetadataTranslator, ObservationInfo, merge_headers
 from lsst.afw.fits import readMetadata
 from lsst.daf.butler import (
     Butler,
+    ButlerURI,
     CollectionType,
     DataCoordinate,
     DatasetRef,
@@ -41,11 +54,23 @@ from lsst.daf.butler import (
     FileDataset,
     Formatter,
 )
-from lsst.pex.config import Config, ChoiceField
+from lsst.daf.butler.registry import MissingCollectionError
+from lsst.pex.config import Config, ChoiceField, Field
 from lsst.pipe.base import Task
 
 from ._instrument import Instrument, makeExposureRecordFromObsInfo
 from ._fitsRawFormatterBase import FitsRawFormatterBase
+from .fileOrdering import orderByLocality
+from .fitsHeaders import iterFitsHeaders, readRawHeader
+from .ingestManifest import MANIFEST_COLUMNS, readManifest, makeManifestObservationInfo
+from ._ingestJournal import IngestJournal
+from ._ingestQueue import IngestWorkQueue
+from ._metadataCache import RawMetadataCache
+from .ingestStatistics import IngestStatistics
+from .workerPool import WorkerPool
+from .version import __version__
+
+_log = logging.getLogger(__name__)
 
 
 @dataclass
@@ -114,12 +139,222 @@ class RawExposureData:
     `~lsst.daf.butler.Registry` prior to file-level ingest (`DimensionRecord`).
     """
 
+    staged: Dict[str, str] = field(default_factory=dict)
+    """Paths of staged copies of this exposure's files, keyed by
+    `RawFileData.filename` (`dict` [`str`, `str`]).
+
+    Empty unless ``RawIngestConfig.stagingDirectory`` is set.
+    """
+
     def __post_init__(self, universe: DimensionUniverse):
         # We don't care which file or dataset we read metadata from, because
         # we're assuming they'll all be the same; just use the first ones.
         self.record = makeExposureRecordFromObsInfo(self.files[0].datasets[0].obsInfo, universe)
 
 
+class _CompactRawFileData:
+    """Compact stand-in for a `RawFileData`, used to send extracted metadata
+    from worker processes back to the parent.
+
+    Only primitive values for the `~astro_metadata_translator.ObservationInfo`
+    properties that ingest uses are kept (see `_COMPACT_COLUMNS`), and the
+    instrument is referred to by name, so this pickles to a small fraction
+    of the size of a `RawFileData` and is much cheaper to unpickle.  Use
+    `RawIngestTask._expandCompactMetadata` to turn it back into a
+    `RawFileData`.
+    """
+
+    __slots__ = ("filename", "FormatterClass", "instrument", "datasets")
+
+    def __init__(self, data: RawFileData):
+        self.filename = data.filename
+        # Classes are pickled by reference, so this is cheap.
+        self.FormatterClass = data.FormatterClass
+        self.instrument = data.instrumentClass.getName() if data.instrumentClass is not None else None
+        self.datasets = [_encodeObsInfo(dataset.obsInfo) for dataset in data.datasets]
+
+    def __getstate__(self):
+        return (self.filename, self.FormatterClass, self.instrument, self.datasets)
+
+    def __setstate__(self, state):
+        self.filename, self.FormatterClass, self.instrument, self.datasets = state
+
+
+_COMPACT_COLUMNS = tuple(name for name in MANIFEST_COLUMNS if name != "path")
+"""Manifest columns (see `lsst.obs.base.ingestManifest.MANIFEST_COLUMNS`)
+whose values are stored by `_CompactRawFileData`, in order.
+"""
+
+
+def _encodeObsInfo(obsInfo: ObservationInfo) -> Tuple:
+    """Convert the properties of an `ObservationInfo` used by ingest into a
+    tuple of primitives, ordered as `_COMPACT_COLUMNS`.
+
+    Dates are stored as TAI (jd1, jd2) pairs, so no precision is lost.
+    """
+    values = []
+    for name in _COMPACT_COLUMNS:
+        if name in ("datetime_begin", "datetime_end"):
+            value = getattr(obsInfo, name)
+            if value is not None:
+                value = (float(value.tai.jd1), float(value.tai.jd2))
+        elif name in ("exposure_time", "dark_time"):
+            value = getattr(obsInfo, name)
+            if value is not None:
+                value = float(value.to_value("s"))
+        elif name in ("tracking_ra", "tracking_dec"):
+            value = None
+            if obsInfo.tracking_radec is not None:
+                icrs = obsInfo.tracking_radec.icrs
+                value = float(icrs.ra.degree if name == "tracking_ra" else icrs.dec.degree)
+        elif name in ("altitude", "azimuth"):
+            value = None
+            if obsInfo.altaz_begin is not None:
+                altaz = obsInfo.altaz_begin
+                value = float(altaz.alt.degree if name == "altitude" else altaz.az.degree)
+        elif name == "boresight_rotation_angle":
+            value = obsInfo.boresight_rotation_angle
+            if value is not None:
+                value = float(value.degree)
+        else:
+            value = getattr(obsInfo, name)
+        values.append(value)
+    return tuple(values)
+
+
+def _decodeObsInfo(values: Tuple) -> ObservationInfo:
+    """Reconstruct an `ObservationInfo` from a tuple made by
+    `_encodeObsInfo`.
+    """
+    row = dict(zip(_COMPACT_COLUMNS, values))
+    for name in ("datetime_begin", "datetime_end"):
+        if row[name] is not None:
+            row[name] = astropy.time.Time(*row[name], format="jd", scale="tai")
+    return makeManifestObservationInfo(row)
+
+
+@dataclass
+class _InstrumentRecords:
+    """Structure that holds the dimension records for an instrument that are
+    needed to expand raw data IDs, so they need only be fetched once per
+    ingest.
+    """
+
+    instrument: Optional[DimensionRecord]
+    """The record for the instrument itself, or `None` if it is not
+    registered (`DimensionRecord`).
+    """
+
+    detectors: Dict[int, DimensionRecord]
+    """Detector records, keyed by detector ID (`dict`).
+    """
+
+    physical_filters: Dict[str, DimensionRecord]
+    """Physical filter records, keyed by name (`dict`).
+    """
+
+
+# Per-process cache of Instrument instances, keyed by registry (held weakly,
+# so cached instruments do not outlive it) and then instrument name.
+_instrumentCache: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_instrumentCacheLock = threading.Lock()
+
+# Per-process cache of raw formatter classes, keyed by registry (held weakly)
+# and then instrument class, instrument name and detector.
+_rawFormatterCache: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def _getCachedInstrument(name: str, registry) -> Instrument:
+    """Return the result of `Instrument.fromName`, calling it at most once
+    per registry and instrument name in each process.
+
+    Failed lookups are not cached, so instruments registered later are
+    still found.
+    """
+    with _instrumentCacheLock:
+        try:
+            byName = _instrumentCache.setdefault(registry, {})
+        except TypeError:
+            # Registry cannot be weakly referenced or hashed; don't cache.
+            return Instrument.fromName(name, registry)
+        instrument = byName.get(name)
+        if instrument is None:
+            instrument = Instrument.fromName(name, registry)
+            byName[name] = instrument
+        return instrument
+
+
+def _getCachedRawFormatter(instrument: Instrument, dataId: DataCoordinate, registry) -> Type[Formatter]:
+    """Return the result of ``instrument.getRawFormatter(dataId)``, calling
+    it at most once per registry, instrument and detector in each process.
+    """
+    with _instrumentCacheLock:
+        try:
+            byKey = _rawFormatterCache.setdefault(registry, {})
+        except TypeError:
+            # Registry cannot be weakly referenced or hashed; don't cache.
+            return instrument.getRawFormatter(dataId)
+        key = (type(instrument), instrument.getName(), dataId["detector"])
+        FormatterClass = byKey.get(key)
+        if FormatterClass is None:
+            FormatterClass = instrument.getRawFormatter(dataId)
+            byKey[key] = FormatterClass
+        return FormatterClass
+
+
+def _picklesResults(pool) -> bool:
+    """Return whether results from a pool's workers are pickled, i.e.
+    whether they are separate processes.
+    """
+    if isinstance(pool, WorkerPool):
+        return pool.executor == "processes"
+    return not isinstance(pool, ThreadPool)
+
+
+def _copyFile(paths: Tuple[str, str]) -> int:
+    """Copy a file, returning the number of bytes copied.
+
+    Takes a single ``(source, destination)`` tuple so it can be mapped over.
+    """
+    source, destination = paths
+    shutil.copyfile(source, destination)
+    return os.path.getsize(destination)
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[list]:
+    """Split an iterable into lists of at most ``size`` elements, consuming
+    it lazily.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _imapBounded(imap, func, iterable: Iterable, size: int, **kwargs: Any) -> Iterator:
+    """Apply a pool's ``imap``-like method to an iterable without letting the
+    pool run ahead of the caller.
+
+    Inputs are handed to ``imap`` in slices of ``size``, and a slice is only
+    submitted once the caller has started consuming the results of the one
+    before it, so at most two slices of work (and their results) are ever
+    outstanding.  A plain ``imap`` call on a `multiprocessing.Pool` instead
+    consumes the whole iterable immediately.
+    """
+    chunks = _chunks(iterable, size)
+    current = next(chunks, None)
+    if current is None:
+        return
+    results = imap(func, current, **kwargs)
+    for chunk in chunks:
+        following = imap(func, chunk, **kwargs)
+        yield from results
+        results = following
+    yield from results
+
+
 def makeTransferChoiceField(doc="How to transfer files (None for no transfer).", default="auto"):
     """Create a Config field with options for how to transfer files between
     data repositories.
@@ -156,6 +391,178 @@ def makeTransferChoiceField(doc="How to transfer files (None for no transfer).",
 
 class RawIngestConfig(Config):
     transfer = makeTransferChoiceField()
+    streamingWindow = Field(
+        dtype=int,
+        optional=True,
+        default=None,
+        doc=("If not None, group files into exposures incrementally and ingest each exposure as soon as "
+             "files for all of the instrument's detectors have been seen, instead of extracting metadata "
+             "from every file before ingesting any of them.  The value is the maximum number of files "
+             "held in incomplete exposures; when it is exceeded the oldest incomplete exposure is "
+             "ingested as-is.  When metadata is extracted in parallel, at most twice this many files "
+             "are handed to the pool at once, so memory use stays bounded."),
+        check=lambda x: x is None or x > 0,
+    )
+    exposureBatchSize = Field(
+        dtype=int,
+        default=1,
+        doc=("Number of exposures whose dimension records and datasets are inserted together, with bulk "
+             "inserts inside a single transaction.  If a batch fails (e.g. because one of its exposures "
+             "was already registered), its exposures are retried one at a time."),
+        check=lambda x: x > 0,
+    )
+    fastHeaderRead = Field(
+        dtype=bool,
+        default=False,
+        doc=("If True, read the primary and first data HDU headers of each file with a single "
+             "header-only pass (see `lsst.obs.base.fitsHeaders.readRawHeader`) instead of opening the "
+             "file twice with `lsst.afw.fits.readMetadata`."),
+    )
+    cacheRawFormatters = Field(
+        dtype=bool,
+        default=False,
+        doc=("If True, look up the raw formatter class only once per registry, instrument and detector "
+             "in each process, instead of once per file.  Only safe for instruments whose "
+             "Instrument.getRawFormatter depends on nothing in the data ID but the detector."),
+    )
+    compactTransport = Field(
+        dtype=bool,
+        default=False,
+        doc=("If True, worker processes return only the metadata properties ingest itself uses, as "
+             "primitive values, instead of pickling complete ObservationInfo and Instrument objects back "
+             "to the parent, which reconstructs them.  This greatly reduces inter-process traffic, but "
+             "subclasses that use other ObservationInfo properties must leave it False."),
+    )
+    localityOrder = Field(
+        dtype=bool,
+        default=False,
+        doc=("If True, sort the input files by device, directory and inode before reading them (see "
+             "`lsst.obs.base.fileOrdering.orderByLocality`), so that header reads and copies are close "
+             "to sequential on spinning disks and tape-backed filesystems.  This requires the full file "
+             "list up front."),
+    )
+    extractChunkSize = Field(
+        dtype=int,
+        default=1,
+        doc=("Number of consecutive files handed to each worker at a time when extracting metadata in "
+             "parallel.  Larger values keep each worker reading neighboring files when localityOrder is "
+             "True, and reduce inter-process overhead."),
+        check=lambda x: x > 0,
+    )
+    multiExtension = Field(
+        dtype=bool,
+        default=False,
+        doc=("If True, treat each file as a multi-extension FITS file with one detector per image HDU: "
+             "read all HDU headers in a single pass (skipping data units) and ingest one dataset per "
+             "image HDU, using the primary header merged with that HDU's header.  The instrument's raw "
+             "formatter must know how to find a detector's HDU."),
+    )
+    metadataCacheFile = Field(
+        dtype=str,
+        optional=True,
+        default=None,
+        doc=("Path to a SQLite file in which to cache the metadata extracted from each file, keyed by "
+             "absolute path, size and modification time, so that rerunning an ingest only reads headers "
+             "from new or modified files.  Entries are also invalidated when the versions of obs_base "
+             "or of the metadata translator packages change, or when options that affect extraction "
+             "(fastHeaderRead, multiExtension, cacheRawFormatters) differ.  Created if it does not "
+             "exist.  If None, no cache is used."),
+    )
+    metadataCacheUseHash = Field(
+        dtype=bool,
+        default=False,
+        doc=("If True, also require a file's content hash to match its metadata cache entry.  This "
+             "requires reading every file in full.  Ignored if metadataCacheFile is None."),
+    )
+    skipExisting = Field(
+        dtype=bool,
+        default=False,
+        doc=("If True, query the registry up front for raw datasets that already exist in the output "
+             "RUN collection (each instrument's default raw collection, if no run is given) and silently "
+             "drop files whose datasets are all already present.  Files are dropped as soon as they can "
+             "be recognized: by path before reading any headers if transfer is 'direct' or None, "
+             "before metadata extraction for files with metadataCacheFile entries, and immediately "
+             "after it for the rest."),
+    )
+    journalFile = Field(
+        dtype=str,
+        optional=True,
+        default=None,
+        doc=("Path to a SQLite file in which to record the status of each file (extracted, transferred, "
+             "committed, or failed with a reason) as ingest proceeds.  Files already recorded as "
+             "committed are skipped, so rerunning with the same journal after a crash or failure "
+             "resumes where the previous run stopped; files left transferred by a crash are checked "
+             "against the registry before they are retried.  Created if it does not exist.  If None, "
+             "no journal is kept."),
+    )
+    journalRetryFailedOnly = Field(
+        dtype=bool,
+        default=False,
+        doc=("If True, only ingest files that journalFile records as failed, ignoring all others.  "
+             "Ignored if journalFile is None."),
+    )
+    shardClaimSize = Field(
+        dtype=int,
+        default=100,
+        doc=("Number of files claimed from the work queue at a time by RawIngestTask.runSharded.  "
+             "Smaller values balance metadata extraction more evenly between shards; larger values "
+             "reduce contention on the queue."),
+        check=lambda x: x > 0,
+    )
+    shardStaleAfter = Field(
+        dtype=float,
+        optional=True,
+        default=3600.0,
+        doc=("Seconds after which files claimed by another shard without their metadata being stored "
+             "are assumed abandoned and claimed again by RawIngestTask.runSharded.  If None, claims "
+             "never expire, and a shard that dies while extracting metadata stalls all others."),
+    )
+    shardPollInterval = Field(
+        dtype=float,
+        default=5.0,
+        doc=("Seconds between checks, in RawIngestTask.runSharded, for other shards to start and to "
+             "finish extracting metadata."),
+        check=lambda x: x > 0,
+    )
+    statisticsFile = Field(
+        dtype=str,
+        optional=True,
+        default=None,
+        doc=("If not None, append the per-stage timers and counters collected by each call to "
+             "RawIngestTask.run to this file, as one JSON object per line."),
+    )
+    stagingDirectory = Field(
+        dtype=str,
+        optional=True,
+        default=None,
+        doc=("If not None and transfer is 'copy', copy the files of upcoming exposures into temporary "
+             "directories here in the background while earlier exposures are being registered, then "
+             "hard-link the copies into the datastore inside the registry transaction.  Must be on the "
+             "same filesystem as the datastore.  Staged copies are always deleted once their exposure "
+             "has been ingested or has failed."),
+    )
+    stagingDepth = Field(
+        dtype=int,
+        default=2,
+        doc="Maximum number of exposures staged ahead of the one being ingested, if stagingDirectory is set.",
+        check=lambda x: x > 0,
+    )
+    transferThreads = Field(
+        dtype=int,
+        default=1,
+        doc=("Number of threads used to copy the files of each exposure into stagingDirectory "
+             "concurrently, to make use of the bandwidth of parallel filesystems.  Only has an effect "
+             "if stagingDirectory is set and transfer is 'copy'; otherwise files are transferred one at "
+             "a time by the datastore, and a warning is logged when the config is validated."),
+        check=lambda x: x > 0,
+    )
+
+    def validate(self):
+        super().validate()
+        if self.transferThreads > 1 and (self.stagingDirectory is None or self.transfer != "copy"):
+            _log.warning("transferThreads=%d has no effect unless stagingDirectory is set and transfer "
+                         "is 'copy' (stagingDirectory=%r, transfer=%r).", self.transferThreads,
+                         self.stagingDirectory, self.transfer)
 
 
 class RawIngestTask(Task):
@@ -195,6 +602,11 @@ class RawIngestTask(Task):
         self.butler = butler
         self.universe = self.butler.registry.dimensions
         self.datasetType = self.getDatasetType()
+        self._instrumentRecords: Dict[str, _InstrumentRecords] = {}
+        self.statistics = IngestStatistics()
+        # Serializes registry access when this task is shared by the threads
+        # of a thread pool (see `lsst.obs.base.workerPool`).
+        self._registryLock = threading.Lock()
 
         # Import all the instrument classes so that we ensure that we
         # have all the relevant metadata translators loaded.
@@ -222,9 +634,10 @@ class RawIngestTask(Task):
 
         Notes
         -----
-        Assumes that there is a single dataset associated with the given
-        file.  Instruments using a single file to store multiple datasets
-        must implement their own version of this method.
+        Unless ``config.multiExtension`` is `True`, assumes that there is a
+        single dataset associated with the given file.  Instruments using a
+        single file to store multiple datasets should either set that option
+        or implement their own version of this method.
         """
 
         # We do not want to stop ingest if we are given a bad file.
@@ -234,9 +647,15 @@ class RawIngestTask(Task):
         try:
             # Manually merge the primary and "first data" headers here because
             # we do not know in general if an input file has set INHERIT=T.
-            phdu = readMetadata(filename, 0)
-            header = merge_headers([phdu, readMetadata(filename)], mode="overwrite")
-            datasets = [self._calculate_dataset_info(header, filename)]
+            if self.config.multiExtension:
+                datasets = self._calculate_extension_dataset_info(filename)
+            else:
+                if self.config.fastHeaderRead:
+                    header = readRawHeader(filename)
+                else:
+                    phdu = readMetadata(filename, 0)
+                    header = merge_headers([phdu, readMetadata(filename)], mode="overwrite")
+                datasets = [self._calculate_dataset_info(header, filename)]
         except Exception as e:
             self.log.debug("Problem extracting metadata from %s: %s", filename, e)
             # Indicate to the caller that we failed to read
@@ -249,7 +668,7 @@ class RawIngestTask(Task):
             # can be associated with a single file, they must all share the
             # same formatter.
             try:
-                instrument = Instrument.fromName(datasets[0].dataId["instrument"], self.butler.registry)
+                instrument = self._getInstrument(datasets[0].dataId["instrument"])
             except LookupError:
                 self.log.warning("Instrument %s for file %s not known to registry",
                                  datasets[0].dataId["instrument"], filename)
@@ -257,12 +676,89 @@ class RawIngestTask(Task):
                 FormatterClass = Formatter
                 instrument = None
             else:
-                FormatterClass = instrument.getRawFormatter(datasets[0].dataId)
+                FormatterClass = self._getRawFormatter(instrument, datasets[0].dataId)
 
         return RawFileData(datasets=datasets, filename=filename,
                            FormatterClass=FormatterClass,
                            instrumentClass=instrument)
 
+    def _getInstrument(self, name: str) -> Instrument:
+        """Return the `Instrument` with the given name, constructing it (and
+        querying the registry for it) only once per process.
+
+        Parameters
+        ----------
+        name : `str`
+            Name of the instrument.
+
+        Returns
+        -------
+        instrument : `Instrument`
+            The instrument.  Shared with any other task in this process that
+            uses the same registry.
+
+        Raises
+        ------
+        LookupError
+            Raised if the instrument is not known to the registry.
+        """
+        with self._registryLock:
+            return _getCachedInstrument(name, self.butler.registry)
+
+    def _getRawFormatter(self, instrument: Instrument, dataId: DataCoordinate) -> Type[Formatter]:
+        """Return the raw formatter class for a data ID, looking it up only
+        once per registry, instrument and detector in each process if
+        ``config.cacheRawFormatters`` is `True`.
+        """
+        if not self.config.cacheRawFormatters:
+            return instrument.getRawFormatter(dataId)
+        return _getCachedRawFormatter(instrument, dataId, self.butler.registry)
+
+    def extractCompactMetadata(self, filename: str) -> _CompactRawFileData:
+        """Extract metadata from a single raw file, in the compact form used
+        to return it from worker processes.
+
+        Parameters
+        ----------
+        filename : `str`
+            Path to the file.
+
+        Returns
+        -------
+        data : `_CompactRawFileData`
+            Compact form of the result of `extractMetadata`.
+        """
+        return _CompactRawFileData(self.extractMetadata(filename))
+
+    def _expandCompactMetadata(self, compact: Iterable[_CompactRawFileData]) -> Iterator[RawFileData]:
+        """Reconstruct `RawFileData` from the compact form returned by
+        `extractCompactMetadata`.
+
+        Parameters
+        ----------
+        compact : iterable of `_CompactRawFileData`
+            Compact metadata, typically straight from worker processes.
+
+        Yields
+        ------
+        data : `RawFileData`
+            Equivalent of the result of `extractMetadata`, except that only
+            the `~astro_metadata_translator.ObservationInfo` properties in
+            `lsst.obs.base.ingestManifest.MANIFEST_COLUMNS` are set.
+        """
+        for item in compact:
+            instrument = self._getInstrument(item.instrument) if item.instrument is not None else None
+            datasets = []
+            for values in item.datasets:
+                obsInfo = _decodeObsInfo(values)
+                dataId = DataCoordinate.standardize(instrument=obsInfo.instrument,
+                                                    exposure=obsInfo.exposure_id,
+                                                    detector=obsInfo.detector_num,
+                                                    universe=self.universe)
+                datasets.append(RawFileDatasetInfo(obsInfo=obsInfo, dataId=dataId))
+            yield RawFileData(datasets=datasets, filename=item.filename,
+                              FormatterClass=item.FormatterClass, instrumentClass=instrument)
+
     def _calculate_dataset_info(self, header, filename):
         """Calculate a RawFileDatasetInfo from the supplied information.
 
@@ -317,6 +813,94 @@ class RawIngestTask(Task):
                                             universe=self.universe)
         return RawFileDatasetInfo(obsInfo=obsInfo, dataId=dataId)
 
+    def _calculate_extension_dataset_info(self, filename):
+        """Calculate a RawFileDatasetInfo for each detector HDU of a
+        multi-extension file.
+
+        Parameters
+        ----------
+        filename : `str`
+            Path to the file.  Its headers are read in a single pass.
+
+        Returns
+        -------
+        datasets : `list` of `RawFileDatasetInfo`
+            One entry per image HDU whose merged header could be translated,
+            in HDU order.  If the primary HDU itself has data, the file is
+            treated as having a single dataset.
+
+        Raises
+        ------
+        ValueError
+            Raised if no HDU could be translated, or two HDUs have the same
+            detector.
+        """
+        headers = iterFitsHeaders(filename)
+        try:
+            primary = next(headers)
+        except StopIteration:
+            raise ValueError(f"{filename} is empty.") from None
+        if primary.get("NAXIS", 0) != 0:
+            headers.close()
+            return [self._calculate_dataset_info(primary, filename)]
+        datasets = []
+        detectors = set()
+        for hdu, header in enumerate(headers, start=1):
+            if header.get("NAXIS", 0) == 0:
+                continue
+            try:
+                dataset = self._calculate_dataset_info({**primary, **header}, filename)
+            except Exception as e:
+                # Not every image HDU need be a science detector (e.g. guiders
+                # or wavefront sensors the instrument does not ingest).
+                self.log.debug("Skipping HDU %d of %s: %s", hdu, filename, e)
+                continue
+            detector = dataset.dataId["detector"]
+            if detector in detectors:
+                raise ValueError(f"Detector {detector} appears more than once in {filename}.")
+            detectors.add(detector)
+            datasets.append(dataset)
+        if not datasets:
+            raise ValueError(f"No HDU of {filename} could be translated.")
+        return datasets
+
+    def extractManifestMetadata(self, rows: Iterable[Dict[str, Any]]) -> Iterator[RawFileData]:
+        """Build file-level metadata from manifest rows instead of headers.
+
+        Parameters
+        ----------
+        rows : iterable of `dict`
+            Rows of a manifest, as returned by
+            `lsst.obs.base.ingestManifest.readManifest`.
+
+        Yields
+        ------
+        data : `RawFileData`
+            A structure like those returned by `extractMetadata`.  Rows for
+            files that do not exist, or whose metadata is not usable, yield
+            structures with no datasets, so they are reported as bad files.
+        """
+        for row in rows:
+            filename = row["path"]
+            try:
+                if not os.path.exists(filename):
+                    raise FileNotFoundError(f"{filename} does not exist.")
+                obsInfo = makeManifestObservationInfo(row)
+                dataId = DataCoordinate.standardize(instrument=obsInfo.instrument,
+                                                    exposure=obsInfo.exposure_id,
+                                                    detector=obsInfo.detector_num,
+                                                    universe=self.universe)
+                instrument = self._getInstrument(obsInfo.instrument)
+                FormatterClass = self._getRawFormatter(instrument, dataId)
+            except Exception as e:
+                self.log.debug("Problem with manifest entry for %s: %s", filename, e)
+                yield RawFileData(datasets=[], filename=filename, FormatterClass=Formatter,
+                                  instrumentClass=None)
+                continue
+            yield RawFileData(datasets=[RawFileDatasetInfo(obsInfo=obsInfo, dataId=dataId)],
+                              filename=filename, FormatterClass=FormatterClass,
+                              instrumentClass=instrument)
+
     def groupByExposure(self, files: Iterable[RawFileData]) -> List[RawExposureData]:
         """Group an iterable of `RawFileData` by exposure.
 
@@ -342,6 +926,103 @@ class RawIngestTask(Task):
         return [RawExposureData(dataId=dataId, files=exposureFiles, universe=self.universe)
                 for dataId, exposureFiles in byExposure.items()]
 
+    def groupByExposureStreaming(self, files: Iterable[RawFileData], window: int
+                                 ) -> Iterator[RawExposureData]:
+        """Incrementally group an iterable of `RawFileData` by exposure.
+
+        Parameters
+        ----------
+        files : iterable of `RawFileData`
+            File-level information to group.  Consumed lazily.
+        window : `int`
+            Maximum number of files to hold in incomplete exposures.  When
+            this is exceeded, the oldest incomplete exposure is yielded even
+            though not all of its detectors have been seen.
+
+        Yields
+        ------
+        exposure : `RawExposureData`
+            A structure that groups the file-level information for an
+            exposure, as in `groupByExposure`.  An exposure is yielded as soon
+            as files for all detectors known to the registry for its
+            instrument have been seen.  If the registry knows of no detectors
+            for the instrument, exposures are only yielded when the window is
+            exceeded or ``files`` is exhausted.
+
+        Notes
+        -----
+        Files for a single exposure may be split across more than one
+        `RawExposureData` if the window is smaller than the number of files
+        between the first and last detector of that exposure; this is safe
+        because exposure records are synced rather than inserted.
+        """
+        exposureDimensions = self.universe["exposure"].graph
+        # Dicts preserve insertion order, so the first key is always the
+        # exposure that has been waiting the longest.
+        pending: Dict[DataCoordinate, List[RawFileData]] = {}
+        detectorsSeen: Dict[DataCoordinate, Set[int]] = {}
+        nPending = 0
+
+        def flush(dataId: DataCoordinate) -> RawExposureData:
+            nonlocal nPending
+            exposureFiles = pending.pop(dataId)
+            del detectorsSeen[dataId]
+            nPending -= len(exposureFiles)
+            return RawExposureData(dataId=dataId, files=exposureFiles, universe=self.universe)
+
+        for f in files:
+            # Assume that the first dataset is representative for the file
+            dataId = f.datasets[0].dataId.subset(exposureDimensions)
+            pending.setdefault(dataId, []).append(f)
+            nPending += 1
+            seen = detectorsSeen.setdefault(dataId, set())
+            seen.update(dataset.dataId["detector"] for dataset in f.datasets)
+            nDetectors = len(self._getInstrumentRecords(dataId["instrument"]).detectors)
+            if nDetectors and len(seen) >= nDetectors:
+                yield flush(dataId)
+            while nPending > window:
+                oldest = next(iter(pending))
+                self.log.debug("Ingesting incomplete exposure %s to stay within streaming window.", oldest)
+                yield flush(oldest)
+        while pending:
+            yield flush(next(iter(pending)))
+
+    def _getInstrumentRecords(self, instrument: str) -> _InstrumentRecords:
+        """Return the instrument, detector and physical_filter dimension
+        records for an instrument.
+
+        Parameters
+        ----------
+        instrument : `str`
+            Name of the instrument.
+
+        Returns
+        -------
+        records : `_InstrumentRecords`
+            Struct containing the records.
+
+        Notes
+        -----
+        The result is cached, so the registry is queried only once per
+        instrument for the lifetime of the task.
+        """
+        records = self._instrumentRecords.get(instrument)
+        if records is None:
+            registry = self.butler.registry
+            with self._registryLock:
+                instrumentRecords = list(registry.queryDimensionRecords("instrument", instrument=instrument))
+                records = _InstrumentRecords(
+                    instrument=instrumentRecords[0] if instrumentRecords else None,
+                    detectors={record.id: record
+                               for record in registry.queryDimensionRecords("detector",
+                                                                            instrument=instrument)},
+                    physical_filters={record.name: record
+                                      for record in registry.queryDimensionRecords("physical_filter",
+                                                                                   instrument=instrument)},
+                )
+            self._instrumentRecords[instrument] = records
+        return records
+
     def expandDataIds(self, data: RawExposureData) -> RawExposureData:
         """Expand the data IDs associated with a raw exposure to include
         additional metadata records.
@@ -364,28 +1045,49 @@ class RawIngestTask(Task):
         # We start by expanded the exposure-level data ID; we won't use that
         # directly in file ingest, but this lets us do some database lookups
         # once per exposure instead of once per file later.
-        data.dataId = self.butler.registry.expandDataId(
-            data.dataId,
-            # We pass in the records we'll be inserting shortly so they aren't
-            # looked up from the database.  We do expect instrument and filter
-            # records to be retrieved from the database here (though the
-            # Registry may cache them so there isn't a lookup every time).
-            records={
-                self.butler.registry.dimensions["exposure"]: data.record,
-            }
-        )
-        # Now we expand the per-file (exposure+detector) data IDs.  This time
-        # we pass in the records we just retrieved from the exposure data ID
-        # expansion.
+        instrumentRecords = self._getInstrumentRecords(data.dataId["instrument"])
+        # We pass in the records we'll be inserting shortly so they aren't
+        # looked up from the database, along with the instrument and filter
+        # records we fetched (once) for the instrument.  Anything we don't
+        # have is looked up by the Registry.
+        records = {self.universe["exposure"]: data.record}
+        if instrumentRecords.instrument is not None:
+            records[self.universe["instrument"]] = instrumentRecords.instrument
+        physical_filter = instrumentRecords.physical_filters.get(data.record.physical_filter)
+        if physical_filter is not None:
+            records[self.universe["physical_filter"]] = physical_filter
+        with self._registryLock:
+            data.dataId = self.butler.registry.expandDataId(data.dataId, records=records)
+        # Now we expand the per-file (exposure+detector) data IDs.  Everything
+        # but the detector record comes from the exposure data ID expansion,
+        # and the detector records were fetched with the instrument records,
+        # so this can usually be done without any database lookups at all.
+        graph = self.datasetType.dimensions
+        values = dict(data.dataId.full.byName())
+        fileRecords = {element.name: data.dataId.records[element.name]
+                       for element in data.dataId.graph.elements}
+        canExpandLocally = set(graph.elements.names) <= fileRecords.keys() | {"detector"}
         for file in data.files:
             for dataset in file.datasets:
-                dataset.dataId = self.butler.registry.expandDataId(
-                    dataset.dataId,
-                    records=dict(data.dataId.records)
+                detectorRecord = instrumentRecords.detectors.get(dataset.dataId["detector"])
+                if detectorRecord is None or not canExpandLocally:
+                    # Fall back to the Registry, which will also raise a
+                    # helpful exception if the detector doesn't exist.
+                    with self._registryLock:
+                        dataset.dataId = self.butler.registry.expandDataId(
+                            dataset.dataId,
+                            records=dict(data.dataId.records)
+                        )
+                    continue
+                values["detector"] = detectorRecord.id
+                fileRecords["detector"] = detectorRecord
+                dataset.dataId = DataCoordinate.standardize(values, graph=graph).expanded(
+                    {name: fileRecords[name] for name in graph.elements.names}
                 )
         return data
 
-    def prep(self, files, *, pool: Optional[Pool] = None, processes: int = 1) -> Iterator[RawExposureData]:
+    def prep(self, files, *, pool: Optional[Union[Pool, WorkerPool]] = None, processes: int = 1,
+             run: Optional[str] = None, executor: str = "processes") -> Iterator[RawExposureData]:
         """Perform all ingest preprocessing steps that do not involve actually
         modifying the database.
 
@@ -394,11 +1096,20 @@ class RawIngestTask(Task):
         files : iterable over `str` or path-like objects
             Paths to the files to be ingested.  Will be made absolute
             if they are not already.
-        pool : `multiprocessing.Pool`, optional
-            If not `None`, a process pool with which to parallelize some
-            operations.
+        pool : `multiprocessing.Pool` or `~lsst.obs.base.WorkerPool`, optional
+            If not `None`, a pool with which to parallelize some operations.
         processes : `int`, optional
             The number of processes to use.  Ignored if ``pool`` is not `None`.
+        run : `str`, optional
+            Name of the RUN collection that will be written to.  Only used to
+            look for existing datasets when ``config.skipExisting`` is `True`.
+        executor : `str`, optional
+            Kind of pool to create if ``pool`` is `None` and ``processes`` is
+            greater than one; one of the keys of
+            `lsst.obs.base.workerPool.EXECUTORS`.  "threads" avoids pickling
+            the task and is usually best for I/O-bound header reads.  A pool
+            created here is shut down when the returned iterator is
+            exhausted; one passed in is left for the caller to shut down.
 
         Yields
         ------
@@ -407,35 +1118,147 @@ class RawIngestTask(Task):
             IDs to be ingested (one structure for each exposure).
         bad_files : `list` of `str`
             List of all the files that could not have metadata extracted.
+            When ``config.streamingWindow`` is set, this is only populated as
+            the exposure iterator is consumed.
         """
+        ownPool = None
         if pool is None and processes > 1:
-            pool = Pool(processes)
+            pool = ownPool = WorkerPool(processes, executor, butler=self.butler)
         mapFunc = map if pool is None else pool.imap_unordered
 
+        existing = None
+        if self.config.skipExisting:
+            if self.config.transfer in ("direct", None):
+                # Ingested files stay where they are, so they can be
+                # recognized by path without reading them.
+                files = list(files)
+                with self.statistics.timer("filterExistingPaths", items=len(files)):
+                    files = self._filterExistingPaths(files, run)
+            with self.statistics.timer("queryExisting"):
+                existing = self._queryExistingDataIds(run)
+
+        cache = None
+        if self.config.metadataCacheFile is not None:
+            with self.statistics.timer("metadataCache"):
+                cache = RawMetadataCache(self.config.metadataCacheFile,
+                                         useHash=self.config.metadataCacheUseHash,
+                                         context=self._getMetadataCacheContext())
+                cachedData, files = cache.partition(files)
+            if existing is not None:
+                cachedData = list(self._filterExisting(cachedData, existing))
+            self.log.info("Using cached metadata for %d file%s; %d file%s must be read.",
+                          len(cachedData), "" if len(cachedData) == 1 else "s",
+                          len(files), "" if len(files) == 1 else "s")
+
+        if self.config.localityOrder:
+            with self.statistics.timer("orderFiles"):
+                files = orderByLocality(files)
+
         # Extract metadata and build per-detector regions.
         # This could run in a subprocess so collect all output
         # before looking at failures.
-        fileData: Iterator[RawFileData] = mapFunc(self.extractMetadata, files)
+        if pool is None:
+            fileData: Iterator[RawFileData] = map(self.extractMetadata, files)
+        else:
+            if self.config.streamingWindow is None:
+                imap = pool.imap_unordered
+            else:
+                # Keep the pool from reading every file before the first
+                # exposures have been ingested.
+                imap = functools.partial(_imapBounded, pool.imap_unordered,
+                                         size=self.config.streamingWindow)
+            if self.config.compactTransport and _picklesResults(pool):
+                compact = imap(self.extractCompactMetadata, files, chunksize=self.config.extractChunkSize)
+                fileData = self._expandCompactMetadata(compact)
+            else:
+                fileData = imap(self.extractMetadata, files, chunksize=self.config.extractChunkSize)
+        if cache is not None:
+            fileData = itertools.chain(cachedData, cache.storeAll(fileData))
+        fileData = self.statistics.timeIterator("extractMetadata", fileData)
+        exposureData, bad_files = self._prepFileData(fileData, mapFunc=mapFunc, existing=existing)
+        if ownPool is not None:
+            # Nobody else knows about this pool, so shut it down as soon as
+            # the caller has consumed everything it was used for.
+            exposureData = ownPool.closeAfter(exposureData)
+        return exposureData, bad_files
+
+    def _getMetadataCacheContext(self) -> str:
+        """Describe everything besides a file's contents that the metadata
+        extracted from it depends on, for `RawMetadataCache`.
 
+        Returns
+        -------
+        context : `str`
+            JSON description of this task class, the configuration options
+            that affect extraction, and the versions of obs_base and of the
+            packages providing every registered metadata translator.
+        """
+        packages = {"lsst.obs.base": __version__}
+        for translator in MetadataTranslator.translators.values():
+            # Use the version of the innermost enclosing package that has one.
+            parts = translator.__module__.split(".")
+            for n in range(len(parts), 0, -1):
+                module = sys.modules.get(".".join(parts[:n]))
+                version = getattr(module, "__version__", None)
+                if version is not None:
+                    packages[module.__name__] = str(version)
+                    break
+        return json.dumps({
+            "task": f"{type(self).__module__}.{type(self).__qualname__}",
+            "config": {name: getattr(self.config, name)
+                       for name in ("fastHeaderRead", "multiExtension", "cacheRawFormatters")},
+            "packages": packages,
+        }, sort_keys=True)
+
+    def _prepFileData(self, fileData: Iterable[RawFileData], *, mapFunc=map,
+                      existing: Optional[Set[Tuple[str, int, int]]] = None
+                      ) -> Tuple[Iterator[RawExposureData], List[str]]:
+        """Group and expand file-level metadata, however it was obtained.
+
+        Parameters
+        ----------
+        fileData : iterable of `RawFileData`
+            File-level metadata, including entries for files that could not
+            be read (with no datasets).
+        mapFunc : callable, optional
+            Function used in place of `map` to expand data IDs.
+        existing : `set` of `tuple`, optional
+            Data IDs of datasets that already exist, as returned by
+            `_queryExistingDataIds`, to be dropped.
+
+        Returns
+        -------
+        exposures : iterator of `RawExposureData`
+            Expanded exposure-level data, as returned by `prep`.
+        bad_files : `list` of `str`
+            Files that could not have metadata extracted.
+        """
         # Filter out all the failed reads and store them for later
         # reporting
-        good_files = []
         bad_files = []
-        for fileDatum in fileData:
-            if not fileDatum.datasets:
-                bad_files.append(fileDatum.filename)
-            else:
-                good_files.append(fileDatum)
-        fileData = good_files
-
-        self.log.info("Successfully extracted metadata from %d file%s with %d failure%s",
-                      len(fileData), "" if len(fileData) == 1 else "s",
-                      len(bad_files), "" if len(bad_files) == 1 else "s")
+        fileData = self._filterBadFiles(fileData, bad_files)
+        if existing is not None:
+            fileData = self._filterExisting(fileData, existing)
+
+        if self.config.streamingWindow is not None:
+            # Group, expand, and hand exposures to the caller as soon as they
+            # are complete, so memory use is bounded by the window rather than
+            # the number of files.  Data ID expansion happens in this process,
+            # because handing a lazy iterator to the pool would just make it
+            # drain the whole input up front.  ``bad_files`` is only complete
+            # once the returned iterator has been exhausted.
+            exposureData = self.groupByExposureStreaming(fileData, self.config.streamingWindow)
+            exposureData = self.statistics.timeIterator("groupByExposure", exposureData)
+            expanded = map(self.expandDataIds, exposureData)
+            return self.statistics.timeIterator("expandDataIds", expanded), bad_files
+
+        fileData = list(fileData)
 
         # Use that metadata to group files (and extracted metadata) by
         # exposure.  Never parallelized because it's intrinsically a gather
         # step.
-        exposureData: List[RawExposureData] = self.groupByExposure(fileData)
+        with self.statistics.timer("groupByExposure", items=len(fileData)):
+            exposureData: List[RawExposureData] = self.groupByExposure(fileData)
 
         # The next operation operates on RawExposureData instances (one at
         # a time) in-place and then returns the modified instance.  We call it
@@ -452,7 +1275,194 @@ class RawIngestTask(Task):
         # SELECTs), so if there's going to be a problem with connections vs.
         # multiple processes, or lock contention (in SQLite) slowing things
         # down, it'll happen here.
-        return mapFunc(self.expandDataIds, exposureData), bad_files
+        expanded = mapFunc(self.expandDataIds, exposureData)
+        return self.statistics.timeIterator("expandDataIds", expanded), bad_files
+
+    def _filterBadFiles(self, fileData: Iterable[RawFileData], bad_files: List[str]
+                        ) -> Iterator[RawFileData]:
+        """Yield only the files from which metadata could be extracted.
+
+        Parameters
+        ----------
+        fileData : iterable of `RawFileData`
+            File-level information, as returned by `extractMetadata`.
+        bad_files : `list` of `str`
+            List that the names of files with no datasets are appended to.
+
+        Yields
+        ------
+        fileDatum : `RawFileData`
+            File-level information with at least one dataset.
+        """
+        n_good = 0
+        for fileDatum in fileData:
+            if not fileDatum.datasets:
+                bad_files.append(fileDatum.filename)
+            else:
+                n_good += 1
+                yield fileDatum
+
+        self.log.info("Successfully extracted metadata from %d file%s with %d failure%s",
+                      n_good, "" if n_good == 1 else "s",
+                      len(bad_files), "" if len(bad_files) == 1 else "s")
+
+    def _iterExistingRefs(self, run: Optional[str]) -> Iterator[DatasetRef]:
+        """Iterate over the raw datasets already in the collections this
+        ingest would write to.
+
+        Parameters
+        ----------
+        run : `str` or `None`
+            RUN collection passed to `run`.  If `None`, each instrument's
+            default raw collection is searched for that instrument's raws, as
+            that is where `run` would put them.
+
+        Yields
+        ------
+        ref : `lsst.daf.butler.DatasetRef`
+            Reference to an existing raw dataset.
+
+        Notes
+        -----
+        One query is made for each instrument in the registry, constrained
+        to that instrument and its target collection.
+        """
+        for record in self.butler.registry.queryDimensionRecords("instrument"):
+            try:
+                if run is None:
+                    collection = self._getInstrument(record.name).makeDefaultRawIngestRunName()
+                else:
+                    collection = run
+                refs = list(self.butler.registry.queryDatasets(self.datasetType.name,
+                                                               collections=[collection],
+                                                               instrument=record.name))
+            except (LookupError, ImportError, MissingCollectionError):
+                # Instrument class not importable, or dataset type or
+                # collection not registered yet; nothing from this
+                # instrument has been ingested where we would put it.
+                continue
+            yield from refs
+
+    def _queryExistingDataIds(self, run: Optional[str]) -> Set[Tuple[str, int, int]]:
+        """Return the data IDs of all raw datasets already in the collections
+        this ingest would write to.
+
+        Parameters
+        ----------
+        run : `str` or `None`
+            RUN collection passed to `run`; see `_iterExistingRefs`.
+
+        Returns
+        -------
+        dataIds : `set` of `tuple` [`str`, `int`, `int`]
+            Set of (instrument, exposure, detector) tuples.
+        """
+        existing = {(ref.dataId["instrument"], ref.dataId["exposure"], ref.dataId["detector"])
+                    for ref in self._iterExistingRefs(run)}
+        self.log.info("Found %d existing raw dataset%s that will not be re-ingested.",
+                      len(existing), "" if len(existing) == 1 else "s")
+        return existing
+
+    def _iterExistingPaths(self, run: Optional[str]) -> Iterator[str]:
+        """Iterate over the local paths of the raw files already in the
+        collections this ingest would write to.
+
+        Parameters
+        ----------
+        run : `str` or `None`
+            RUN collection passed to `run`; see `_iterExistingRefs`.
+
+        Yields
+        ------
+        path : `str`
+            Absolute path of an existing raw file.  Files that are not on a
+            local filesystem are skipped.
+
+        Notes
+        -----
+        The datastore's file records are read in a single query and matched
+        to the existing raws by dataset ID.  Datastores that do not keep such
+        records fall back to asking the butler for each dataset's URI.
+        """
+        refs = list(self._iterExistingRefs(run))
+        if not refs:
+            return
+        datastore = self.butler.datastore
+        table = getattr(datastore, "_table", None)
+        if table is None:
+            uris = (self.butler.getURI(ref) for ref in refs)
+        else:
+            ids = {ref.id for ref in refs}
+            uris = []
+            for record in table.fetch():
+                if record["dataset_id"] not in ids:
+                    continue
+                uri = ButlerURI(record["path"], forceAbsolute=False)
+                if not uri.scheme:
+                    # Paths of files transferred into the datastore are
+                    # relative to its root.
+                    uri = datastore.root.join(record["path"])
+                uris.append(uri)
+        for uri in uris:
+            if uri.scheme in ("", "file"):
+                yield os.path.abspath(uri.ospath)
+
+    def _filterExistingPaths(self, files: List[str], run: Optional[str]) -> List[str]:
+        """Drop files that are already in the datastore at their current
+        location, before their headers are read.
+
+        Only meaningful when ``config.transfer`` is "direct" or `None`, so that
+        the datastore refers to ingested files where they are.
+
+        Parameters
+        ----------
+        files : `list` of `str`
+            Paths to the files to be ingested.
+        run : `str` or `None`
+            RUN collection passed to `run`; see `_iterExistingRefs`.
+
+        Returns
+        -------
+        remaining : `list` of `str`
+            Files that are not already in the datastore, in their original
+            order.
+        """
+        paths = set(self._iterExistingPaths(run))
+        remaining = [f for f in files if os.path.abspath(f) not in paths]
+        n_skipped = len(files) - len(remaining)
+        if n_skipped:
+            self.log.info("Skipped %d already-ingested file%s before reading headers.",
+                          n_skipped, "" if n_skipped == 1 else "s")
+        return remaining
+
+    def _filterExisting(self, fileData: Iterable[RawFileData], existing: Set[Tuple[str, int, int]]
+                        ) -> Iterator[RawFileData]:
+        """Yield only the files with at least one dataset that is not already
+        in the registry.
+
+        Parameters
+        ----------
+        fileData : iterable of `RawFileData`
+            File-level information with at least one dataset each.
+        existing : `set` of `tuple` [`str`, `int`, `int`]
+            Existing (instrument, exposure, detector) data IDs, as returned
+            by `_queryExistingDataIds`.
+
+        Yields
+        ------
+        fileDatum : `RawFileData`
+            File-level information for files that still need to be ingested.
+        """
+        n_skipped = 0
+        for fileDatum in fileData:
+            if all((d.dataId["instrument"], d.dataId["exposure"], d.dataId["detector"]) in existing
+                   for d in fileDatum.datasets):
+                n_skipped += 1
+                self.log.debug("Skipping already-ingested file %s", fileDatum.filename)
+            else:
+                yield fileDatum
+        if n_skipped:
+            self.log.info("Skipped %d already-ingested file%s.", n_skipped, "" if n_skipped == 1 else "s")
 
     def ingestExposureDatasets(self, exposure: RawExposureData, *, run: Optional[str] = None
                                ) -> List[DatasetRef]:
@@ -473,14 +1483,233 @@ class RawIngestTask(Task):
         refs : `list` of `lsst.daf.butler.DatasetRef`
             Dataset references for ingested raws.
         """
-        datasets = [FileDataset(path=os.path.abspath(file.filename),
-                                refs=[DatasetRef(self.datasetType, d.dataId) for d in file.datasets],
-                                formatter=file.FormatterClass)
-                    for file in exposure.files]
-        self.butler.ingest(*datasets, transfer=self.config.transfer, run=run)
+        datasets = self._makeFileDatasets(exposure)
+        transfer = self._getTransfer(exposure)
+        with self.statistics.timer("ingest", items=len(datasets),
+                                   nbytes=self._countTransferBytes(datasets, transfer)):
+            self.butler.ingest(*datasets, transfer=transfer, run=run)
         return [ref for dataset in datasets for ref in dataset.refs]
 
-    def run(self, files, *, pool: Optional[Pool] = None, processes: int = 1, run: Optional[str] = None):
+    def _makeFileDatasets(self, exposure: RawExposureData) -> List[FileDataset]:
+        """Construct the `FileDataset` instances for all raw files in one
+        exposure.
+
+        Parameters
+        ----------
+        exposure : `RawExposureData`
+            A structure containing information about the exposure to be
+            ingested.  All data ID attributes must be expanded.
+
+        Returns
+        -------
+        datasets : `list` of `lsst.daf.butler.FileDataset`
+            Structures to pass to `lsst.daf.butler.Butler.ingest`.
+        """
+        return [FileDataset(path=exposure.staged.get(file.filename, os.path.abspath(file.filename)),
+                            refs=[DatasetRef(self.datasetType, d.dataId) for d in file.datasets],
+                            formatter=file.FormatterClass)
+                for file in exposure.files]
+
+    def _getTransfer(self, exposure: RawExposureData) -> Optional[str]:
+        """Return the transfer mode to use for the files of one exposure.
+
+        Staged copies are hard-linked into the datastore, so that they are
+        still available to retry with if the transaction is rolled back.
+        """
+        return "hardlink" if exposure.staged else self.config.transfer
+
+    def _countTransferBytes(self, datasets: Iterable[FileDataset], transfer: Optional[str]) -> int:
+        """Return the number of bytes that ingesting the given datasets will
+        transfer, for statistics reporting.
+        """
+        if transfer in (None, "direct", "hardlink"):
+            return 0
+        return sum(os.path.getsize(dataset.path) for dataset in datasets)
+
+    def _stageExposure(self, exposure: RawExposureData, directory: str,
+                       copyPool: Optional[ThreadPool] = None) -> Dict[str, str]:
+        """Copy the files of one exposure into a staging directory.
+
+        Called in a background thread; must not touch the registry.
+
+        Parameters
+        ----------
+        exposure : `RawExposureData`
+            Exposure whose files should be copied.
+        directory : `str`
+            Existing, empty directory to copy them into.
+        copyPool : `multiprocessing.pool.ThreadPool`, optional
+            Pool used to copy the files concurrently.  If `None`, they are
+            copied one at a time.
+
+        Returns
+        -------
+        staged : `dict` [`str`, `str`]
+            Paths of the copies, keyed by `RawFileData.filename`.
+        """
+        start = time.perf_counter()
+        # Only the extension matters to the datastore; the index keeps files
+        # with the same base name apart.
+        staged = {file.filename: os.path.join(directory, f"{i}-{os.path.basename(file.filename)}")
+                  for i, file in enumerate(exposure.files)}
+        mapFunc = map if copyPool is None else copyPool.imap_unordered
+        nbytes = sum(mapFunc(_copyFile, staged.items()))
+        self.statistics.record("stage", time.perf_counter() - start, items=len(staged), nbytes=nbytes)
+        return staged
+
+    def _stageAhead(self, exposureData: Iterable[RawExposureData]) -> Iterator[RawExposureData]:
+        """Stage the files of upcoming exposures in the background while the
+        caller ingests earlier ones.
+
+        Parameters
+        ----------
+        exposureData : iterable of `RawExposureData`
+            Exposures to stage.
+
+        Yields
+        ------
+        exposure : `RawExposureData`
+            The same exposures, in order, with `RawExposureData.staged`
+            populated if staging succeeded.  Staged copies are deleted once
+            ``config.exposureBatchSize`` further exposures have been
+            requested (or the iterator is closed), so the caller must be done
+            with each batch of exposures by the time it asks for the next.
+        """
+        root = self.config.stagingDirectory
+        os.makedirs(root, exist_ok=True)
+        pool = ThreadPool(self.config.stagingDepth)
+        copyPool = ThreadPool(self.config.transferThreads) if self.config.transferThreads > 1 else None
+        # Exposures being staged, and exposures handed to the caller whose
+        # staged copies may still be in use.
+        pending = deque()
+        inUse = deque()
+        try:
+            for exposure in exposureData:
+                directory = tempfile.mkdtemp(dir=root, prefix=f"exposure{exposure.record.id}-")
+                pending.append((exposure, directory,
+                                pool.apply_async(self._stageExposure, (exposure, directory, copyPool))))
+                if len(pending) > self.config.stagingDepth:
+                    yield self._finishStaging(pending.popleft(), inUse)
+            while pending:
+                yield self._finishStaging(pending.popleft(), inUse)
+        finally:
+            # Let copies in progress finish, so nothing is written to the
+            # staging directories after they have been removed.
+            pool.close()
+            pool.join()
+            if copyPool is not None:
+                copyPool.close()
+                copyPool.join()
+            for exposure, directory, *_ in itertools.chain(pending, inUse):
+                exposure.staged = {}
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def _finishStaging(self, entry: Tuple[RawExposureData, str, Any],
+                       inUse: Deque[Tuple[RawExposureData, str]]) -> RawExposureData:
+        """Wait for one exposure to be staged, and release the staged copies
+        of exposures the caller must be done with.
+        """
+        exposure, directory, result = entry
+        try:
+            with self.statistics.timer("stageWait"):
+                exposure.staged = result.get()
+        except Exception as e:
+            # Fall back to a regular ingest, which will report any problem
+            # with the files themselves.
+            self.log.warning("Could not stage files for exposure %s:%s; copying during ingest instead: %s",
+                             exposure.record.instrument, exposure.record.obs_id, e)
+        while len(inUse) >= self.config.exposureBatchSize:
+            done, doneDirectory = inUse.popleft()
+            done.staged = {}
+            shutil.rmtree(doneDirectory, ignore_errors=True)
+        inUse.append((exposure, directory))
+        return exposure
+
+    def _getRunName(self, exposure: RawExposureData, run: Optional[str], runs: Set[str]) -> str:
+        """Return the RUN collection an exposure should be ingested into,
+        registering it first if necessary.
+
+        Parameters
+        ----------
+        exposure : `RawExposureData`
+            A structure containing information about the exposure to be
+            ingested.
+        run : `str` or `None`
+            Name of the RUN collection passed to `run`; if `None`, the
+            instrument's default raw collection is used.
+        runs : `set` of `str`
+            RUN collections already registered by this invocation.  Updated
+            in place.
+
+        Returns
+        -------
+        this_run : `str`
+            Name of the RUN collection.
+        """
+        # Override default run if nothing specified explicitly
+        if run is None:
+            instrumentClass = exposure.files[0].instrumentClass
+            this_run = instrumentClass.makeDefaultRawIngestRunName()
+        else:
+            this_run = run
+        if this_run not in runs:
+            self.butler.registry.registerCollection(this_run, type=CollectionType.RUN)
+            runs.add(this_run)
+        return this_run
+
+    def _ingestExposureBatch(self, exposures: List[RawExposureData], *, run: Optional[str],
+                             runs: Set[str], journal: Optional[IngestJournal] = None
+                             ) -> Optional[List[DatasetRef]]:
+        """Ingest several exposures within a single transaction.
+
+        Parameters
+        ----------
+        exposures : `list` of `RawExposureData`
+            Structures containing information about the exposures to be
+            ingested, with all data ID attributes expanded.
+        run : `str` or `None`
+            Name of the RUN collection passed to `run`.
+        runs : `set` of `str`
+            RUN collections already registered by this invocation.  Updated
+            in place.
+        journal : `IngestJournal`, optional
+            Journal in which to record files as transferred.
+
+        Returns
+        -------
+        refs : `list` of `lsst.daf.butler.DatasetRef` or `None`
+            Dataset references for ingested raws, or `None` if the batch
+            failed and nothing was ingested.
+
+        Notes
+        -----
+        Unlike the one-exposure-at-a-time path in `run`, exposure records are
+        inserted rather than synced, so a batch containing an exposure that is
+        already registered fails as a whole.  Callers are expected to fall
+        back to ingesting the exposures individually in that case.
+        """
+        datasetsByRun = defaultdict(list)
+        for exposure in exposures:
+            key = (self._getRunName(exposure, run, runs), self._getTransfer(exposure))
+            datasetsByRun[key].extend(self._makeFileDatasets(exposure))
+        for exposure in exposures:
+            self._recordExposure(journal, exposure, "transferred")
+        try:
+            with self.statistics.timer("transaction"), self.butler.transaction():
+                with self.statistics.timer("insertDimensionData", items=len(exposures)):
+                    self.butler.registry.insertDimensionData("exposure", *[e.record for e in exposures])
+                for (this_run, transfer), datasets in datasetsByRun.items():
+                    with self.statistics.timer("ingest", items=len(datasets),
+                                               nbytes=self._countTransferBytes(datasets, transfer)):
+                        self.butler.ingest(*datasets, transfer=transfer, run=this_run)
+        except Exception as e:
+            self.log.debug("Batch ingest of %d exposures failed; retrying individually: %s",
+                           len(exposures), e)
+            return None
+        return [ref for datasets in datasetsByRun.values() for dataset in datasets for ref in dataset.refs]
+
+    def run(self, files, *, pool: Optional[Union[Pool, WorkerPool]] = None, processes: int = 1,
+            run: Optional[str] = None, executor: str = "processes"):
         """Ingest files into a Butler data repository.
 
         This creates any new exposure or visit Dimension entries needed to
@@ -494,14 +1723,17 @@ class RawIngestTask(Task):
         files : iterable over `str` or path-like objects
             Paths to the files to be ingested.  Will be made absolute
             if they are not already.
-        pool : `multiprocessing.Pool`, optional
-            If not `None`, a process pool with which to parallelize some
-            operations.
+        pool : `multiprocessing.Pool` or `~lsst.obs.base.WorkerPool`, optional
+            If not `None`, a pool with which to parallelize some operations.
         processes : `int`, optional
             The number of processes to use.  Ignored if ``pool`` is not `None`.
         run : `str`, optional
             Name of a RUN-type collection to write to, overriding
             the default derived from the instrument name.
+        executor : `str`, optional
+            Kind of pool to create if ``pool`` is `None` and ``processes`` is
+            greater than one; one of the keys of
+            `lsst.obs.base.workerPool.EXECUTORS`.
 
         Returns
         -------
@@ -516,10 +1748,453 @@ class RawIngestTask(Task):
         (in its own transaction), which inserts only if a record with the same
         primary key does not already exist.  This allows different files within
         the same exposure to be incremented in different runs.
+
+        Per-stage timers and counters for the most recent call are available
+        afterwards as the `statistics` attribute (an `IngestStatistics`), and
+        are appended to ``config.statisticsFile`` if that is set.
+
+        If ``config.exposureBatchSize`` is greater than one, exposure records
+        and datasets for that many exposures are instead inserted together in
+        a single transaction.  A batch that fails for any reason is rolled back
+        and its exposures are retried one at a time as described above, so
+        failures are still reported per exposure.
+
+        If ``config.skipExisting`` is set, files whose datasets already exist
+        in ``run`` are dropped before they reach this stage, instead of
+        causing their exposure's ingest to fail.
+
+        If ``config.streamingWindow`` is set, exposures are ingested as soon as
+        they are complete instead of after metadata has been extracted from
+        all files, so the first exposures are written while later files are
+        still being read.
+
+        If ``config.stagingDirectory`` is set and ``config.transfer`` is
+        "copy", the files of the next ``config.stagingDepth`` exposures are
+        copied in background threads while the current exposure's registry
+        inserts run, with ``config.transferThreads`` threads copying the
+        files of each exposure concurrently.  The copies are hard-linked
+        into the datastore within the exposure's transaction, so a rollback
+        removes them from the datastore and leaves the staged copies
+        available for a retry, and they are deleted once the exposure has
+        been dealt with either way.
+
+        If ``config.journalFile`` is set, the status of each file is recorded
+        there as it is ingested, and files already committed by an earlier
+        run with the same journal are skipped.  If
+        ``config.journalRetryFailedOnly`` is also set, only files the journal
+        records as failed are ingested.
+        """
+        self.statistics = IngestStatistics()
+        journal = self._openJournal()
+        try:
+            if journal is not None:
+                files = self._filterJournaled(journal, files, run)
+            exposureData, bad_files = self.prep(files, pool=pool, processes=processes, run=run,
+                                                executor=executor)
+            return self._ingestExposures(exposureData, bad_files, run=run, journal=journal)
+        finally:
+            if journal is not None:
+                journal.close()
+
+    def _openJournal(self) -> Optional[IngestJournal]:
+        """Open the journal configured by ``config.journalFile``, if any.
+
+        Returns
+        -------
+        journal : `IngestJournal` or `None`
+            The journal, or `None` if ``config.journalFile`` is `None`.
+        """
+        if self.config.journalFile is None:
+            return None
+        journal = IngestJournal(self.config.journalFile)
+        counts = journal.counts()
+        if any(counts.values()):
+            self.log.info("Resuming from journal %s: %s.", self.config.journalFile,
+                          ", ".join(f"{n} {status}" for status, n in counts.items()))
+        return journal
+
+    def _filterJournaled(self, journal: IngestJournal, files: Iterable[str], run: Optional[str]
+                         ) -> List[str]:
+        """Drop files that a journal says need not be ingested again.
+
+        Parameters
+        ----------
+        journal : `IngestJournal`
+            Journal of earlier runs.
+        files : iterable of `str`
+            Paths to the files to be ingested.
+        run : `str` or `None`
+            RUN collection passed to `run`; see `_iterExistingRefs`.
+
+        Returns
+        -------
+        remaining : `list` of `str`
+            Files to ingest, honoring ``config.journalRetryFailedOnly``.
+
+        Notes
+        -----
+        Files the journal records as "transferred" were being ingested when
+        an earlier run stopped, and their transaction may have been committed.
+        Their headers are read and those whose datasets are all in ``run``
+        are recorded as committed and dropped; the rest are retried.
+        """
+        files = list(files)
+        with self.statistics.timer("filterJournaled", items=len(files)):
+            remaining = journal.filterFiles(files, retryFailedOnly=self.config.journalRetryFailedOnly)
+            transferred = journal.selectFiles(remaining, "transferred")
+            if transferred:
+                ingested = self._findIngested(transferred, run)
+                if ingested:
+                    journal.record(ingested, "committed")
+                    remaining = [f for f in remaining if f not in ingested]
+                self.log.info("%d of %d file%s interrupted while being ingested %s already in the "
+                              "repository.", len(ingested), len(transferred),
+                              "" if len(transferred) == 1 else "s",
+                              "was" if len(ingested) == 1 else "were")
+        if len(remaining) < len(files):
+            n_skipped = len(files) - len(remaining)
+            self.log.info("Skipping %d file%s already dealt with according to the journal.",
+                          n_skipped, "" if n_skipped == 1 else "s")
+        return remaining
+
+    def _findIngested(self, files: List[str], run: Optional[str]) -> Set[str]:
+        """Return the files whose datasets are all already in the repository.
+
+        Parameters
+        ----------
+        files : `list` of `str`
+            Paths to the files to check.
+        run : `str` or `None`
+            RUN collection passed to `run`; see `_iterExistingRefs`.
+
+        Returns
+        -------
+        ingested : `set` of `str`
+            Those of ``files`` with no datasets missing from the repository.
+            Files whose metadata cannot be read are never included.
+        """
+        existing = {(ref.dataId["instrument"], ref.dataId["exposure"], ref.dataId["detector"])
+                    for ref in self._iterExistingRefs(run)}
+        ingested = set()
+        for filename in files:
+            fileData = self.extractMetadata(filename)
+            if fileData.datasets and not any(self._filterExisting([fileData], existing)):
+                ingested.add(filename)
+        return ingested
+
+    def _recordExposure(self, journal: Optional[IngestJournal], exposure: RawExposureData, status: str,
+                        reason: Optional[str] = None) -> None:
+        """Record the status of all files of an exposure in a journal, if
+        there is one.
+        """
+        if journal is not None:
+            journal.record([f.filename for f in exposure.files], status,
+                           exposure=f"{exposure.record.instrument}:{exposure.record.obs_id}",
+                           reason=reason)
+
+    def dryRun(self, files, *, pool: Optional[Union[Pool, WorkerPool]] = None, processes: int = 1,
+               executor: str = "processes", scratchDirectory: Optional[str] = None) -> IngestStatistics:
+        """Measure how fast files would be ingested, without writing to the
+        data repository.
+
+        Parameters
+        ----------
+        files : iterable over `str` or path-like objects
+            Paths to the files that would be ingested.
+        pool : `multiprocessing.Pool` or `~lsst.obs.base.WorkerPool`, optional
+            If not `None`, a pool with which to parallelize some operations.
+        processes : `int`, optional
+            The number of processes to use.  Ignored if ``pool`` is not `None`.
+        executor : `str`, optional
+            Kind of pool to create if ``pool`` is `None` and ``processes`` is
+            greater than one; one of the keys of
+            `lsst.obs.base.workerPool.EXECUTORS`.
+        scratchDirectory : `str`, optional
+            If not `None`, also copy the files of each exposure into a
+            temporary directory here (using ``config.transferThreads``
+            threads) to simulate the transfer, deleting the copies
+            immediately afterwards.  Should be on the same filesystem as the
+            datastore for realistic numbers.
+
+        Returns
+        -------
+        statistics : `IngestStatistics`
+            Per-stage timers and counters; also available as the
+            `statistics` attribute, logged, and appended to
+            ``config.statisticsFile`` if that is set.
+
+        Notes
+        -----
+        This runs everything `run` does before the first registry write:
+        metadata extraction, grouping, and data ID expansion, which queries
+        the registry.  Nothing is inserted into the registry or datastore,
+        so a read-only butler is sufficient.
+        """
+        self.statistics = IngestStatistics()
+        exposureData, bad_files = self.prep(files, pool=pool, processes=processes, executor=executor)
+        copyPool = None
+        if scratchDirectory is not None:
+            os.makedirs(scratchDirectory, exist_ok=True)
+            if self.config.transferThreads > 1:
+                copyPool = ThreadPool(self.config.transferThreads)
+        n_exposures = 0
+        n_files = 0
+        try:
+            for exposure in exposureData:
+                n_exposures += 1
+                n_files += len(exposure.files)
+                if scratchDirectory is not None:
+                    directory = tempfile.mkdtemp(dir=scratchDirectory, prefix="dryRun-")
+                    try:
+                        # Timed as the "stage" step, like real staging.
+                        self._stageExposure(exposure, directory, copyPool)
+                    finally:
+                        shutil.rmtree(directory, ignore_errors=True)
+        finally:
+            if copyPool is not None:
+                copyPool.close()
+                copyPool.join()
+        self.log.info("Dry run: %d file%s in %d exposure%s would be ingested; %d file%s could not be read.",
+                      n_files, "" if n_files == 1 else "s", n_exposures, "" if n_exposures == 1 else "s",
+                      len(bad_files), "" if len(bad_files) == 1 else "s")
+        self.statistics.log(self.log)
+        if self.config.statisticsFile is not None:
+            self.statistics.writeJson(self.config.statisticsFile, dry_run=True, n_files=n_files,
+                                      n_files_failed=len(bad_files), n_exposures=n_exposures)
+        return self.statistics
+
+    def runFromManifest(self, manifest: str, *, run: Optional[str] = None) -> List[DatasetRef]:
+        """Ingest the files listed in a manifest, using the metadata it
+        provides instead of reading their headers.
+
+        Parameters
+        ----------
+        manifest : `str`
+            Name of a JSON, CSV or Parquet manifest; see
+            `lsst.obs.base.ingestManifest` for the recognized columns.
+        run : `str`, optional
+            Name of a RUN-type collection to write to, overriding
+            the default derived from the instrument name.
+
+        Returns
+        -------
+        refs : `list` of `lsst.daf.butler.DatasetRef`
+            Dataset references for ingested raws.
+
+        Raises
+        ------
+        ValueError
+            Raised if the manifest could not be read or is missing required
+            columns.
+        RuntimeError
+            Raised if any file or exposure could not be ingested.
+
+        Notes
+        -----
+        Apart from how metadata is obtained, this behaves exactly like `run`;
+        ``config.skipExisting``, ``config.exposureBatchSize``,
+        ``config.streamingWindow``, ``config.stagingDirectory``,
+        ``config.journalFile`` and ``config.statisticsFile`` are all honored.
+        Files listed in the manifest are checked for existence but not
+        opened, so the metadata is trusted as given, and there is nothing to
+        parallelize.
+        """
+        self.statistics = IngestStatistics()
+        with self.statistics.timer("readManifest"):
+            rows = readManifest(manifest)
+        self.log.info("Read %d entr%s from manifest %s.", len(rows), "y" if len(rows) == 1 else "ies",
+                      manifest)
+        journal = self._openJournal()
+        try:
+            if journal is not None:
+                remaining = set(self._filterJournaled(journal, [row["path"] for row in rows], run))
+                rows = [row for row in rows if row["path"] in remaining]
+            existing = None
+            if self.config.skipExisting:
+                with self.statistics.timer("queryExisting"):
+                    existing = self._queryExistingDataIds(run)
+            fileData = self.statistics.timeIterator("extractMetadata", self.extractManifestMetadata(rows))
+            exposureData, bad_files = self._prepFileData(fileData, existing=existing)
+            return self._ingestExposures(exposureData, bad_files, run=run, journal=journal)
+        finally:
+            if journal is not None:
+                journal.close()
+
+    def runSharded(self, files, queueFile: str, *, shard: int, nShards: int,
+                   pool: Optional[Union[Pool, WorkerPool]] = None, processes: int = 1,
+                   run: Optional[str] = None, executor: str = "processes") -> List[DatasetRef]:
+        """Ingest one shard of a set of files that several independent
+        processes, possibly on different hosts, are ingesting together.
+
+        Parameters
+        ----------
+        files : iterable over `str` or path-like objects
+            Paths to all of the files to be ingested by all shards.  Every
+            shard must be given the same files (in any order).
+        queueFile : `str`
+            Path to the SQLite file holding the work queue shared by all
+            shards; created if it does not exist.  Must be on a filesystem
+            that every shard can see and that supports POSIX locks.
+        shard : `int`
+            Index of this shard, in ``[0, nShards)``.
+        nShards : `int`
+            Total number of shards.
+        pool : `multiprocessing.Pool` or `~lsst.obs.base.WorkerPool`, optional
+            If not `None`, a pool with which to parallelize metadata
+            extraction within this shard.
+        processes : `int`, optional
+            The number of processes to use.  Ignored if ``pool`` is not `None`.
+        run : `str`, optional
+            Name of a RUN-type collection to write to, overriding
+            the default derived from the instrument name.
+        executor : `str`, optional
+            Kind of pool to create if ``pool`` is `None` and ``processes`` is
+            greater than one; one of the keys of
+            `lsst.obs.base.workerPool.EXECUTORS`.
+
+        Returns
+        -------
+        refs : `list` of `lsst.daf.butler.DatasetRef`
+            Dataset references for the raws ingested by this shard.
+
+        Raises
+        ------
+        ValueError
+            Raised if ``shard`` is not in ``[0, nShards)``, or if another
+            shard was given different files.
+        RuntimeError
+            Raised if any file or exposure assigned to this shard could not
+            be ingested.
+
+        Notes
+        -----
+        Metadata extraction is shared dynamically: each shard claims
+        ``config.shardClaimSize`` files at a time from the queue and stores
+        the metadata it extracts there.  Once all ``nShards`` shards have
+        added their files to the queue and every file has been extracted,
+        each shard ingests only the exposures assigned to it by
+        `lsst.obs.base._ingestQueue.shardOf`, a stable hash of the exposure,
+        so exposures are never split between shards and no two shards sync
+        the same exposure record.  Each shard must therefore wait for the
+        slowest to finish extracting; claims older than
+        ``config.shardStaleAfter`` seconds are taken over, so a shard that
+        dies only delays the others.
+
+        Metadata already stored in the queue is reused, so rerunning every
+        shard with the same queue file and files after a failure skips
+        extraction; combine this with ``config.skipExisting`` or
+        ``config.journalFile`` to skip the exposures that were ingested, too.
+        A different set of files needs a new queue file.
+        ``config.metadataCacheFile``, ``config.localityOrder`` and
+        ``config.compactTransport`` are ignored.
+        """
+        if not 0 <= shard < nShards:
+            raise ValueError(f"Shard index {shard} is not in [0, {nShards}).")
+        # Set up multiprocessing, if desired, making sure any pool we create
+        # is shut down when we are done with it.
+        if pool is None and processes > 1:
+            with WorkerPool(processes, executor, butler=self.butler) as pool:
+                return self.runSharded(files, queueFile, shard=shard, nShards=nShards, pool=pool, run=run)
+        self.statistics = IngestStatistics()
+        journal = self._openJournal()
+        try:
+            with IngestWorkQueue(queueFile) as queue:
+                files = list(files)
+                with self.statistics.timer("queueFiles", items=len(files)):
+                    queue.register(shard, nShards, files)
+                self._extractQueued(queue, shard, nShards, pool)
+                with self.statistics.timer("loadShard"):
+                    fileData = queue.loadShard(shard, nShards)
+            if journal is not None:
+                # Journals are per shard, so they are only consulted once
+                # each shard knows which files are its own.
+                remaining = set(self._filterJournaled(journal, [data.filename for data in fileData], run))
+                fileData = [data for data in fileData if data.filename in remaining]
+            self.log.info("Shard %d of %d will ingest %d file%s.", shard, nShards,
+                          len(fileData), "" if len(fileData) == 1 else "s")
+            existing = None
+            if self.config.skipExisting:
+                with self.statistics.timer("queryExisting"):
+                    existing = self._queryExistingDataIds(run)
+            exposureData, bad_files = self._prepFileData(fileData, existing=existing)
+            return self._ingestExposures(exposureData, bad_files, run=run, journal=journal)
+        finally:
+            if journal is not None:
+                journal.close()
+
+    def _extractQueued(self, queue: IngestWorkQueue, shard: int, nShards: int,
+                       pool: Optional[Union[Pool, WorkerPool]] = None) -> None:
+        """Extract metadata from files claimed from a work queue until every
+        shard has registered its files and no unextracted files remain.
+
+        Parameters
+        ----------
+        queue : `IngestWorkQueue`
+            Queue shared by all shards.
+        shard : `int`
+            Index of this shard.
+        nShards : `int`
+            Total number of shards.
+        pool : `multiprocessing.Pool` or `~lsst.obs.base.WorkerPool`, optional
+            If not `None`, a pool with which to parallelize extraction.
+        """
+        waiting = False
+        while True:
+            with self.statistics.timer("claimFiles"):
+                paths = queue.claim(shard, self.config.shardClaimSize, self.config.shardStaleAfter)
+            if paths:
+                waiting = False
+                if pool is None:
+                    fileData = map(self.extractMetadata, paths)
+                else:
+                    fileData = pool.imap_unordered(self.extractMetadata, paths,
+                                                   chunksize=self.config.extractChunkSize)
+                queue.store(shard, self.statistics.timeIterator("extractMetadata", fileData))
+                continue
+            with self.statistics.timer("waitForShards"):
+                n_unregistered = queue.countUnregistered(nShards)
+                n_remaining = queue.countRemaining()
+                if n_unregistered == 0 and n_remaining == 0:
+                    return
+                if not waiting:
+                    self.log.info("Waiting for %d other shard%s to start and for metadata to be "
+                                  "extracted from %d file%s.",
+                                  n_unregistered, "" if n_unregistered == 1 else "s",
+                                  n_remaining, "" if n_remaining == 1 else "s")
+                    waiting = True
+                time.sleep(self.config.shardPollInterval)
+
+    def _ingestExposures(self, exposureData: Iterable[RawExposureData], bad_files: List[str], *,
+                         run: Optional[str] = None,
+                         journal: Optional[IngestJournal] = None) -> List[DatasetRef]:
+        """Register and ingest prepared exposures, and report on the outcome.
+
+        Parameters
+        ----------
+        exposureData : iterable of `RawExposureData`
+            Expanded exposure-level data, as returned by `prep`.
+        bad_files : `list` of `str`
+            Files that could not have metadata extracted.  Only inspected
+            after ``exposureData`` has been exhausted.
+        run : `str`, optional
+            Name of a RUN-type collection to write to, overriding
+            the default derived from the instrument name.
+        journal : `IngestJournal`, optional
+            Journal in which to record the status of each file.
+
+        Returns
+        -------
+        refs : `list` of `lsst.daf.butler.DatasetRef`
+            Dataset references for ingested raws.
+
+        Raises
+        ------
+        RuntimeError
+            Raised if any file or exposure could not be ingested.
         """
-        exposureData, bad_files = self.prep(files, pool=pool, processes=processes)
         # Up to this point, we haven't modified the data repository at all.
-        # Now we finally do that, with one transaction per exposure.  This is
+        # Now we finally do that, with one transaction per exposure (or per
+        # batch of exposures, if config.exposureBatchSize > 1).  This is
         # not parallelized at present because the performance of this step is
         # limited by the database server.  That may or may not change in the
         # future once we increase our usage of bulk inserts and reduce our
@@ -527,48 +2202,72 @@ class RawIngestTask(Task):
         # operations done in advance to reduce the time spent inside
         # transactions.
         self.butler.registry.registerDatasetType(self.datasetType)
+        if self.config.stagingDirectory is not None:
+            if self.config.transfer == "copy":
+                # Copy the files for the next exposures while this one's
+                # registry inserts are running.
+                exposureData = self._stageAhead(exposureData)
+            else:
+                self.log.warning("Ignoring stagingDirectory because transfer is %r, not 'copy'.",
+                                 self.config.transfer)
         refs = []
         runs = set()
         n_exposures = 0
         n_exposures_failed = 0
         n_ingests_failed = 0
-        for exposure in exposureData:
-
-            self.log.debug("Attempting to ingest %d file%s from exposure %s:%s",
-                           len(exposure.files), "" if len(exposure.files) == 1 else "s",
-                           exposure.record.instrument, exposure.record.obs_id)
-
-            try:
-                self.butler.registry.syncDimensionData("exposure", exposure.record)
-            except Exception as e:
-                n_exposures_failed += 1
-                self.log.warning("Exposure %s:%s could not be registered: %s",
-                                 exposure.record.instrument, exposure.record.obs_id, e)
-                continue
-
-            # Override default run if nothing specified explicitly
-            if run is None:
-                instrumentClass = exposure.files[0].instrumentClass
-                this_run = instrumentClass.makeDefaultRawIngestRunName()
-            else:
-                this_run = run
-            if this_run not in runs:
-                self.butler.registry.registerCollection(this_run, type=CollectionType.RUN)
-                runs.add(this_run)
-            try:
-                with self.butler.transaction():
-                    refs.extend(self.ingestExposureDatasets(exposure, run=this_run))
-            except Exception as e:
-                n_ingests_failed += 1
-                self.log.warning("Failed to ingest the following for reason: %s", e)
-                for f in exposure.files:
-                    self.log.warning("- %s", f.filename)
-                continue
-
-            # Success for this exposure
-            n_exposures += 1
-            self.log.info("Exposure %s:%s ingested successfully",
-                          exposure.record.instrument, exposure.record.obs_id)
+        for batch in _chunks(exposureData, self.config.exposureBatchSize):
+
+            for exposure in batch:
+                self._recordExposure(journal, exposure, "extracted")
+
+            if len(batch) > 1:
+                batchRefs = self._ingestExposureBatch(batch, run=run, runs=runs, journal=journal)
+                if batchRefs is not None:
+                    for exposure in batch:
+                        self._recordExposure(journal, exposure, "committed")
+                    refs.extend(batchRefs)
+                    n_exposures += len(batch)
+                    for exposure in batch:
+                        self.log.info("Exposure %s:%s ingested successfully",
+                                      exposure.record.instrument, exposure.record.obs_id)
+                    continue
+
+            for exposure in batch:
+
+                self.log.debug("Attempting to ingest %d file%s from exposure %s:%s",
+                               len(exposure.files), "" if len(exposure.files) == 1 else "s",
+                               exposure.record.instrument, exposure.record.obs_id)
+
+                try:
+                    with self.statistics.timer("syncDimensionData", items=1):
+                        self.butler.registry.syncDimensionData("exposure", exposure.record)
+                except Exception as e:
+                    n_exposures_failed += 1
+                    self.log.warning("Exposure %s:%s could not be registered: %s",
+                                     exposure.record.instrument, exposure.record.obs_id, e)
+                    self._recordExposure(journal, exposure, "failed",
+                                         reason=f"Exposure could not be registered: {e}")
+                    continue
+
+                this_run = self._getRunName(exposure, run, runs)
+                self._recordExposure(journal, exposure, "transferred")
+                try:
+                    with self.statistics.timer("transaction"), self.butler.transaction():
+                        exposureRefs = self.ingestExposureDatasets(exposure, run=this_run)
+                except Exception as e:
+                    n_ingests_failed += 1
+                    self._recordExposure(journal, exposure, "failed", reason=str(e))
+                    self.log.warning("Failed to ingest the following for reason: %s", e)
+                    for f in exposure.files:
+                        self.log.warning("- %s", f.filename)
+                    continue
+
+                # Success for this exposure
+                self._recordExposure(journal, exposure, "committed")
+                refs.extend(exposureRefs)
+                n_exposures += 1
+                self.log.info("Exposure %s:%s ingested successfully",
+                              exposure.record.instrument, exposure.record.obs_id)
 
         had_failure = False
 
@@ -577,6 +2276,8 @@ class RawIngestTask(Task):
             self.log.warning("Could not extract observation metadata from the following:")
             for f in bad_files:
                 self.log.warning("- %s", f)
+            if journal is not None:
+                journal.record(bad_files, "failed", reason="Could not extract observation metadata")
 
         self.log.info("Successfully processed data from %d exposure%s with %d failure%s from exposure"
                       " registration and %d failure%s from file ingest.",
@@ -588,6 +2289,12 @@ class RawIngestTask(Task):
         self.log.info("Ingested %d distinct Butler dataset%s",
                       len(refs), "" if len(refs) == 1 else "s")
 
+        self.statistics.log(self.log)
+        if self.config.statisticsFile is not None:
+            self.statistics.writeJson(self.config.statisticsFile, n_files_failed=len(bad_files),
+                                      n_exposures=n_exposures, n_exposures_failed=n_exposures_failed,
+                                      n_ingests_failed=n_ingests_failed, n_datasets=len(refs))
+
         if had_failure:
             raise RuntimeError("Some failures encountered during ingestion")
 
@@ -0,0 +1,230 @@
+# This file is part of obs_base.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Reading of ingest manifests: lists of raw files together with metadata
+that has already been extracted from them, typically by the acquisition
+system that wrote them.
+
+A manifest is a table with one row per file.  It may be stored as JSON (a
+list of objects, one per row), CSV (with a header line), or Parquet (which
+requires ``pyarrow``).  The format is chosen from the file extension.  The
+recognized columns are the keys of `MANIFEST_COLUMNS`; any other columns are
+ignored.
+"""
+
+__all__ = ("MANIFEST_COLUMNS", "REQUIRED_MANIFEST_COLUMNS", "readManifest", "makeManifestObservationInfo")
+
+import csv
+import json
+import numbers
+import os.path
+from typing import Any, Callable, Dict, List, Mapping
+
+import astropy.units as u
+from astropy.coordinates import AltAz, Angle, SkyCoord
+from astropy.time import Time
+from astro_metadata_translator import ObservationInfo
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+def _taiTime(value: Any) -> Time:
+    """Convert a manifest date (an ISO string, `datetime.datetime`, or
+    number of TAI seconds since 1970-01-01T00:00:00 TAI) to a TAI
+    `~astropy.time.Time`.
+    """
+    if isinstance(value, str):
+        # CSV manifests provide every value as a string.
+        try:
+            value = float(value)
+        except ValueError:
+            return Time(value, scale="tai")
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        return Time(value, format="unix_tai", scale="tai")
+    return Time(value, scale="tai")
+
+
+MANIFEST_COLUMNS = {
+    "path": (str, "Path to the file; relative paths are relative to the manifest."),
+    "instrument": (str, "Short name of the instrument."),
+    "exposure_id": (int, "Integer exposure ID."),
+    "detector_num": (int, "Integer detector ID."),
+    "observation_id": (str, "Unique observation ID (the exposure's obs_id)."),
+    "observation_type": (str, "Type of observation, e.g. 'science' or 'bias'."),
+    "physical_filter": (str, "Name of the physical filter."),
+    "datetime_begin": (_taiTime, "Start of the exposure in TAI, as an ISO string or Unix TAI seconds."),
+    "datetime_end": (_taiTime, "End of the exposure in TAI, as an ISO string or Unix TAI seconds."),
+    "exposure_time": (float, "Exposure time in seconds."),
+    "dark_time": (float, "Dark time in seconds."),
+    "exposure_group": (str, "Name of the group the exposure belongs to."),
+    "visit_id": (int, "Integer ID of the group the exposure belongs to."),
+    "observing_day": (int, "Observing day, as YYYYMMDD."),
+    "observation_counter": (int, "Sequence number of the observation within the day."),
+    "observation_reason": (str, "Reason for the observation."),
+    "science_program": (str, "Science program the observation belongs to."),
+    "object": (str, "Name of the target."),
+    "tracking_ra": (float, "ICRS right ascension of the boresight, in degrees."),
+    "tracking_dec": (float, "ICRS declination of the boresight, in degrees."),
+    "boresight_rotation_angle": (float, "Boresight rotation angle, in degrees."),
+    "boresight_rotation_coord": (str, "Coordinate frame of the rotation angle ('sky' or 'unknown')."),
+    "altitude": (float, "Altitude of the boresight at the start of the exposure, in degrees."),
+    "azimuth": (float, "Azimuth of the boresight at the start of the exposure, in degrees."),
+}
+"""Columns understood in ingest manifests, mapped to their
+conversion functions and descriptions (`dict` [`str`, `tuple`]).
+
+All but ``path``, ``tracking_ra``/``tracking_dec`` and ``altitude``/
+``azimuth`` (which provide ``tracking_radec`` and ``altaz_begin``) are named
+after the `~astro_metadata_translator.ObservationInfo` properties they
+provide.
+"""
+
+REQUIRED_MANIFEST_COLUMNS = frozenset(("path", "instrument", "exposure_id", "detector_num",
+                                       "observation_id", "observation_type", "physical_filter",
+                                       "datetime_begin", "datetime_end", "exposure_time"))
+"""Columns that every manifest must have (`frozenset` [`str`]).
+
+These are the properties `RawIngestTask` requires when it reads headers
+itself.
+"""
+
+
+def _readJson(filename: str) -> List[Dict[str, Any]]:
+    with open(filename) as stream:
+        rows = json.load(stream)
+    if not isinstance(rows, list):
+        raise ValueError(f"JSON manifest {filename} must contain a list of objects.")
+    return rows
+
+
+def _readCsv(filename: str) -> List[Dict[str, Any]]:
+    with open(filename, newline="") as stream:
+        # Empty CSV fields mean "no value", not an empty string.
+        return [{k: (v if v != "" else None) for k, v in row.items()} for row in csv.DictReader(stream)]
+
+
+def _readParquet(filename: str) -> List[Dict[str, Any]]:
+    if pq is None:
+        raise ImportError(f"Reading Parquet manifest {filename} requires pyarrow.")
+    return pq.read_table(filename).to_pylist()
+
+
+_READERS: Dict[str, Callable[[str], List[Dict[str, Any]]]] = {
+    ".json": _readJson,
+    ".csv": _readCsv,
+    ".parquet": _readParquet,
+    ".parq": _readParquet,
+}
+
+
+def readManifest(filename: str) -> List[Dict[str, Any]]:
+    """Read and validate an ingest manifest.
+
+    Parameters
+    ----------
+    filename : `str`
+        Name of the manifest; the extension (".json", ".csv" or ".parquet")
+        determines the format.
+
+    Returns
+    -------
+    rows : `list` [`dict` [`str`, `object`]]
+        One dictionary per file, containing only recognized columns with
+        values converted as described by `MANIFEST_COLUMNS`.  Missing values
+        are `None`, and paths are absolute.
+
+    Raises
+    ------
+    ValueError
+        Raised if the format is not recognized, a required column is
+        missing, or a value cannot be converted.
+    ImportError
+        Raised if the manifest is a Parquet file and ``pyarrow`` is not
+        available.
+
+    Notes
+    -----
+    Validation is deliberately cheap: column names and value types are
+    checked, but the files themselves are not opened.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    reader = _READERS.get(ext)
+    if reader is None:
+        raise ValueError(f"Unrecognized manifest format {ext!r} for {filename}; "
+                         f"expected one of {sorted(_READERS)}.")
+    root = os.path.dirname(os.path.abspath(filename))
+    rows = []
+    for n, raw in enumerate(reader(filename)):
+        missing = {k for k in REQUIRED_MANIFEST_COLUMNS if raw.get(k) is None}
+        if missing:
+            raise ValueError(f"Row {n} of manifest {filename} is missing required column(s) "
+                             f"{sorted(missing)}.")
+        row = {}
+        for name, (pytype, _) in MANIFEST_COLUMNS.items():
+            value = raw.get(name)
+            if value is not None:
+                try:
+                    value = pytype(value)
+                except (TypeError, ValueError) as err:
+                    raise ValueError(f"Bad value {value!r} for column {name!r} in row {n} of "
+                                     f"manifest {filename}.") from err
+            row[name] = value
+        row["path"] = os.path.join(root, os.path.expanduser(row["path"]))
+        rows.append(row)
+    return rows
+
+
+def makeManifestObservationInfo(row: Mapping[str, Any]) -> ObservationInfo:
+    """Construct an `~astro_metadata_translator.ObservationInfo` from a
+    manifest row.
+
+    Parameters
+    ----------
+    row : `dict` [`str`, `object`]
+        A row returned by `readManifest`.
+
+    Returns
+    -------
+    obsInfo : `astro_metadata_translator.ObservationInfo`
+        Observation information with the properties provided by the row set,
+        and all others `None`.
+    """
+    kwargs = {}
+    for name in ("instrument", "exposure_id", "detector_num", "observation_id", "observation_type",
+                 "physical_filter", "datetime_begin", "datetime_end", "exposure_group", "visit_id",
+                 "observing_day", "observation_counter", "observation_reason", "science_program",
+                 "object", "boresight_rotation_coord"):
+        if row.get(name) is not None:
+            kwargs[name] = row[name]
+    for name in ("exposure_time", "dark_time"):
+        if row.get(name) is not None:
+            kwargs[name] = row[name]*u.s
+    if row.get("tracking_ra") is not None and row.get("tracking_dec") is not None:
+        kwargs["tracking_radec"] = SkyCoord(row["tracking_ra"], row["tracking_dec"], unit=u.deg,
+                                            frame="icrs")
+    if row.get("altitude") is not None and row.get("azimuth") is not None:
+        kwargs["altaz_begin"] = AltAz(alt=row["altitude"]*u.deg, az=row["azimuth"]*u.deg)
+    if row.get("boresight_rotation_angle") is not None:
+        kwargs["boresight_rotation_angle"] = Angle(row["boresight_rotation_angle"], unit=u.deg)
+    return ObservationInfo.makeObservationInfo(**kwargs)
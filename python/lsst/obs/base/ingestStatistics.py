@@ -0,0 +1,245 @@
+# This file is part of obs_base.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+__all__ = ("IngestStatistics", "StageStatistics")
+
+from contextlib import contextmanager
+import dataclasses
+import json
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+@dataclasses.dataclass
+class StageStatistics:
+    """Struct holding timers and counters for one stage of an ingest.
+    """
+
+    name: str
+    """Name of the stage (`str`).
+    """
+
+    seconds: float = 0.0
+    """Wall-clock time spent in this stage, excluding time spent in other
+    stages nested within it (`float`).
+    """
+
+    totalSeconds: float = 0.0
+    """Wall-clock time spent in this stage, including nested stages
+    (`float`).
+    """
+
+    calls: int = 0
+    """Number of times the stage was entered (e.g. number of database calls)
+    (`int`).
+    """
+
+    items: int = 0
+    """Number of items (files, exposures, ...) processed by the stage
+    (`int`).
+    """
+
+    bytes: int = 0
+    """Number of bytes processed (e.g. transferred) by the stage (`int`).
+    """
+
+    @property
+    def itemsPerSecond(self) -> Optional[float]:
+        """Throughput in items per second of exclusive time, or `None` if no
+        time has been recorded (`float` or `None`).
+        """
+        return self.items / self.seconds if self.seconds > 0 else None
+
+    @property
+    def bytesPerSecond(self) -> Optional[float]:
+        """Throughput in bytes per second of exclusive time, or `None` if no
+        time has been recorded (`float` or `None`).
+        """
+        return self.bytes / self.seconds if self.seconds > 0 else None
+
+    def toDict(self) -> Dict[str, Any]:
+        """Return a JSON-friendly dictionary representation.
+        """
+        result = dataclasses.asdict(self)
+        result["itemsPerSecond"] = self.itemsPerSecond
+        result["bytesPerSecond"] = self.bytesPerSecond
+        return result
+
+
+class IngestStatistics:
+    """Per-stage timers and counters for an ingest.
+
+    Stages may be nested (including through lazy iterators, whose work
+    happens when a consumer calls `next`); each stage records both its
+    inclusive time and its time excluding nested stages, so the exclusive
+    times of the stages timed in the main thread add up to the total time
+    measured.  Stages recorded from background threads with `record`
+    overlap with those and are reported separately.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, StageStatistics] = {}
+        self._start = time.perf_counter()
+        self._stack: List[List[float]] = []
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> StageStatistics:
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = StageStatistics(name)
+            self.stages[name] = stage
+        return stage
+
+    @contextmanager
+    def timer(self, name: str, *, items: int = 0, nbytes: int = 0) -> Iterator[StageStatistics]:
+        """Time a block of code as one call of a stage.
+
+        Parameters
+        ----------
+        name : `str`
+            Name of the stage.
+        items : `int`, optional
+            Number of items processed by the block.
+        nbytes : `int`, optional
+            Number of bytes processed by the block.
+
+        Returns
+        -------
+        context : `contextlib.AbstractContextManager`
+            Context manager whose target is the `StageStatistics` for the
+            stage, so counters can be updated from within the block.
+        """
+        stage = self[name]
+        stage.calls += 1
+        stage.items += items
+        stage.bytes += nbytes
+        # Second element accumulates time spent in nested stages.
+        frame = [time.perf_counter(), 0.0]
+        self._stack.append(frame)
+        try:
+            yield stage
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - frame[0]
+            stage.totalSeconds += elapsed
+            stage.seconds += elapsed - frame[1]
+            if self._stack:
+                self._stack[-1][1] += elapsed
+
+    def record(self, name: str, seconds: float, *, items: int = 0, nbytes: int = 0) -> None:
+        """Record one call of a stage that was timed elsewhere.
+
+        Unlike `timer`, this may be called from any thread.  It is intended
+        for work done in the background, whose time overlaps that of the
+        stages timed in the main thread and so is not subtracted from them.
+
+        Parameters
+        ----------
+        name : `str`
+            Name of the stage.
+        seconds : `float`
+            Wall-clock time taken by the call.
+        items : `int`, optional
+            Number of items processed by the call.
+        nbytes : `int`, optional
+            Number of bytes processed by the call.
+        """
+        with self._lock:
+            stage = self[name]
+            stage.calls += 1
+            stage.items += items
+            stage.bytes += nbytes
+            stage.seconds += seconds
+            stage.totalSeconds += seconds
+
+    def timeIterator(self, name: str, iterable: Iterable) -> Iterator:
+        """Wrap an iterable so the time spent producing each element is
+        attributed to a stage.
+
+        Parameters
+        ----------
+        name : `str`
+            Name of the stage.
+        iterable : iterable
+            Iterable to wrap; typically a lazy iterator.
+
+        Yields
+        ------
+        element
+            The elements of ``iterable``.  Each one counts as an item.
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.timer(name) as stage:
+                try:
+                    element = next(iterator)
+                except StopIteration:
+                    return
+                stage.items += 1
+            yield element
+
+    @property
+    def elapsed(self) -> float:
+        """Wall-clock time since these statistics were created (`float`).
+        """
+        return time.perf_counter() - self._start
+
+    def toDict(self) -> Dict[str, Any]:
+        """Return a JSON-friendly dictionary representation.
+        """
+        return {
+            "elapsed": self.elapsed,
+            "stages": {name: stage.toDict() for name, stage in self.stages.items()},
+        }
+
+    def writeJson(self, filename: str, **kwargs: Any) -> None:
+        """Append these statistics to a JSON lines file.
+
+        Parameters
+        ----------
+        filename : `str`
+            Name of the file to append to.  Created if it does not exist.
+        **kwargs
+            Additional top-level entries to include in the JSON object.
+        """
+        with open(filename, "a") as stream:
+            stream.write(json.dumps(dict(self.toDict(), **kwargs)) + "\n")
+
+    def log(self, log: Any) -> None:
+        """Write a summary of these statistics to a logger at INFO level.
+
+        Parameters
+        ----------
+        log : `lsst.log.Log` or `logging.Logger`
+            Logger to write to.
+        """
+        log.info("Ingest statistics (%.3f s total):", self.elapsed)
+        for stage in self.stages.values():
+            rate = stage.itemsPerSecond
+            log.info("  %s: %.3f s (%.3f s incl. nested), %d call%s, %d item%s%s%s",
+                     stage.name, stage.seconds, stage.totalSeconds,
+                     stage.calls, "" if stage.calls == 1 else "s",
+                     stage.items, "" if stage.items == 1 else "s",
+                     f" ({rate:.1f}/s)" if rate is not None and stage.items else "",
+                     f", {stage.bytes} bytes" if stage.bytes else "")
@@ -0,0 +1,353 @@
+# This file is part of obs_base.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Continuous ingest of raw files as they appear in watched directories.
+"""
+
+__all__ = ("RawIngestWatcher",)
+
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+from .ingest import RawIngestTask
+
+
+class RawIngestWatcher:
+    """Watch directories for new raw files and ingest them as they appear.
+
+    A single `RawIngestTask` (with its butler, registry connection and
+    caches) is kept for the lifetime of the watcher, so each batch of new
+    files costs only its own metadata extraction and registry inserts.
+
+    Parameters
+    ----------
+    task : `RawIngestTask`
+        Task used to ingest new files.
+    directories : iterable of `str`
+        Directories to watch, recursively.
+    regex : `str`, optional
+        Only files whose paths match this regular expression (with
+        `re.search`) are ingested.
+    run : `str`, optional
+        Name of the RUN collection to ingest into, passed to
+        `RawIngestTask.run`.
+    pollInterval : `float`, optional
+        Seconds between directory scans when polling, and the longest time
+        to wait for a notification otherwise.
+    settleTime : `float`, optional
+        When polling, a file is only ingested once its size and modification
+        time have not changed for this many seconds, so partially-written
+        files are left alone.  When using notifications (which are only sent
+        once a file has been closed or moved into place), this is instead how
+        long to wait for further notifications before ingesting a batch.
+    batchSize : `int`, optional
+        Maximum number of files passed to each `RawIngestTask.run` call.
+    useInotify : `bool`, optional
+        Use inotify notifications if the ``inotify_simple`` package is
+        available (Linux only).  Otherwise, poll.
+    ingestExisting : `bool`, optional
+        Also ingest files that are already present when the watcher starts.
+        Setting ``skipExisting`` in the task's config makes this cheap for
+        files that were ingested before.
+
+    Notes
+    -----
+    A file that fails to ingest is not retried unless its size or
+    modification time changes.  Files that are deleted or moved out of the
+    watched directories are forgotten, so the watcher's memory use follows
+    the number of files present rather than the number ever ingested.
+    """
+
+    def __init__(self, task: RawIngestTask, directories: Iterable[str], *, regex: str = r"\.fit[s]?\b",
+                 run: Optional[str] = None, pollInterval: float = 1.0, settleTime: float = 0.5,
+                 batchSize: int = 50, useInotify: bool = True, ingestExisting: bool = True):
+        self.task = task
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.regex = re.compile(regex)
+        self.outputRun = run
+        self.pollInterval = pollInterval
+        self.settleTime = settleTime
+        self.batchSize = batchSize
+        self.ingestExisting = ingestExisting
+        self.useInotify = useInotify and inotify_simple is not None
+        if useInotify and not self.useInotify:
+            self.task.log.info("inotify_simple is not available; polling for new files instead.")
+        # Signature (size, mtime) of every file that has been handed to the
+        # task, so files are not ingested twice unless they change.
+        self._done: Dict[str, Tuple[int, int]] = {}
+        # Files seen but not yet ingested, with their signature and the time
+        # that signature was first seen.  With notifications, this only holds
+        # files that were too recent to ingest when the watcher started.
+        self._candidates: Dict[str, Tuple[Tuple[int, int], float]] = {}
+        self._stopping = threading.Event()
+        self._inotify = None
+        self._watches: Dict[int, str] = {}
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def _isWanted(self, path: str) -> bool:
+        return self.regex.search(path) is not None
+
+    def _walk(self) -> Iterator[str]:
+        for directory in self.directories:
+            for dirpath, _, filenames in os.walk(directory):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    if self._isWanted(path):
+                        yield path
+
+    def _addWatch(self, directory: str) -> None:
+        mask = (inotify_simple.flags.CLOSE_WRITE | inotify_simple.flags.MOVED_TO
+                | inotify_simple.flags.CREATE | inotify_simple.flags.DELETE
+                | inotify_simple.flags.MOVED_FROM)
+        for dirpath, _, _ in os.walk(directory):
+            self._watches[self._inotify.add_watch(dirpath, mask)] = dirpath
+
+    def _startWatching(self) -> None:
+        if self.useInotify and self._inotify is None:
+            self._inotify = inotify_simple.INotify()
+            for directory in self.directories:
+                self._addWatch(directory)
+
+    def _forget(self, path: str, isDirectory: bool = False) -> None:
+        """Forget a file, or everything under a directory, that has been
+        deleted or moved away.
+        """
+        if not isDirectory:
+            self._done.pop(path, None)
+            self._candidates.pop(path, None)
+            return
+        prefix = path + os.sep
+        for known in (self._done, self._candidates):
+            for name in [name for name in known if name.startswith(prefix)]:
+                del known[name]
+        for wd, directory in list(self._watches.items()):
+            if directory == path or directory.startswith(prefix):
+                del self._watches[wd]
+
+    def _filterNew(self, paths: Iterable[str]) -> List[str]:
+        """Return the paths that have not been ingested in their current
+        state.
+        """
+        result = []
+        for path in paths:
+            signature = self._signature(path)
+            if signature is not None and self._done.get(path) != signature:
+                result.append(path)
+        return result
+
+    def _pollReady(self) -> List[str]:
+        """Scan the watched directories and return files whose size and
+        modification time have settled.
+        """
+        now = time.monotonic()
+        present = set()
+        seen = set()
+        ready = []
+        for path in self._walk():
+            present.add(path)
+            signature = self._signature(path)
+            if signature is None or self._done.get(path) == signature:
+                continue
+            seen.add(path)
+            previous = self._candidates.get(path)
+            if previous is None or previous[0] != signature:
+                self._candidates[path] = (signature, now)
+            elif now - previous[1] >= self.settleTime:
+                ready.append(path)
+        # Forget files that disappeared before they settled, and ingested
+        # files that are gone.
+        for path in set(self._candidates) - seen:
+            del self._candidates[path]
+        for path in set(self._done) - present:
+            del self._done[path]
+        return ready
+
+    def _settledCandidates(self) -> List[str]:
+        """Return the candidate files whose size and modification time have
+        not changed for ``settleTime``.
+
+        This is how files that had not settled when the watcher started are
+        picked up when using notifications, as those that were closed before
+        their directory was watched will never produce one.
+        """
+        now = time.monotonic()
+        ready = []
+        for path, (signature, since) in list(self._candidates.items()):
+            current = self._signature(path)
+            if current is None or self._done.get(path) == current:
+                del self._candidates[path]
+            elif current != signature:
+                self._candidates[path] = (current, now)
+            elif now - since >= self.settleTime:
+                ready.append(path)
+        return ready
+
+    def _notifiedReady(self, timeout: float) -> List[str]:
+        """Wait for notifications and return the files that were closed
+        after writing or moved into place.
+        """
+        paths = []
+        events = self._inotify.read(timeout=int(timeout*1000), read_delay=int(self.settleTime*1000))
+        for event in events:
+            directory = self._watches.get(event.wd)
+            if directory is None or not event.name:
+                continue
+            path = os.path.join(directory, event.name)
+            if event.mask & (inotify_simple.flags.DELETE | inotify_simple.flags.MOVED_FROM):
+                self._forget(path, isDirectory=bool(event.mask & inotify_simple.flags.ISDIR))
+            elif event.mask & inotify_simple.flags.ISDIR:
+                if event.mask & (inotify_simple.flags.CREATE | inotify_simple.flags.MOVED_TO):
+                    self._addWatch(path)
+                    # Files may have been written before the watch existed.
+                    paths.extend(os.path.join(dirpath, f) for dirpath, _, filenames in os.walk(path)
+                                 for f in filenames)
+            elif event.mask & (inotify_simple.flags.CLOSE_WRITE | inotify_simple.flags.MOVED_TO):
+                paths.append(path)
+        return self._filterNew(p for p in dict.fromkeys(paths) if self._isWanted(p))
+
+    def ingest(self, paths: List[str]) -> int:
+        """Ingest files in batches of at most ``batchSize``.
+
+        Parameters
+        ----------
+        paths : `list` of `str`
+            Files to ingest.
+
+        Returns
+        -------
+        nDatasets : `int`
+            Number of datasets ingested.
+        """
+        nDatasets = 0
+        for i in range(0, len(paths), self.batchSize):
+            batch = paths[i:i + self.batchSize]
+            signatures = {path: self._signature(path) for path in batch}
+            try:
+                nDatasets += len(self.task.run(batch, run=self.outputRun))
+            except Exception as e:
+                # The task has already logged the details; keep watching.
+                self.task.log.warning("Ingest of %d file%s failed: %s", len(batch),
+                                      "" if len(batch) == 1 else "s", e)
+            for path, signature in signatures.items():
+                self._candidates.pop(path, None)
+                if signature is not None:
+                    self._done[path] = signature
+        return nDatasets
+
+    def poll(self, timeout: Optional[float] = None) -> int:
+        """Look for new files once and ingest any that are ready.
+
+        Parameters
+        ----------
+        timeout : `float`, optional
+            Longest time to wait for notifications, if using inotify.
+            Defaults to ``pollInterval``.  Ignored when polling.
+
+        Returns
+        -------
+        nDatasets : `int`
+            Number of datasets ingested.
+        """
+        self._startWatching()
+        if self._inotify is not None:
+            ready = self._notifiedReady(self.pollInterval if timeout is None else timeout)
+            ready.extend(path for path in self._settledCandidates() if path not in ready)
+        else:
+            ready = self._pollReady()
+        return self.ingest(ready) if ready else 0
+
+    def run(self, duration: Optional[float] = None) -> int:
+        """Watch for and ingest new files until `stop` is called.
+
+        Parameters
+        ----------
+        duration : `float`, optional
+            If not `None`, also stop after this many seconds.
+
+        Returns
+        -------
+        nDatasets : `int`
+            Number of datasets ingested.
+        """
+        self._stopping.clear()
+        self._startWatching()
+        deadline = None if duration is None else time.monotonic() + duration
+        nDatasets = 0
+        if self.ingestExisting:
+            # Files modified very recently may still be being written; those
+            # are ingested by the polling below once they have settled.
+            cutoff = time.time_ns() - int(self.settleTime*1e9)
+            now = time.monotonic()
+            existing = []
+            for path in self._walk():
+                signature = self._signature(path)
+                if signature is None or self._done.get(path) == signature:
+                    continue
+                if signature[1] <= cutoff:
+                    existing.append(path)
+                else:
+                    self._candidates[path] = (signature, now)
+            nDatasets += self.ingest(existing)
+        else:
+            for path in self._walk():
+                signature = self._signature(path)
+                if signature is not None:
+                    self._done[path] = signature
+        self.task.log.info("Watching %s for new raw files.", ", ".join(self.directories))
+        while not self._stopping.is_set():
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            start = time.monotonic()
+            nDatasets += self.poll()
+            if self._inotify is None:
+                # Notifications block for us; polling needs an explicit wait.
+                self._stopping.wait(max(0.0, self.pollInterval - (time.monotonic() - start)))
+        return nDatasets
+
+    def stop(self) -> None:
+        """Ask `run` to return after the current iteration.
+
+        May be called from another thread or a signal handler.
+        """
+        self._stopping.set()
+
+    def close(self) -> None:
+        """Release the inotify file descriptor, if any.
+        """
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+            self._watches.clear()
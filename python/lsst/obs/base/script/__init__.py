@@ -23,4 +23,5 @@ from .convert import convert
 from .defineVisits import defineVisits
 from .ingestRaws import ingestRaws
 from .registerInstrument import registerInstrument
+from .watchRaws import watchRaws
 from .writeCuratedCalibrations import writeCuratedCalibrations
@@ -32,7 +32,8 @@ from lsst.log.utils import temporaryLogLevel
 from ..gen2to3 import CalibRepo, ConvertRepoTask, ConvertRepoSkyMapConfig, Rerun
 
 
-def convert(repo, gen2root, skymap_name, skymap_config, calibs, reruns, config_file, transfer, processes=1):
+def convert(repo, gen2root, skymap_name, skymap_config, calibs, reruns, config_file, transfer, processes=1,
+            executor="processes"):
     """Implements the command line interface `butler convert` subcommand,
     should only be called by command line tools and unit test code that tests
     this function.
@@ -66,6 +67,9 @@ def convert(repo, gen2root, skymap_name, skymap_config, calibs, reruns, config_f
         Mode to use when transferring data into the gen3 repository.
     processess : `int`
         Number of processes to use for conversion.
+    executor : `str`
+        How to parallelize work if ``processes`` is greater than one; one of
+        the keys of `lsst.obs.base.workerPool.EXECUTORS`.
     """
     # Allow a gen3 butler to be reused
     try:
@@ -109,4 +113,5 @@ def convert(repo, gen2root, skymap_name, skymap_config, calibs, reruns, config_f
         reruns=rerunsArg,
         calibs=None if calibs is None else [CalibRepo(path=calibs)],
         processes=processes,
+        executor=executor,
     )
@@ -24,7 +24,7 @@ from lsst.obs.base import DefineVisitsTask, DefineVisitsConfig
 from ..utils import getInstrument
 
 
-def defineVisits(repo, config_file, collections, instrument, processes=1):
+def defineVisits(repo, config_file, collections, instrument, processes=1, executor="processes"):
     """Implements the command line interface `butler define-visits` subcommand,
     should only be called by command line tools and unit test code that tests
     this function.
@@ -43,6 +43,11 @@ def defineVisits(repo, config_file, collections, instrument, processes=1):
         If empty it will be passed as `None` to Butler.
     insrument : `str`
         The name or fully-qualified class name of an instrument.
+    processes : `int`
+        Number of processes to use.
+    executor : `str`
+        How to parallelize work if ``processes`` is greater than one; one of
+        the keys of `lsst.obs.base.workerPool.EXECUTORS`.
     """
     if not collections:
         collections = None
@@ -59,4 +64,4 @@ def defineVisits(repo, config_file, collections, instrument, processes=1):
         config.load(config_file)
     task = DefineVisitsTask(config=config, butler=butler)
     task.run(butler.registry.queryDataIds(["exposure"], dataId={"instrument": instr.getName()}),
-             collections=collections, processes=processes)
+             collections=collections, processes=processes, executor=executor)
@@ -26,7 +26,8 @@ from lsst.utils import doImport
 
 
 def ingestRaws(repo, locations, regex, output_run, config=None, config_file=None, transfer="auto",
-               processes=1, ingest_task="lsst.obs.base.RawIngestTask"):
+               processes=1, ingest_task="lsst.obs.base.RawIngestTask", executor="processes",
+               manifest=None, dry_run=False, scratch_dir=None, shard_queue=None, shard=0, num_shards=1):
     """Ingests raw frames into the butler registry
 
     Parameters
@@ -51,13 +52,47 @@ def ingestRaws(repo, locations, regex, output_run, config=None, config_file=None
     ingest_task : `str`
         The fully qualified class name of the ingest task to use by default
         lsst.obs.base.RawIngestTask.
+    executor : `str`
+        How to parallelize work if ``processes`` is greater than one; one of
+        the keys of `lsst.obs.base.workerPool.EXECUTORS`.
+    manifest : `str` or `None`
+        Path to a manifest of files and their metadata to ingest instead of
+        searching ``locations``; see `lsst.obs.base.ingestManifest`.
+    dry_run : `bool`
+        If `True`, only measure how fast the files would be ingested, without
+        writing to the repository; see `RawIngestTask.dryRun`.
+    scratch_dir : `str` or `None`
+        Directory to copy files into to time the transfer in a dry run.
+    shard_queue : `str` or `None`
+        Path to a work queue shared with other invocations ingesting the same
+        files; see `RawIngestTask.runSharded`.
+    shard : `int`
+        Index of this invocation among those sharing ``shard_queue``.
+    num_shards : `int`
+        Number of invocations sharing ``shard_queue``.
 
     Raises
     ------
     Exception
         Raised if operations on configuration object fail.
+    ValueError
+        Raised if both or neither of ``locations`` and ``manifest`` are
+        given, if a dry run is requested with a manifest, if more than one
+        process is requested with a manifest, or if a shard queue is given
+        with a manifest or for a dry run.
     """
-    butler = Butler(repo, writeable=True)
+    if manifest is not None and locations:
+        raise ValueError("Locations and a manifest cannot both be given.")
+    if manifest is None and not locations:
+        raise ValueError("Either locations or a manifest must be given.")
+    if dry_run and manifest is not None:
+        raise ValueError("A dry run cannot be made from a manifest.")
+    if processes > 1 and manifest is not None:
+        raise ValueError("Ingest from a manifest does not read headers, so it cannot use multiple "
+                         "processes.")
+    if shard_queue is not None and (manifest is not None or dry_run):
+        raise ValueError("Sharded ingest cannot be combined with a manifest or a dry run.")
+    butler = Butler(repo, writeable=not dry_run)
     TaskClass = doImport(ingest_task)
     ingestConfig = TaskClass.ConfigClass()
     ingestConfig.transfer = transfer
@@ -69,5 +104,15 @@ def ingestRaws(repo, locations, regex, output_run, config=None, config_file=None
             configOverrides.addValueOverride(name, value)
     configOverrides.applyTo(ingestConfig)
     ingester = TaskClass(config=ingestConfig, butler=butler)
+    if manifest is not None:
+        ingester.runFromManifest(manifest, run=output_run)
+        return
     files = findFileResources(locations, regex)
-    ingester.run(files, run=output_run, processes=processes)
+    if dry_run:
+        ingester.dryRun(files, processes=processes, executor=executor, scratchDirectory=scratch_dir)
+        return
+    if shard_queue is not None:
+        ingester.runSharded(files, shard_queue, shard=shard, nShards=num_shards, run=output_run,
+                            processes=processes, executor=executor)
+        return
+    ingester.run(files, run=output_run, processes=processes, executor=executor)
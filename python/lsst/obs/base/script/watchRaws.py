@@ -0,0 +1,101 @@
+# This file is part of obs_base.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import signal
+
+from lsst.daf.butler import Butler
+from lsst.pipe.base.configOverrides import ConfigOverrides
+from lsst.utils import doImport
+
+from ..ingestWatcher import RawIngestWatcher
+
+
+def watchRaws(repo, locations, regex, output_run, config=None, config_file=None, transfer="auto",
+              ingest_task="lsst.obs.base.RawIngestTask", poll_interval=1.0, settle_time=0.5,
+              batch_size=50, inotify=True, ingest_existing=True, duration=None):
+    """Watch directories and ingest raw frames as they appear.
+
+    Runs until interrupted (SIGINT or SIGTERM) or ``duration`` has elapsed.
+
+    Parameters
+    ----------
+    repo : `str`
+        URI to the repository.
+    locations : `list` [`str`]
+        Directories to watch, recursively.
+    regex : `str`
+        Regex string used to select files to ingest.
+    output_run : `str`
+        The path to the location, the run, where datasets should be put.
+    config : `dict` [`str`, `str`] or `None`
+        Key-value pairs to apply as overrides to the ingest config.
+    config_file : `str` or `None`
+        Path to a config file that contains overrides to the ingest config.
+    transfer : `str` or None
+        The external data transfer type, by default "auto".
+    ingest_task : `str`
+        The fully qualified class name of the ingest task to use by default
+        lsst.obs.base.RawIngestTask.
+    poll_interval : `float`
+        Seconds between checks for new files.
+    settle_time : `float`
+        Seconds a file's size and modification time must be unchanged
+        before it is ingested, when polling.
+    batch_size : `int`
+        Maximum number of files to ingest at once.
+    inotify : `bool`
+        Use inotify notifications instead of polling, if available.
+    ingest_existing : `bool`
+        Also ingest files that are present when watching starts.
+    duration : `float` or `None`
+        Stop after this many seconds, if not `None`.
+
+    Raises
+    ------
+    Exception
+        Raised if operations on configuration object fail.
+    """
+    butler = Butler(repo, writeable=True)
+    TaskClass = doImport(ingest_task)
+    ingestConfig = TaskClass.ConfigClass()
+    ingestConfig.transfer = transfer
+    configOverrides = ConfigOverrides()
+    if config_file is not None:
+        configOverrides.addFileOverride(config_file)
+    if config is not None:
+        for name, value in config.items():
+            configOverrides.addValueOverride(name, value)
+    configOverrides.applyTo(ingestConfig)
+    ingester = TaskClass(config=ingestConfig, butler=butler)
+    watcher = RawIngestWatcher(ingester, locations, regex=regex, run=output_run,
+                               pollInterval=poll_interval, settleTime=settle_time, batchSize=batch_size,
+                               useInotify=inotify, ingestExisting=ingest_existing)
+
+    def handler(signum, frame):
+        watcher.stop()
+
+    previous = {sig: signal.signal(sig, handler) for sig in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        watcher.run(duration=duration)
+    finally:
+        watcher.close()
+        for sig, old in previous.items():
+            signal.signal(sig, old)
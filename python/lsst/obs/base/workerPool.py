@@ -0,0 +1,318 @@
+# This file is part of obs_base.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Utilities for choosing how the parallelizable steps of ingest, visit
+definition and repository conversion are executed.
+"""
+
+__all__ = ("EXECUTORS", "WorkerPool")
+
+import itertools
+import os
+import pickle
+import shutil
+import tempfile
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from lsst.daf.butler import Butler
+
+from ._instrument import Instrument
+
+EXECUTORS = {
+    "serial": "run everything in the calling thread",
+    "threads": ("use a pool of threads; nothing is pickled and caches are shared, which suits I/O-bound "
+                "work such as reading headers from network filesystems"),
+    "processes": ("use a pool of processes; the task is unpickled once in every worker, which suits "
+                  "CPU-bound work"),
+}
+"""Names and descriptions of the supported executor backends (`dict`).
+"""
+
+# State of a worker process, set up by _initWorker.  Holds the butler
+# constructed when the worker started, the directory the pool writes pickled
+# objects (usually tasks) to, and the objects that have already been
+# unpickled in this worker, keyed by token.
+_workerState: Dict[str, Any] = {"butler": None, "payloadDir": None, "objects": {}}
+
+# Persistent ID used to stand in for the pool's butler in pickled tasks.
+_BUTLER_PID = "butler"
+
+
+def _initWorker(butler: Optional[Butler], payloadDir: str) -> None:
+    """Warm up a new worker process.
+
+    The butler is unpickled (and hence its registry connection made) here,
+    once per worker, and all instrument packages are imported up front, so
+    tasks sent to the worker later need to do neither.
+    """
+    _workerState["butler"] = butler
+    _workerState["payloadDir"] = payloadDir
+    _workerState["objects"] = {}
+    if butler is not None:
+        Instrument.importAll(butler.registry)
+
+
+class _TaskPickler(pickle.Pickler):
+    """Pickler that replaces references to a particular butler with a
+    persistent ID, so workers can substitute the one they already have.
+    """
+
+    def __init__(self, file, butler: Optional[Butler]):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._butler = butler
+
+    def persistent_id(self, obj):
+        if self._butler is not None and obj is self._butler:
+            return _BUTLER_PID
+        return None
+
+
+class _TaskUnpickler(pickle.Unpickler):
+    """Unpickler that resolves the persistent ID written by `_TaskPickler`
+    to the worker's own butler.
+    """
+
+    def persistent_load(self, pid):
+        if pid == _BUTLER_PID:
+            return _workerState["butler"]
+        raise pickle.UnpicklingError(f"Unsupported persistent ID {pid!r}.")
+
+
+def _getPayloadPath(payloadDir: str, token: int) -> str:
+    """Return the path of the file holding a pickled object.
+    """
+    return os.path.join(payloadDir, f"{token}.pickle")
+
+
+def _callMethod(args: Tuple[int, str, Any]) -> Any:
+    """Call a method of an object that is unpickled at most once per worker.
+
+    The object is read from the pool's payload directory the first time the
+    worker sees its token.
+    """
+    token, name, item = args
+    obj = _workerState["objects"].get(token)
+    if obj is None:
+        with open(_getPayloadPath(_workerState["payloadDir"], token), "rb") as stream:
+            obj = _TaskUnpickler(stream).load()
+        _workerState["objects"][token] = obj
+    return getattr(obj, name)(item)
+
+
+class WorkerPool:
+    """A pool of workers that can be shared by several stages of a command
+    and shut down cleanly when they are all done.
+
+    Parameters
+    ----------
+    processes : `int`
+        Number of workers.  Work is done serially in the calling thread if
+        this is less than two.
+    executor : `str`, optional
+        Executor backend; one of the keys of `EXECUTORS`.
+    butler : `lsst.daf.butler.Butler`, optional
+        Butler used by the tasks whose methods will be mapped over.  For the
+        "processes" executor this is sent to each worker once, when it
+        starts, and all instrument packages are imported there at the same
+        time; tasks that hold this same butler instance then reuse the
+        worker's copy instead of constructing their own.
+
+    Raises
+    ------
+    ValueError
+        Raised if ``executor`` is not recognized.
+
+    Notes
+    -----
+    For the "processes" executor, when the function passed to `imap` or
+    `imap_unordered` is a bound method, the object it is bound to (usually a
+    `~lsst.pipe.base.Task`) is pickled once, to a scratch directory whose
+    location is given to every worker when it starts.  Each worker reads and
+    unpickles it at most once, the first time it is needed, and only a small
+    token, the method name and the item are sent with each item, no matter
+    how many items are processed or how many stages use the pool.  Any other
+    callable is passed to the underlying `multiprocessing.Pool` unchanged.
+    The scratch directory is removed by `join`.
+
+    Instances may be used as context managers, in which case the pool is
+    closed and joined on normal exit, and terminated if an exception is
+    raised.
+    """
+
+    def __init__(self, processes: int, executor: str = "processes", *, butler: Optional[Butler] = None):
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unrecognized executor {executor!r}; expected one of {list(EXECUTORS)}.")
+        self._butler = butler
+        self._payloads: Dict[int, Tuple[int, Any]] = {}
+        self._payloadDir: Optional[str] = None
+        self._tokens = itertools.count()
+        if executor == "serial" or processes < 2:
+            self.executor = "serial"
+            self.processes = 1
+            self._pool = None
+        elif executor == "threads":
+            self.executor = executor
+            self.processes = processes
+            self._pool = ThreadPool(processes)
+        else:
+            self.executor = executor
+            self.processes = processes
+            self._payloadDir = tempfile.mkdtemp(prefix="workerPool-")
+            self._pool = Pool(processes, initializer=_initWorker, initargs=(butler, self._payloadDir))
+
+    executor: str
+    """Executor backend actually in use (`str`); "serial" if no pool was
+    needed.
+    """
+
+    processes: int
+    """Number of workers (`int`).
+    """
+
+    def __enter__(self) -> "WorkerPool":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
+        self.join()
+
+    def _wrap(self, func: Callable, iterable: Iterable) -> Tuple[Callable, Iterable]:
+        """Arrange for the object a bound method belongs to to be pickled
+        only once, and to be sent to workers by token.
+        """
+        if self.executor != "processes":
+            return func, iterable
+        obj = getattr(func, "__self__", None)
+        if obj is None or isinstance(obj, type):
+            return func, iterable
+        entry = self._payloads.get(id(obj))
+        if entry is None:
+            token = next(self._tokens)
+            with open(_getPayloadPath(self._payloadDir, token), "wb") as stream:
+                _TaskPickler(stream, self._butler).dump(obj)
+            # Keep a reference to the object, so its id is not reused.
+            entry = (token, obj)
+            self._payloads[id(obj)] = entry
+        token, _ = entry
+        name = func.__name__
+        return _callMethod, ((token, name, item) for item in iterable)
+
+    def imap(self, func: Callable, iterable: Iterable, chunksize: int = 1) -> Iterator:
+        """Apply a function to each item of an iterable, yielding results
+        lazily in order.
+
+        Parameters
+        ----------
+        func : callable
+            Function of one argument.
+        iterable : iterable
+            Arguments to pass to ``func``.
+        chunksize : `int`, optional
+            Number of items sent to a worker at a time.
+
+        Returns
+        -------
+        results : iterator
+            Results of ``func``, in the order of ``iterable``.
+        """
+        if self._pool is None:
+            return map(func, iterable)
+        return self._pool.imap(*self._wrap(func, iterable), chunksize=chunksize)
+
+    def imap_unordered(self, func: Callable, iterable: Iterable, chunksize: int = 1) -> Iterator:
+        """Apply a function to each item of an iterable, yielding results
+        lazily as they are ready.
+
+        Parameters
+        ----------
+        func : callable
+            Function of one argument.
+        iterable : iterable
+            Arguments to pass to ``func``.
+        chunksize : `int`, optional
+            Number of items sent to a worker at a time.
+
+        Returns
+        -------
+        results : iterator
+            Results of ``func``, in no particular order.
+        """
+        if self._pool is None:
+            return map(func, iterable)
+        return self._pool.imap_unordered(*self._wrap(func, iterable), chunksize=chunksize)
+
+    def closeAfter(self, iterable: Iterable) -> Iterator:
+        """Yield from an iterable, shutting the pool down once it is
+        exhausted (or abandoned).
+
+        This is for use when a lazy iterator of results is handed back to a
+        caller that does not know the pool exists.
+
+        Parameters
+        ----------
+        iterable : iterable
+            Iterable whose items should be yielded.
+
+        Yields
+        ------
+        item
+            Items of ``iterable``.
+        """
+        try:
+            yield from iterable
+        except BaseException:
+            self.terminate()
+            raise
+        else:
+            self.close()
+        finally:
+            self.join()
+
+    def close(self) -> None:
+        """Prevent any more work being submitted; workers exit once
+        outstanding work is done.
+        """
+        if self._pool is not None:
+            self._pool.close()
+        self._payloads.clear()
+
+    def terminate(self) -> None:
+        """Stop all workers immediately, abandoning outstanding work.
+        """
+        if self._pool is not None:
+            self._pool.terminate()
+        self._payloads.clear()
+
+    def join(self) -> None:
+        """Wait for all workers to exit.
+
+        Must be called after `close` or `terminate`.
+        """
+        if self._pool is not None:
+            self._pool.join()
+        if self._payloadDir is not None:
+            shutil.rmtree(self._payloadDir, ignore_errors=True)
+            self._payloadDir = None
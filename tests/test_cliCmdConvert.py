@@ -40,6 +40,7 @@ class ConvertTestCase(CliCmdTestBase, unittest.TestCase):
                     reruns=(),
                     transfer="auto",
                     processes=1,
+                    executor="processes",
                     config_file=None)
 
     @staticmethod
@@ -64,6 +65,7 @@ class ConvertTestCase(CliCmdTestBase, unittest.TestCase):
                        "--reruns", "three",
                        "--transfer", "symlink",
                        "--processes", 1,
+                       "--executor", "threads",
                        "--config-file", "/path/to/config"],
                       self.makeExpected(repo="here",
                                         gen2root="from",
@@ -73,6 +75,7 @@ class ConvertTestCase(CliCmdTestBase, unittest.TestCase):
                                         reruns=("one", "two", "three"),
                                         transfer="symlink",
                                         processes=1,
+                                        executor="threads",
                                         config_file="/path/to/config"))
 
     def test_missing(self):
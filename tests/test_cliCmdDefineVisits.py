@@ -35,7 +35,8 @@ class DefineVisitsTest(CliCmdTestBase, unittest.TestCase):
     @staticmethod
     def defaultExpected():
         return dict(config_file=None,
-                    collections=())
+                    collections=(),
+                    executor="processes")
 
     @staticmethod
     def command():
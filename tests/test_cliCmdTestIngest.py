@@ -44,8 +44,15 @@ class IngestRawsTestCase(CliCmdTestBase, unittest.TestCase):
                     config_file=None,
                     ingest_task="lsst.obs.base.RawIngestTask",
                     locations=(),
+                    manifest=None,
+                    dry_run=False,
+                    scratch_dir=None,
+                    shard_queue=None,
+                    shard=0,
+                    num_shards=1,
                     output_run=None,
                     processes=1,
+                    executor="processes",
                     regex=fits_re,
                     transfer="auto")
 
@@ -104,6 +111,49 @@ class IngestRawsTestCase(CliCmdTestBase, unittest.TestCase):
                                         output_run="out",
                                         ingest_task="foo.bar.baz"))
 
+    def test_executor(self):
+        """Test the executor argument"""
+        self.run_test(["ingest-raws", "repo", "resources",
+                       "--processes", 4,
+                       "--executor", "threads"],
+                      self.makeExpected(repo="repo",
+                                        locations=("resources",),
+                                        processes=4,
+                                        executor="threads"))
+
+    def test_manifest(self):
+        """Test the manifest argument, which replaces locations"""
+        manifest = "manifest.csv"
+        self.run_test(["ingest-raws", "repo",
+                       "--output-run", "out",
+                       "--manifest", manifest],
+                      self.makeExpected(repo="repo",
+                                        output_run="out",
+                                        manifest=manifest),
+                      withTempFile=manifest)
+
+    def test_dryRun(self):
+        """Test the dry-run and scratch directory arguments"""
+        self.run_test(["ingest-raws", "repo", "resources",
+                       "--benchmark",
+                       "--scratch-dir", "scratch"],
+                      self.makeExpected(repo="repo",
+                                        locations=("resources",),
+                                        dry_run=True,
+                                        scratch_dir="scratch"))
+
+    def test_shards(self):
+        """Test the sharding arguments"""
+        self.run_test(["ingest-raws", "repo", "resources",
+                       "--shard-queue", "queue.sqlite3",
+                       "--shard", "2",
+                       "--num-shards", "4"],
+                      self.makeExpected(repo="repo",
+                                        locations=("resources",),
+                                        shard_queue="queue.sqlite3",
+                                        shard=2,
+                                        num_shards=4))
+
     def test_locations(self):
         """Test that the locations argument accepts multiple inputs and splits
         commas."""
@@ -0,0 +1,87 @@
+# This file is part of daf_butler.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Unit tests for daf_butler CLI watch-raws command.
+"""
+
+import unittest
+
+from lsst.daf.butler.tests import CliCmdTestBase
+from lsst.obs.base.cli.cmd import watch_raws
+from lsst.obs.base.cli.cmd.commands import fits_re
+
+
+class WatchRawsTestCase(CliCmdTestBase, unittest.TestCase):
+
+    mockFuncName = "lsst.obs.base.cli.cmd.commands.script.watchRaws"
+
+    @staticmethod
+    def defaultExpected():
+        return dict(config={},
+                    config_file=None,
+                    ingest_task="lsst.obs.base.RawIngestTask",
+                    locations=(),
+                    output_run=None,
+                    regex=fits_re,
+                    transfer="auto",
+                    poll_interval=1.0,
+                    settle_time=0.5,
+                    batch_size=50,
+                    inotify=True,
+                    ingest_existing=True,
+                    duration=None)
+
+    @staticmethod
+    def command():
+        return watch_raws
+
+    def test_repoAndLocations(self):
+        """Test the most basic required arguments"""
+        self.run_test(["watch-raws", "repo", "incoming", "--output-run", "out"],
+                      self.makeExpected(repo="repo",
+                                        locations=("incoming",),
+                                        output_run="out"))
+
+    def test_all(self):
+        """Test the watch-specific arguments"""
+        self.run_test(["watch-raws", "repo", "incoming,other",
+                       "--poll-interval", "0.2",
+                       "--settle-time", "2",
+                       "--batch-size", "10",
+                       "--no-inotify",
+                       "--no-ingest-existing",
+                       "--duration", "60"],
+                      self.makeExpected(repo="repo",
+                                        locations=("incoming", "other"),
+                                        poll_interval=0.2,
+                                        settle_time=2.0,
+                                        batch_size=10,
+                                        inotify=False,
+                                        ingest_existing=False,
+                                        duration=60.0))
+
+    def test_missing(self):
+        """test a missing argument"""
+        self.run_missing(["watch-raws", "repo"], "Missing argument ['\"]LOCATIONS")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -23,12 +23,22 @@ import os
 import pickle
 import shutil
 import tempfile
+import threading
+import types
 import unittest
+import unittest.mock
 
 import lsst.daf.butler as dafButler
 import lsst.daf.butler.tests as butlerTests
+import lsst.geom
+from lsst.afw.cameraGeom import FOCAL_PLANE, PIXELS
+from lsst.afw.cameraGeom.testUtils import CameraWrapper
+from lsst.afw.geom import makeCdMatrix, makeSkyWcs
+from lsst.sphgeom import ConvexPolygon
 
 from lsst.obs.base import DefineVisitsTask
+from lsst.obs.base.defineVisits import _projectDetectorCorners, _projectDetectorCornersIndividually
+from lsst.obs.base.workerPool import WorkerPool
 
 
 TESTDIR = os.path.dirname(__file__)
@@ -82,6 +92,139 @@ class DefineVisitsTestCase(unittest.TestCase):
         self.assertEqual(self.task.butler.run, copy.butler.run)
         self.assertEqual(self.task.universe, copy.universe)
 
+    def testCameraCache(self):
+        task = self.task.computeVisitRegions
+        task.butler = unittest.mock.Mock()
+        refs = {42: types.SimpleNamespace(id=1), 43: types.SimpleNamespace(id=1),
+                44: types.SimpleNamespace(id=2), 45: None, 46: None}
+        exposures = [types.SimpleNamespace(id=n, instrument="DummyCam", timespan=n) for n in refs]
+        task.butler.registry.findDataset.side_effect = lambda *args, timespan, **kwargs: refs[timespan]
+        task.butler.getDirect.side_effect = lambda ref: f"camera{ref.id}"
+        instrument = unittest.mock.Mock()
+        instrument.getCamera.return_value = "nominal"
+        with unittest.mock.patch.object(task, "getInstrument", return_value=instrument):
+            cameras = [task.getCamera(exposure) for exposure in exposures]
+        self.assertEqual(cameras, [("camera1", True), ("camera1", True), ("camera2", True),
+                                   ("nominal", False), ("nominal", False)])
+        # Each camera is only read (or constructed) once.
+        self.assertEqual(task.butler.getDirect.call_count, 2)
+        self.assertEqual(instrument.getCamera.call_count, 1)
+
+    def testThreadedVisitRecords(self):
+        """Test that visits are built concurrently by a thread pool, sharing
+        the subtask's butler lock.
+        """
+        self.assertIs(self.task._registryLock, self.task.computeVisitRegions.butlerLock)
+        # Each call waits for the other to start, which would time out if the
+        # calls were serialized.
+        barrier = threading.Barrier(2, timeout=30)
+
+        def build(definition, *, collections):
+            barrier.wait()
+            self.assertFalse(self.task._registryLock.locked())
+            return definition
+
+        with unittest.mock.patch.object(self.task, "_buildVisitRecords", side_effect=build), \
+                WorkerPool(2, "threads") as pool:
+            results = pool.imap_unordered(self.task._buildVisitRecordsSingle, [(1, None), (2, None)])
+            self.assertEqual(sorted(results), [1, 2])
+
+    def testFetchExposureRecords(self):
+        self.task.config.exposureQueryChunkSize = 2
+        records = self.task._fetchExposureRecords([
+            {"instrument": "DummyCam", "exposure": 44},
+            {"instrument": "DummyCam", "exposure": 42},
+            {"instrument": "DummyCam", "exposure": 43},
+            {"instrument": "DummyCam", "exposure": 42},
+        ])
+        self.assertEqual(sorted(record.id for record in records), [42, 43, 44])
+        with self.assertRaises(LookupError):
+            self.task._fetchExposureRecords([{"instrument": "DummyCam", "exposure": 45}])
+
+    def testIncremental(self):
+        """Test that exposures with a visit in the same visit system are
+        skipped, and those with a visit only in another visit system are not.
+        """
+        registry = self.butler.registry
+        visitSystem, visitSystemName = self.task.groupExposures.getVisitSystem()
+        otherSystem = visitSystem + 1
+        registry.syncDimensionData("visit_system", {"instrument": "DummyCam", "id": visitSystem,
+                                                    "name": visitSystemName})
+        registry.syncDimensionData("visit_system", {"instrument": "DummyCam", "id": otherSystem,
+                                                    "name": "other"})
+        # Exposure 42 has a visit in our visit system, exposure 43 only has
+        # one in the other, and exposure 44 has none.
+        registry.insertDimensionData(
+            "visit_definition",
+            {"instrument": "DummyCam", "exposure": 42, "visit": 42, "visit_system": visitSystem},
+            {"instrument": "DummyCam", "exposure": 43, "visit": 43, "visit_system": otherSystem},
+        )
+        self.assertEqual(self.task._queryDefinedExposures("DummyCam", visitSystem), {42})
+        self.assertEqual(self.task._queryDefinedExposures("DummyCam", otherSystem), {43})
+        self.assertEqual(self.task._queryDefinedExposures("DummyCam", otherSystem + 1), set())
+
+        self.task.config.incremental = True
+        records = [types.SimpleNamespace(id=n, instrument="DummyCam", observation_type="science")
+                   for n in (42, 43, 44)]
+        with unittest.mock.patch.object(self.task, "_fetchExposureRecords", return_value=records), \
+                unittest.mock.patch.object(self.task.groupExposures, "group", return_value=[]) as group:
+            self.task.run([{"instrument": "DummyCam", "exposure": n} for n in (42, 43, 44)])
+        exposures, = group.call_args.args
+        self.assertEqual([record.id for record in exposures], [43, 44])
+
+    def testInsertVisitRecordsBatch(self):
+        batch = [
+            types.SimpleNamespace(visit=types.SimpleNamespace(id=n), visit_definition=[f"def{n}"],
+                                  visit_detector_region=[f"region{n}a", f"region{n}b"])
+            for n in (42, 43, 44)
+        ]
+        for fail in (False, True):
+            with self.subTest(fail=fail):
+                self.task.butler = unittest.mock.MagicMock()
+                registry = self.task.butler.registry
+                registry.queryDimensionRecords.return_value = [types.SimpleNamespace(id=43)]
+                if fail:
+                    registry.insertDimensionData.side_effect = RuntimeError("Unique constraint failed.")
+                with unittest.mock.patch.object(self.task, "_syncVisitRecords") as sync:
+                    self.task._insertVisitRecordsBatch("DummyCam", batch)
+                registry.insertDimensionData.assert_any_call("visit", batch[0].visit, batch[2].visit)
+                if fail:
+                    # Every visit falls back to being synced individually.
+                    self.assertEqual([c.args[0] for c in sync.call_args_list], batch)
+                else:
+                    # Only the visit that already exists is synced.
+                    registry.insertDimensionData.assert_any_call("visit_definition", "def42", "def44")
+                    registry.insertDimensionData.assert_any_call("visit_detector_region", "region42a",
+                                                                 "region42b", "region44a", "region44b")
+                    self.assertEqual([c.args[0] for c in sync.call_args_list], [batch[1]])
+
+
+class CornerProjectionTestCase(unittest.TestCase):
+    def testBatchedProjection(self):
+        """Test that projecting all detector corners at once gives the same
+        regions as projecting each detector separately.
+        """
+        camera = CameraWrapper(isLsstLike=True).camera
+        wcsDetector = next(iter(camera))
+        wcs = makeSkyWcs(crpix=lsst.geom.Box2D(wcsDetector.getBBox()).getCenter(),
+                         crval=lsst.geom.SpherePoint(30.0, -45.0, lsst.geom.degrees),
+                         cdMatrix=makeCdMatrix(scale=0.2*lsst.geom.arcseconds,
+                                               orientation=35.0*lsst.geom.degrees))
+        fpToSky = wcsDetector.getTransform(FOCAL_PLANE, PIXELS).then(wcs.getTransform())
+        for padding in (0, 42):
+            with self.subTest(padding=padding):
+                batched = _projectDetectorCorners(camera, fpToSky, padding)
+                individual = _projectDetectorCornersIndividually(camera, fpToSky, padding)
+                self.assertEqual(batched.keys(), individual.keys())
+                for detectorId, bounds in individual.items():
+                    self.assertEqual(len(batched[detectorId]), len(bounds))
+                    for a, b in zip(batched[detectorId], bounds):
+                        # Agreement to well under a micro-arcsecond.
+                        self.assertLess((a - b).getNorm(), 1e-12)
+                    for a, b in zip(ConvexPolygon.convexHull(batched[detectorId]).getVertices(),
+                                    ConvexPolygon.convexHull(bounds).getVertices()):
+                        self.assertLess((a - b).getNorm(), 1e-12)
+
 
 if __name__ == "__main__":
     unittest.main()
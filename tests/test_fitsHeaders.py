@@ -0,0 +1,83 @@
+# This file is part of obs_base.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import unittest
+
+import lsst.utils.tests
+from astro_metadata_translator import merge_headers
+from lsst.afw.fits import readMetadata
+
+from lsst.obs.base import iterFitsHeaders, readRawHeader
+
+TESTDIR = os.path.dirname(__file__)
+
+FILES = (
+    os.path.join(TESTDIR, "bar-35.fits"),
+    os.path.join(TESTDIR, "fz", "bar-35.fits.fz"),
+    os.path.join(TESTDIR, "gz", "bar-35.fits.gz"),
+)
+
+
+class FitsHeadersTestCase(lsst.utils.tests.TestCase):
+    """Test the header-only FITS reader against afw."""
+
+    # Keywords that legitimately differ between the two readers for
+    # tile-compressed files; the checksums describe the compressed table.
+    IGNORED = {"CHECKSUM", "DATASUM", "EXTNAME", "COMMENT", "HISTORY", ""}
+
+    def testReadRawHeader(self):
+        for filename in FILES:
+            with self.subTest(filename=filename):
+                expected = merge_headers([readMetadata(filename, 0), readMetadata(filename)],
+                                         mode="overwrite")
+                header = readRawHeader(filename)
+                for key in set(expected) - self.IGNORED:
+                    self.assertIn(key, header)
+                    self.assertEqual(header[key], expected[key], msg=key)
+
+    def testIterFitsHeaders(self):
+        for filename in FILES:
+            with self.subTest(filename=filename):
+                headers = list(iterFitsHeaders(filename))
+                self.assertEqual(len(headers), 4)
+                self.assertEqual(headers[0]["NAXIS"], 0)
+                self.assertEqual([h["EXTTYPE"] for h in headers[1:]], ["IMAGE", "MASK", "VARIANCE"])
+                for header in headers[1:]:
+                    self.assertEqual(header["XTENSION"], "IMAGE")
+                    self.assertEqual((header["NAXIS1"], header["NAXIS2"]), (2248, 2024))
+
+    def testNotFits(self):
+        with self.assertRaises(OSError):
+            readRawHeader(os.path.join(TESTDIR, "MinMapper1.yaml"))
+
+
+class MemoryTester(lsst.utils.tests.MemoryTestCase):
+    pass
+
+
+def setup_module(module):
+    lsst.utils.tests.init()
+
+
+if __name__ == "__main__":
+    lsst.utils.tests.init()
+    unittest.main()
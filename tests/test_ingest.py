@@ -19,21 +19,102 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import json
 import os
 import pickle
 import shutil
+import sqlite3
 import tempfile
+import threading
+import time
+import types
 import unittest
+import unittest.mock
+
+import astropy.io.fits
+import astropy.units as u
+import numpy
+from astro_metadata_translator import StubTranslator
+from astropy.time import Time
 
 import lsst.daf.butler as dafButler
 import lsst.daf.butler.tests as butlerTests
 
-from lsst.obs.base import RawIngestTask
+from lsst.obs.base import (FilterDefinitionCollection, FitsRawFormatterBase, Instrument, IngestStatistics,
+                           RawIngestTask, makeExposureRecordFromObsInfo)
+from lsst.obs.base._ingestJournal import IngestJournal
+from lsst.obs.base._ingestQueue import IngestWorkQueue, shardOf
+from lsst.obs.base._metadataCache import RawMetadataCache
+from lsst.obs.base.fileOrdering import orderByLocality
+from lsst.obs.base.ingest import (_getCachedInstrument, _getCachedRawFormatter, _imapBounded,
+                                  _InstrumentRecords)
+from lsst.obs.base.ingestManifest import makeManifestObservationInfo, readManifest
 
 
 TESTDIR = os.path.dirname(__file__)
 
 
+class MultiExtensionTestTranslator(StubTranslator):
+    """Translator for the multi-extension files written by the tests, with
+    one detector per image HDU identified by its CCDNUM header.
+    """
+
+    name = "MultiExtensionTest"
+    supported_instrument = "DummyCamMEF"
+    _const_map = {"instrument": "DummyCam",
+                  "exposure_id": 42,
+                  "observation_id": "exposure42",
+                  "observation_type": "science",
+                  "physical_filter": "d-r",
+                  "exposure_time": 15.0*u.s,
+                  "datetime_begin": Time("2020-01-01T00:00:00", scale="tai"),
+                  "datetime_end": Time("2020-01-01T00:00:15", scale="tai"),
+                  }
+    _trivial_map = {"detector_num": "CCDNUM"}
+
+
+class DummyCamTestTranslator(StubTranslator):
+    """Translator for the single-detector raws written by `writeDummyRaw`.
+    """
+
+    name = "DummyCamTest"
+    supported_instrument = "DummyCam"
+    _const_map = {"instrument": "DummyCam",
+                  "observation_type": "science",
+                  "physical_filter": "d-r",
+                  "exposure_time": 15.0*u.s,
+                  "dark_time": 15.0*u.s,
+                  }
+    _trivial_map = {"exposure_id": "EXPID",
+                    "detector_num": "CCDNUM",
+                    "observation_id": "OBSID"}
+
+    def to_datetime_begin(self):
+        return Time("2020-01-01T00:00:00", scale="tai") + self._header["EXPID"]*u.min
+
+    def to_datetime_end(self):
+        return self.to_datetime_begin() + 15.0*u.s
+
+
+class DummyCamTestRawFormatter(FitsRawFormatterBase):
+    translatorClass = DummyCamTestTranslator
+    filterDefinitions = FilterDefinitionCollection()
+
+    def getDetector(self, id):
+        raise NotImplementedError("No camera geometry for DummyCam.")
+
+
+def writeDummyRaw(filename, exposure, detector):
+    """Write a small raw file that `DummyCamTestTranslator` can translate.
+    """
+    hdu = astropy.io.fits.PrimaryHDU(numpy.zeros((2, 2), dtype=numpy.int16))
+    hdu.header["INSTRUME"] = DummyCamTestTranslator.supported_instrument
+    hdu.header["EXPID"] = exposure
+    hdu.header["CCDNUM"] = detector
+    hdu.header["OBSID"] = f"exposure{exposure}"
+    hdu.writeto(filename, overwrite=True)
+
+
 class RawIngestTestCase(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -57,6 +138,10 @@ class RawIngestTestCase(unittest.TestCase):
                                        datasetTypeName,
                                        {"instrument", "exposure"},
                                        storageClass)
+        cls.creatorButler.registry.insertDimensionData(
+            "detector",
+            *[{"instrument": "DummyCam", "id": n, "full_name": f"d{n}"} for n in range(3)]
+        )
 
     @classmethod
     def tearDownClass(cls):
@@ -82,6 +167,845 @@ class RawIngestTestCase(unittest.TestCase):
         self.assertEqual(self.task.universe, copy.universe)
         self.assertEqual(self.task.datasetType, copy.datasetType)
 
+    def testMultiExtensionUntranslatable(self):
+        filename = os.path.join(self.root, "mef.fits")
+        hdus = [astropy.io.fits.PrimaryHDU()]
+        hdus.extend(astropy.io.fits.ImageHDU(numpy.zeros((2, 2), dtype=numpy.int16)) for _ in range(2))
+        astropy.io.fits.HDUList(hdus).writeto(filename, overwrite=True)
+        with self.assertRaises(ValueError):
+            self.task._calculate_extension_dataset_info(filename)
+        self.task.config.multiExtension = True
+        self.assertEqual(self.task.extractMetadata(filename).datasets, [])
+
+    def _writeMultiExtensionFile(self, filename, ccdnums):
+        """Write a file with an empty primary HDU and one image HDU for each
+        of ``ccdnums``; `None` leaves CCDNUM out, so the HDU cannot be
+        translated.
+        """
+        hdus = [astropy.io.fits.PrimaryHDU()]
+        hdus[0].header["INSTRUME"] = MultiExtensionTestTranslator.supported_instrument
+        for ccdnum in ccdnums:
+            hdu = astropy.io.fits.ImageHDU(numpy.zeros((2, 2), dtype=numpy.int16))
+            if ccdnum is not None:
+                hdu.header["CCDNUM"] = ccdnum
+            hdus.append(hdu)
+        # An HDU without data is never a detector.
+        hdus.append(astropy.io.fits.ImageHDU())
+        astropy.io.fits.HDUList(hdus).writeto(filename, overwrite=True)
+
+    def testMultiExtension(self):
+        filename = os.path.join(self.root, "mef_good.fits")
+        self._writeMultiExtensionFile(filename, [0, None, 2, 1])
+        datasets = self.task._calculate_extension_dataset_info(filename)
+        # One dataset per translatable image HDU, in HDU order.
+        self.assertEqual([d.dataId["detector"] for d in datasets], [0, 2, 1])
+        for dataset in datasets:
+            self.assertEqual(dataset.dataId["instrument"], "DummyCam")
+            self.assertEqual(dataset.dataId["exposure"], 42)
+            self.assertEqual(dataset.obsInfo.detector_num, dataset.dataId["detector"])
+            self.assertEqual(dataset.obsInfo.physical_filter, "d-r")
+
+    def testMultiExtensionDuplicateDetector(self):
+        filename = os.path.join(self.root, "mef_duplicate.fits")
+        self._writeMultiExtensionFile(filename, [0, 1, 1])
+        with self.assertRaises(ValueError):
+            self.task._calculate_extension_dataset_info(filename)
+        # The whole file is reported as bad.
+        self.task.config.multiExtension = True
+        self.assertEqual(self.task.extractMetadata(filename).datasets, [])
+
+    def _makeFakeFileData(self, exposure, detector):
+        """Return a stand-in for the `RawFileData` of one detector's raw."""
+        dataId = dafButler.DataCoordinate.standardize(instrument="DummyCam", exposure=exposure,
+                                                      detector=detector, universe=self.task.universe)
+        return types.SimpleNamespace(filename=f"raw_{exposure}_{detector}.fits",
+                                     datasets=[types.SimpleNamespace(dataId=dataId, obsInfo=None)])
+
+    def testGroupByExposureStreaming(self):
+        # Files for exposure 43 are interleaved with those of 42 and 44, and
+        # exposure 44 is never complete.
+        order = [(42, 0), (43, 0), (42, 1), (43, 1), (42, 2), (44, 0), (43, 2), (44, 1)]
+        files = [self._makeFakeFileData(*key) for key in order]
+        instrumentRecords = types.SimpleNamespace(detectors=[0, 1, 2])
+        with unittest.mock.patch.object(self.task, "_getInstrumentRecords", return_value=instrumentRecords), \
+                unittest.mock.patch("lsst.obs.base.ingest.makeExposureRecordFromObsInfo"):
+            with self.subTest(window=10):
+                # Exposures are yielded as soon as they are complete, and
+                # interleaved files stay together.
+                groups = [(exposure.dataId["exposure"], [f.filename for f in exposure.files])
+                          for exposure in self.task.groupByExposureStreaming(iter(files), 10)]
+                self.assertEqual(groups, [
+                    (42, ["raw_42_0.fits", "raw_42_1.fits", "raw_42_2.fits"]),
+                    (43, ["raw_43_0.fits", "raw_43_1.fits", "raw_43_2.fits"]),
+                    (44, ["raw_44_0.fits", "raw_44_1.fits"]),
+                ])
+            with self.subTest(window=3):
+                # Holding a fourth file would exceed the window, so the
+                # oldest incomplete exposure is flushed early.
+                yielded = []
+
+                def record(fileData):
+                    for f in fileData:
+                        yielded.append(f.filename)
+                        yield f
+
+                groups = []
+                for exposure in self.task.groupByExposureStreaming(record(files), 3):
+                    groups.append((exposure.dataId["exposure"], [f.filename for f in exposure.files]))
+                    # Exposures are yielded before later files are read.
+                    if len(groups) == 1:
+                        self.assertEqual(len(yielded), 4)
+                self.assertEqual(groups, [
+                    (42, ["raw_42_0.fits", "raw_42_1.fits"]),
+                    (43, ["raw_43_0.fits", "raw_43_1.fits"]),
+                    (42, ["raw_42_2.fits"]),
+                    (44, ["raw_44_0.fits", "raw_44_1.fits"]),
+                    (43, ["raw_43_2.fits"]),
+                ])
+
+    def _makeUnexpandedExposure(self, exposure, detectors):
+        """Return a stand-in for the `RawExposureData` of an exposure in the
+        test repository, with unexpanded data IDs.
+        """
+        registry = self.butler.registry
+        record, = registry.queryDimensionRecords("exposure", instrument="DummyCam", exposure=exposure)
+        dataId = dafButler.DataCoordinate.standardize(instrument="DummyCam", exposure=exposure,
+                                                      universe=self.task.universe)
+        files = [types.SimpleNamespace(datasets=[types.SimpleNamespace(
+            dataId=dafButler.DataCoordinate.standardize(dataId, detector=detector)
+        )]) for detector in detectors]
+        return types.SimpleNamespace(dataId=dataId, record=record, files=files)
+
+    def _assertExpandedLikeRegistry(self, dataId, original):
+        """Check that an expanded data ID matches what the registry makes of
+        the original one.
+        """
+        expected = self.butler.registry.expandDataId(original)
+        self.assertTrue(dataId.hasRecords())
+        self.assertEqual(dataId, expected)
+        self.assertEqual(dataId.full.byName(), expected.full.byName())
+        for name in expected.graph.elements.names:
+            with self.subTest(element=name):
+                self.assertEqual(dataId.records[name].toDict(), expected.records[name].toDict())
+
+    def testExpandDataIdsLocally(self):
+        data = self._makeUnexpandedExposure(42, [0, 1, 2])
+        originals = [file.datasets[0].dataId for file in data.files]
+        registry = self.butler.registry
+        with unittest.mock.patch.object(registry, "expandDataId", wraps=registry.expandDataId) as expand:
+            self.task.expandDataIds(data)
+        # Only the exposure-level data ID needed the registry.
+        self.assertEqual(expand.call_count, 1)
+        for file, original in zip(data.files, originals):
+            self._assertExpandedLikeRegistry(file.datasets[0].dataId, original)
+
+    def testExpandDataIdsFallback(self):
+        data = self._makeUnexpandedExposure(43, [0, 1])
+        originals = [file.datasets[0].dataId for file in data.files]
+        registry = self.butler.registry
+        missing = _InstrumentRecords(instrument=None, detectors={}, physical_filters={})
+        with unittest.mock.patch.object(self.task, "_getInstrumentRecords", return_value=missing), \
+                unittest.mock.patch.object(registry, "expandDataId", wraps=registry.expandDataId) as expand:
+            self.task.expandDataIds(data)
+        # Without cached detector records every data ID is expanded by the
+        # registry, with the same result.
+        self.assertEqual(expand.call_count, 3)
+        for file, original in zip(data.files, originals):
+            self._assertExpandedLikeRegistry(file.datasets[0].dataId, original)
+        # A detector the registry does not know about is still reported.
+        data = self._makeUnexpandedExposure(43, [99])
+        with self.assertRaises(LookupError):
+            self.task.expandDataIds(data)
+
+    def testShardsWaitForEachOther(self):
+        """Test that a shard that has extracted every file it knows about
+        waits for the other shards to add theirs before loading its share.
+        """
+        queueFile = os.path.join(self.root, "staggered.sqlite3")
+        files = [os.path.join(self.root, f"staggered_{n}.fits") for n in range(4)]
+
+        def extract(path):
+            n = files.index(path)
+            dataId = {"instrument": "DummyCam", "exposure": n // 2, "detector": n % 2}
+            return types.SimpleNamespace(filename=path, datasets=[types.SimpleNamespace(dataId=dataId)])
+
+        self.task.config.shardPollInterval = 0.01
+        finished = threading.Event()
+
+        def runFirstShard():
+            with IngestWorkQueue(queueFile) as queue:
+                queue.register(0, 2, files)
+                self.task._extractQueued(queue, 0, 2)
+            finished.set()
+
+        with unittest.mock.patch.object(self.task, "extractMetadata", side_effect=extract):
+            thread = threading.Thread(target=runFirstShard)
+            thread.start()
+            waited = not finished.wait(0.5)
+            # The second shard starts late, once everything is extracted.
+            with IngestWorkQueue(queueFile) as queue:
+                remaining = queue.countRemaining()
+                queue.register(1, 2, reversed(files))
+                self.task._extractQueued(queue, 1, 2)
+            thread.join(30)
+        self.assertTrue(waited)
+        self.assertEqual(remaining, 0)
+        self.assertFalse(thread.is_alive())
+        with IngestWorkQueue(queueFile) as queue:
+            shards = [queue.loadShard(shard, 2) for shard in range(2)]
+        self.assertCountEqual([data.filename for shard in shards for data in shard], files)
+
+    def testGroupByExposureStreamingNoDetectors(self):
+        # Without any detectors to count, exposures are only split by the
+        # window.
+        order = [(42, 0), (42, 1), (43, 0), (42, 2), (43, 1)]
+        files = [self._makeFakeFileData(*key) for key in order]
+        instrumentRecords = types.SimpleNamespace(detectors={})
+        with unittest.mock.patch.object(self.task, "_getInstrumentRecords", return_value=instrumentRecords), \
+                unittest.mock.patch("lsst.obs.base.ingest.makeExposureRecordFromObsInfo"):
+            groups = [(exposure.dataId["exposure"], len(exposure.files))
+                      for exposure in self.task.groupByExposureStreaming(iter(files), 10)]
+            self.assertEqual(groups, [(42, 3), (43, 2)])
+            groups = [(exposure.dataId["exposure"], len(exposure.files))
+                      for exposure in self.task.groupByExposureStreaming(iter(files), 3)]
+            self.assertEqual(groups, [(42, 3), (43, 2)])
+
+    def _makeFakeExposures(self, nExposures, nDetectors):
+        """Write small files and return stand-ins for the `RawExposureData`
+        describing them.
+        """
+        exposures = []
+        for n in range(nExposures):
+            files = []
+            for detector in range(nDetectors):
+                filename = os.path.join(self.root, f"raw_{n}_{detector}.fits")
+                with open(filename, "w") as stream:
+                    stream.write(f"{n}, {detector}")
+                files.append(types.SimpleNamespace(filename=filename))
+            record = types.SimpleNamespace(id=n, instrument="DummyCam", obs_id=f"exposure{n}")
+            exposures.append(types.SimpleNamespace(record=record, files=files, staged={}))
+        return exposures
+
+    def testTransferThreadsValidation(self):
+        config = RawIngestTask.ConfigClass()
+        config.transferThreads = 4
+        for transfer, stagingDirectory, warned in (("copy", None, True),
+                                                   ("symlink", self.root, True),
+                                                   ("copy", self.root, False)):
+            with self.subTest(transfer=transfer, stagingDirectory=stagingDirectory):
+                config.transfer = transfer
+                config.stagingDirectory = stagingDirectory
+                with unittest.mock.patch("lsst.obs.base.ingest._log") as log:
+                    config.validate()
+                self.assertEqual(log.warning.called, warned)
+
+    def testStageAhead(self):
+        self.task.config.stagingDirectory = os.path.join(self.root, "staging")
+        self.task.config.stagingDepth = 2
+        exposures = self._makeFakeExposures(4, 3)
+        for transferThreads in (1, 3):
+            with self.subTest(transferThreads=transferThreads):
+                self.task.config.transferThreads = transferThreads
+                self.task.statistics = IngestStatistics()
+                seen = []
+                for exposure in self.task._stageAhead(exposures):
+                    self.assertEqual(len(exposure.staged), 3)
+                    for original, staged in exposure.staged.items():
+                        self.assertNotEqual(original, staged)
+                        with open(original) as a, open(staged) as b:
+                            self.assertEqual(a.read(), b.read())
+                    seen.append(exposure.record.id)
+                self.assertEqual(seen, [0, 1, 2, 3])
+                # All staged copies are cleaned up once the iterator is
+                # exhausted.
+                self.assertEqual(os.listdir(self.task.config.stagingDirectory), [])
+                self.assertEqual(self.task.statistics["stage"].items, 12)
+
+    def testDryRun(self):
+        exposures = self._makeFakeExposures(2, 3)
+        scratch = os.path.join(self.root, "scratch")
+        with unittest.mock.patch.object(self.task, "prep", return_value=(iter(exposures), ["bad.fits"])), \
+                unittest.mock.patch.object(self.task, "_ingestExposures") as ingest:
+            statistics = self.task.dryRun([], scratchDirectory=scratch)
+        ingest.assert_not_called()
+        self.assertIs(statistics, self.task.statistics)
+        self.assertEqual(statistics["stage"].items, 6)
+        self.assertGreater(statistics["stage"].bytes, 0)
+        # The simulated transfer leaves nothing behind.
+        self.assertEqual(os.listdir(scratch), [])
+
+    def _mockExistingRaws(self, existing):
+        """Replace the task's butler with one whose registry knows two
+        instruments, with ``existing`` (exposure, detector) raws for DummyCam.
+        """
+        butler = unittest.mock.MagicMock()
+        butler.registry.queryDimensionRecords.return_value = [
+            types.SimpleNamespace(name="DummyCam"),
+            types.SimpleNamespace(name="OtherCam"),
+        ]
+
+        def queryDatasets(datasetType, *, collections, instrument):
+            if instrument != "DummyCam":
+                raise LookupError(f"No raws for {instrument}.")
+            return [types.SimpleNamespace(dataId={"instrument": instrument, "exposure": exposure,
+                                                  "detector": detector},
+                                          path=os.path.join(self.root, f"raw_{exposure}_{detector}.fits"))
+                    for exposure, detector in existing]
+
+        butler.registry.queryDatasets.side_effect = queryDatasets
+        # A datastore that keeps no file records, so URIs must be looked up
+        # one dataset at a time.
+        butler.datastore = types.SimpleNamespace()
+        butler.getURI.side_effect = lambda ref: dafButler.ButlerURI(ref.path)
+        self.task.butler = butler
+        instrument = unittest.mock.MagicMock()
+        instrument.makeDefaultRawIngestRunName.return_value = "DummyCam/raw/all"
+        return butler, instrument
+
+    def testQueryExistingDataIds(self):
+        butler, instrument = self._mockExistingRaws([(42, 0), (42, 1)])
+        with unittest.mock.patch.object(self.task, "_getInstrument", return_value=instrument):
+            with self.subTest(run=None):
+                # Each instrument's raws are looked for in its own default
+                # raw run, not in every collection.
+                existing = self.task._queryExistingDataIds(None)
+                self.assertEqual(existing, {("DummyCam", 42, 0), ("DummyCam", 42, 1)})
+                butler.registry.queryDatasets.assert_any_call("raw", collections=["DummyCam/raw/all"],
+                                                              instrument="DummyCam")
+            butler.registry.queryDatasets.reset_mock()
+            with self.subTest(run="raw/test"):
+                self.task._queryExistingDataIds("raw/test")
+                for call in butler.registry.queryDatasets.call_args_list:
+                    self.assertEqual(call.kwargs["collections"], ["raw/test"])
+
+    def testFilterExisting(self):
+        fileData = [self._makeFakeFileData(42, 0), self._makeFakeFileData(42, 1),
+                    self._makeFakeFileData(43, 0)]
+        # A file with several datasets is kept unless all of them exist.
+        fileData[1].datasets.append(self._makeFakeFileData(42, 2).datasets[0])
+        existing = {("DummyCam", 42, 0), ("DummyCam", 42, 1)}
+        remaining = list(self.task._filterExisting(fileData, existing))
+        self.assertEqual([f.filename for f in remaining], ["raw_42_1.fits", "raw_43_0.fits"])
+
+    def testFilterExistingPaths(self):
+        self._mockExistingRaws([(42, 0)])
+        files = [os.path.join(self.root, "raw_42_0.fits"), os.path.join(self.root, "raw_42_1.fits")]
+        remaining = self.task._filterExistingPaths(files, "raw/test")
+        self.assertEqual(remaining, files[1:])
+
+
+class RegistryIngestTestCase(unittest.TestCase):
+    """Tests of ingest that write raws to a real registry and datastore.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root = tempfile.mkdtemp(dir=TESTDIR)
+        cls.creatorButler = butlerTests.makeTestRepo(cls.root, {"instrument": ["DummyCam"],
+                                                                "physical_filter": ["d-r"]})
+        cls.creatorButler.registry.insertDimensionData(
+            "detector",
+            *[{"instrument": "DummyCam", "id": n, "full_name": f"d{n}"} for n in range(2)]
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.root, ignore_errors=True)
+
+    def setUp(self):
+        self.butler = butlerTests.makeTestCollection(self.creatorButler)
+        self.rawDirectory = tempfile.mkdtemp(dir=self.root)
+        config = RawIngestTask.ConfigClass()
+        config.transfer = "copy"
+        self.task = RawIngestTask(config=config, butler=self.butler)
+        # The test repository does not know how to import an Instrument
+        # class for DummyCam, so supply a stand-in for the few methods
+        # ingest uses.
+        instrument = unittest.mock.Mock()
+        instrument.getRawFormatter.return_value = DummyCamTestRawFormatter
+        instrument.getName.return_value = "DummyCam"
+        instrument.makeDefaultRawIngestRunName.return_value = "DummyCam/raw/all"
+        patcher = unittest.mock.patch.object(self.task, "_getInstrument", return_value=instrument)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def writeRaws(self, exposures):
+        """Write raws for two detectors of each of ``exposures``."""
+        files = []
+        for exposure in exposures:
+            for detector in range(2):
+                filename = os.path.join(self.rawDirectory, f"raw_{exposure}_{detector}.fits")
+                writeDummyRaw(filename, exposure, detector)
+                files.append(filename)
+        return files
+
+    def queryRaws(self, run):
+        """Return the (exposure, detector) data IDs of the raws in a run."""
+        return sorted((ref.dataId["exposure"], ref.dataId["detector"])
+                      for ref in self.butler.registry.queryDatasets("raw", collections=[run]))
+
+    def testExposureBatch(self):
+        self.task.config.exposureBatchSize = 3
+        files = self.writeRaws([100, 101, 102])
+        with unittest.mock.patch.object(self.butler, "ingest", wraps=self.butler.ingest) as ingest:
+            refs = self.task.run(files, run="raw/batch")
+        self.assertEqual(len(refs), 6)
+        # All three exposures were registered and ingested in one go.
+        self.assertEqual(ingest.call_count, 1)
+        self.assertEqual(self.task.statistics["insertDimensionData"].items, 3)
+        self.assertEqual(self.task.statistics["syncDimensionData"].calls, 0)
+        self.assertEqual(self.queryRaws("raw/batch"), [(e, d) for e in (100, 101, 102) for d in range(2)])
+        records = self.butler.registry.queryDimensionRecords("exposure", instrument="DummyCam",
+                                                             where="exposure IN (100, 101, 102)")
+        self.assertEqual(sorted(record.obs_id for record in records),
+                         ["exposure100", "exposure101", "exposure102"])
+
+    def testExposureBatchFallback(self):
+        """Test that a batch containing already-registered exposures is
+        rolled back and ingested one exposure at a time, with only the
+        exposure that cannot be registered failing.
+        """
+        self.task.config.exposureBatchSize = 3
+        self.task.config.journalFile = os.path.join(self.rawDirectory, "journal.sqlite3")
+        files = self.writeRaws([110, 111, 112])
+        registry = self.butler.registry
+        # Exposure 111 is already registered just as ingest would register
+        # it, and exposure 112 with a different exposure time.
+        for filename, exposureTime in ((files[2], None), (files[4], 99.0)):
+            obsInfo = self.task.extractMetadata(filename).datasets[0].obsInfo
+            record = makeExposureRecordFromObsInfo(obsInfo, registry.dimensions).toDict()
+            if exposureTime is not None:
+                record["exposure_time"] = exposureTime
+            registry.syncDimensionData("exposure", registry.dimensions["exposure"].RecordClass(**record))
+        with unittest.mock.patch.object(self.butler, "ingest", wraps=self.butler.ingest) as ingest:
+            with self.assertRaises(RuntimeError):
+                self.task.run(files, run="raw/fallback")
+        # The batch insert failed before anything was ingested, and each
+        # exposure was then tried on its own.
+        self.assertEqual(self.task.statistics["insertDimensionData"].calls, 1)
+        self.assertEqual(self.task.statistics["syncDimensionData"].items, 3)
+        self.assertEqual(ingest.call_count, 2)
+        self.assertEqual(self.queryRaws("raw/fallback"), [(e, d) for e in (110, 111) for d in range(2)])
+        # The conflicting exposure record was left alone.
+        record, = registry.queryDimensionRecords("exposure", instrument="DummyCam", exposure=112)
+        self.assertEqual(record.exposure_time, 99.0)
+        with IngestJournal(self.task.config.journalFile) as journal:
+            for n, filename in enumerate(files):
+                status, reason = journal.getStatus(filename)
+                if n < 4:
+                    self.assertEqual(status, "committed")
+                else:
+                    self.assertEqual(status, "failed")
+                    self.assertIn("could not be registered", reason)
+
+    def testCompactTransport(self):
+        """Test that metadata sent back from workers in compact form expands
+        to the same exposure as metadata extracted in the same process.
+        """
+        filename = self.writeRaws([140])[0]
+        fileData = self.task.extractMetadata(filename)
+        compact = self.task.extractCompactMetadata(filename)
+        self.assertLess(len(pickle.dumps(compact.datasets)),
+                        len(pickle.dumps([dataset.obsInfo for dataset in fileData.datasets])))
+        decoded, = self.task._expandCompactMetadata([pickle.loads(pickle.dumps(compact))])
+        self.assertEqual(decoded.filename, fileData.filename)
+        self.assertIs(decoded.FormatterClass, DummyCamTestRawFormatter)
+        self.assertEqual([d.dataId for d in decoded.datasets], [d.dataId for d in fileData.datasets])
+        expected, = self.task.groupByExposure([fileData])
+        expected = self.task.expandDataIds(expected)
+        exposure, = self.task.groupByExposure([decoded])
+        exposure = self.task.expandDataIds(exposure)
+        self.assertEqual(exposure.dataId, expected.dataId)
+        self.assertEqual(exposure.dataId.records["exposure"].toDict(),
+                         expected.dataId.records["exposure"].toDict())
+        self.assertEqual([d.dataId.records["detector"].toDict() for d in exposure.files[0].datasets],
+                         [d.dataId.records["detector"].toDict() for d in expected.files[0].datasets])
+
+    def testSkipExistingDirect(self):
+        """Test that re-ingesting files in place skips them before their
+        headers are read.
+        """
+        self.task.config.transfer = "direct"
+        self.task.config.skipExisting = True
+        files = self.writeRaws([120, 121])
+        # The first run writes to a collection that does not exist yet.
+        with unittest.mock.patch.object(self.task, "extractMetadata",
+                                        wraps=self.task.extractMetadata) as extractMetadata:
+            refs = self.task.run(files, run="raw/skip")
+        self.assertEqual(len(refs), 4)
+        self.assertEqual(extractMetadata.call_count, 4)
+        self.assertEqual(self.task.statistics["filterExistingPaths"].items, 4)
+        with unittest.mock.patch.object(self.task, "extractMetadata",
+                                        wraps=self.task.extractMetadata) as extractMetadata:
+            refs = self.task.run(files, run="raw/skip")
+        self.assertEqual(refs, [])
+        extractMetadata.assert_not_called()
+        self.assertEqual(self.queryRaws("raw/skip"), [(e, d) for e in (120, 121) for d in range(2)])
+
+    def testJournalResumeTransferred(self):
+        """Test that files a crash left "transferred" are checked against the
+        registry on resume, rather than being ingested again.
+        """
+        self.task.config.journalFile = os.path.join(self.rawDirectory, "journal.sqlite3")
+        committed = self.writeRaws([130])
+        self.task.run(committed, run="raw/resume")
+        interrupted = self.writeRaws([131])
+        # Simulate a crash after the transaction for exposure 130 committed
+        # but before the journal recorded it, and one while exposure 131 was
+        # still being ingested.
+        with IngestJournal(self.task.config.journalFile) as journal:
+            journal.record(committed + interrupted, "transferred")
+        refs = self.task.run(committed + interrupted, run="raw/resume")
+        self.assertEqual(sorted((ref.dataId["exposure"], ref.dataId["detector"]) for ref in refs),
+                         [(131, 0), (131, 1)])
+        self.assertEqual(self.queryRaws("raw/resume"), [(e, d) for e in (130, 131) for d in range(2)])
+        with IngestJournal(self.task.config.journalFile) as journal:
+            self.assertEqual(journal.counts(),
+                             {"extracted": 0, "transferred": 0, "committed": 4, "failed": 0})
+
+
+class ImapBoundedTestCase(unittest.TestCase):
+    def testBounded(self):
+        submitted = []
+
+        def imap(func, chunk, chunksize):
+            # Like a pool, queue all work in the chunk immediately.
+            submitted.extend(chunk)
+            return iter([func(item) for item in chunk])
+
+        results = _imapBounded(imap, lambda x: 2*x, iter(range(10)), 3, chunksize=1)
+        self.assertEqual(submitted, [])
+        self.assertEqual(next(results), 0)
+        # Only the first two slices have been handed to the pool.
+        self.assertEqual(submitted, list(range(6)))
+        self.assertEqual(list(results), [2*x for x in range(1, 10)])
+        self.assertEqual(list(_imapBounded(imap, lambda x: x, iter([]), 3, chunksize=1)), [])
+
+
+class RawMetadataCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(dir=TESTDIR)
+        self.cacheFile = os.path.join(self.root, "cache.sqlite3")
+        self.rawFile = os.path.join(self.root, "raw.fits")
+        with open(self.rawFile, "w") as stream:
+            stream.write("original")
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def testRoundTrip(self):
+        data = types.SimpleNamespace(datasets=["dataset"], filename=self.rawFile)
+        failed = types.SimpleNamespace(datasets=[], filename=os.path.join(self.root, "bad.fits"))
+        with RawMetadataCache(self.cacheFile) as cache:
+            cached, missing = cache.partition([self.rawFile])
+            self.assertEqual(cached, [])
+            self.assertEqual(missing, [self.rawFile])
+            self.assertEqual(list(cache.storeAll([data, failed])), [data, failed])
+        with RawMetadataCache(self.cacheFile) as cache:
+            cached, missing = cache.partition([self.rawFile, failed.filename])
+            self.assertEqual(cached, [data])
+            self.assertEqual(missing, [failed.filename])
+
+    def testInvalidation(self):
+        data = types.SimpleNamespace(datasets=["dataset"], filename=self.rawFile)
+        for useHash in (False, True):
+            with self.subTest(useHash=useHash):
+                with RawMetadataCache(self.cacheFile, useHash=useHash) as cache:
+                    cache.put(data)
+                with open(self.rawFile, "a") as stream:
+                    stream.write(", modified")
+                with RawMetadataCache(self.cacheFile, useHash=useHash) as cache:
+                    self.assertIsNone(cache.get(self.rawFile))
+
+    def testContext(self):
+        data = types.SimpleNamespace(datasets=["dataset"], filename=self.rawFile)
+        with RawMetadataCache(self.cacheFile, context="translator 1.0") as cache:
+            cache.put(data)
+        with RawMetadataCache(self.cacheFile, context="translator 1.0") as cache:
+            self.assertEqual(cache.get(self.rawFile), data)
+        # Entries written with another context, e.g. by an older metadata
+        # translator, are misses and are replaced.
+        with RawMetadataCache(self.cacheFile, context="translator 2.0") as cache:
+            self.assertIsNone(cache.get(self.rawFile))
+            cache.put(data)
+        with RawMetadataCache(self.cacheFile, context="translator 2.0") as cache:
+            self.assertEqual(cache.get(self.rawFile), data)
+
+    def testOldSchema(self):
+        """Test that a cache written before contexts were recorded is
+        emptied rather than trusted.
+        """
+        with sqlite3.connect(self.cacheFile) as connection:
+            connection.execute("CREATE TABLE raw_metadata (path TEXT PRIMARY KEY, size INTEGER NOT NULL, "
+                               "mtime_ns INTEGER NOT NULL, hash TEXT NOT NULL, data BLOB NOT NULL)")
+            connection.execute("INSERT INTO raw_metadata VALUES (?, 0, 0, '', x'00')", (self.rawFile,))
+        connection.close()
+        with RawMetadataCache(self.cacheFile) as cache:
+            self.assertIsNone(cache.get(self.rawFile))
+
+
+class IngestJournalTestCase(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(dir=TESTDIR)
+        self.journalFile = os.path.join(self.root, "journal.sqlite3")
+        self.files = [os.path.join(self.root, f"raw_{n}.fits") for n in range(4)]
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def testResume(self):
+        with IngestJournal(self.journalFile) as journal:
+            journal.record(self.files[:3], "extracted", exposure="Cam:1")
+            journal.record(self.files[:2], "committed")
+            journal.record(self.files[2:3], "failed", reason="Database is locked")
+        # A new journal on the same file sees everything recorded before.
+        with IngestJournal(self.journalFile) as journal:
+            self.assertEqual(journal.counts(),
+                             {"extracted": 0, "transferred": 0, "committed": 2, "failed": 1})
+            self.assertEqual(journal.getStatus(self.files[0]), ("committed", None))
+            self.assertIsNone(journal.getStatus(self.files[3]))
+            self.assertEqual(journal.failures(), [(self.files[2], "Cam:1", "Database is locked")])
+            self.assertEqual(journal.filterFiles(self.files), self.files[2:])
+            self.assertEqual(journal.filterFiles(self.files, retryFailedOnly=True), self.files[2:3])
+            # Relative paths are matched by their absolute path.
+            self.assertEqual(journal.filterFiles([os.path.relpath(self.files[0])]), [])
+            with self.assertRaises(ValueError):
+                journal.record(self.files, "ingested")
+
+    def testSelectFiles(self):
+        with IngestJournal(self.journalFile) as journal:
+            journal.record(self.files[1:3], "transferred")
+            journal.record(self.files[3:], "committed")
+            self.assertEqual(journal.selectFiles(reversed(self.files), "transferred"),
+                             [self.files[2], self.files[1]])
+            self.assertEqual(journal.selectFiles(self.files[:2], "committed"), [])
+
+
+class IngestWorkQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(dir=TESTDIR)
+        self.queueFile = os.path.join(self.root, "queue.sqlite3")
+        # Two files per exposure, and one unreadable file.
+        self.files = [os.path.join(self.root, f"raw_{n}.fits") for n in range(9)]
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _extract(self, path):
+        """Return a stand-in for the `RawFileData` of a file."""
+        n = self.files.index(path)
+        if n == 8:
+            return types.SimpleNamespace(filename=path, datasets=[])
+        dataId = {"instrument": "Cam", "exposure": n // 2, "detector": n % 2}
+        return types.SimpleNamespace(filename=path, datasets=[types.SimpleNamespace(dataId=dataId)])
+
+    def testShards(self):
+        nShards = 2
+        with IngestWorkQueue(self.queueFile) as queue0, IngestWorkQueue(self.queueFile) as queue1:
+            queue0.register(0, nShards, self.files)
+            self.assertEqual(queue0.countUnregistered(nShards), 1)
+            queue1.register(1, nShards, reversed(self.files))
+            self.assertEqual(queue0.countUnregistered(nShards), 0)
+            claimed0 = queue0.claim(0, 5)
+            claimed1 = queue1.claim(1, 5)
+            self.assertEqual(claimed0 + claimed1, self.files)
+            self.assertEqual(queue1.claim(1, 5), [])
+            queue0.store(0, map(self._extract, claimed0))
+            self.assertEqual(queue0.countRemaining(), len(claimed1))
+            queue1.store(1, map(self._extract, claimed1))
+            self.assertEqual(queue0.countRemaining(), 0)
+            shards = [[data.filename for data in queue.loadShard(shard, nShards)]
+                      for shard, queue in enumerate((queue0, queue1))]
+        # Every file is ingested by exactly one shard, and exposures are
+        # never split.
+        self.assertCountEqual(shards[0] + shards[1], self.files)
+        for n in range(4):
+            shard = shardOf(f"Cam:{n}", nShards)
+            self.assertIn(self.files[2*n], shards[shard])
+            self.assertIn(self.files[2*n + 1], shards[shard])
+        # The unreadable file is reported by the shard that read it.
+        self.assertIn(self.files[8], shards[1])
+
+    def testStaleClaims(self):
+        with IngestWorkQueue(self.queueFile) as queue:
+            queue.register(0, 2, self.files)
+            self.assertEqual(queue.claim(0, 9), self.files)
+            self.assertEqual(queue.claim(1, 9, staleAfter=3600.0), [])
+            # Claims older than staleAfter are taken over.
+            time.sleep(0.01)
+            self.assertEqual(queue.claim(1, 9, staleAfter=0.0), self.files)
+
+    def testDifferentFiles(self):
+        with IngestWorkQueue(self.queueFile) as queue:
+            queue.register(0, 2, self.files)
+            with self.assertRaises(ValueError):
+                queue.register(1, 2, self.files[:3])
+            self.assertEqual(queue.countUnregistered(2), 1)
+            # A shard may register again, e.g. when it is rerun.
+            queue.register(0, 2, self.files)
+
+
+class IngestStatisticsTestCase(unittest.TestCase):
+    def testNestedIterators(self):
+        stats = IngestStatistics()
+
+        def slow(n):
+            for i in range(n):
+                time.sleep(0.01)
+                yield i
+
+        inner = stats.timeIterator("inner", slow(3))
+        outer = stats.timeIterator("outer", (2*i for i in inner))
+        with stats.timer("total"):
+            self.assertEqual(list(outer), [0, 2, 4])
+        self.assertEqual(stats["inner"].items, 3)
+        self.assertEqual(stats["outer"].items, 3)
+        self.assertEqual(stats["total"].calls, 1)
+        # Time spent in the nested stage is not attributed to the outer ones.
+        self.assertGreaterEqual(stats["inner"].seconds, 0.03)
+        self.assertLess(stats["outer"].seconds, stats["inner"].seconds)
+        self.assertGreaterEqual(stats["outer"].totalSeconds, stats["inner"].totalSeconds)
+        self.assertAlmostEqual(stats["total"].totalSeconds,
+                               sum(stage.seconds for stage in stats.stages.values()), places=6)
+
+    def testWriteJson(self):
+        stats = IngestStatistics()
+        with stats.timer("ingest", items=2, nbytes=100):
+            pass
+        with tempfile.NamedTemporaryFile(mode="r", suffix=".jsonl") as stream:
+            stats.writeJson(stream.name, label="test")
+            stats.writeJson(stream.name)
+            lines = [json.loads(line) for line in stream]
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[0]["label"], "test")
+        self.assertEqual(lines[1]["stages"]["ingest"]["bytes"], 100)
+        self.assertEqual(lines[1]["stages"]["ingest"]["items"], 2)
+
+
+class InstrumentCacheTestCase(unittest.TestCase):
+    def testCachedInstrument(self):
+        class FakeRegistry:
+            pass
+
+        registry = FakeRegistry()
+        with unittest.mock.patch.object(Instrument, "fromName",
+                                        side_effect=lambda name, registry: object()) as fromName:
+            first = _getCachedInstrument("Cam", registry)
+            self.assertIs(_getCachedInstrument("Cam", registry), first)
+            self.assertEqual(fromName.call_count, 1)
+            # A different registry or name is a different entry.
+            self.assertIsNot(_getCachedInstrument("Cam", FakeRegistry()), first)
+            _getCachedInstrument("OtherCam", registry)
+            self.assertEqual(fromName.call_count, 3)
+            # Failures are not cached.
+            fromName.side_effect = LookupError
+            for _ in range(2):
+                with self.assertRaises(LookupError):
+                    _getCachedInstrument("Unknown", registry)
+            self.assertEqual(fromName.call_count, 5)
+
+    def testCachedRawFormatter(self):
+        class FakeRegistry:
+            pass
+
+        registry = FakeRegistry()
+        instrument = unittest.mock.Mock()
+        instrument.getName.return_value = "Cam"
+        instrument.getRawFormatter.side_effect = lambda dataId: object()
+        first = _getCachedRawFormatter(instrument, {"detector": 1, "exposure": 1}, registry)
+        # Only the detector matters within a registry.
+        self.assertIs(_getCachedRawFormatter(instrument, {"detector": 1, "exposure": 2}, registry), first)
+        self.assertEqual(instrument.getRawFormatter.call_count, 1)
+        # Another detector, or another registry, is a different entry.
+        self.assertIsNot(_getCachedRawFormatter(instrument, {"detector": 2, "exposure": 1}, registry),
+                         first)
+        self.assertIsNot(_getCachedRawFormatter(instrument, {"detector": 1, "exposure": 1}, FakeRegistry()),
+                         first)
+        self.assertEqual(instrument.getRawFormatter.call_count, 3)
+
+
+class FileOrderingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(dir=TESTDIR)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def testOrderByLocality(self):
+        files = []
+        for directory in ("b", "a"):
+            os.makedirs(os.path.join(self.root, directory))
+            for n in range(3):
+                filename = os.path.join(self.root, directory, f"raw_{n}.fits")
+                with open(filename, "w"):
+                    pass
+                files.append(filename)
+        missing = os.path.join(self.root, "missing.fits")
+        shuffled = [missing] + files[::-1]
+        ordered = orderByLocality(shuffled)
+        self.assertEqual(sorted(ordered), sorted(shuffled))
+        self.assertEqual(ordered[-1], missing)
+        # Files from one directory are kept together, in creation (inode)
+        # order on typical filesystems.
+        directories = [os.path.dirname(f) for f in ordered[:-1]]
+        self.assertEqual(directories, sorted(directories))
+        for directory in set(directories):
+            inodes = [os.stat(f).st_ino for f in ordered[:-1] if os.path.dirname(f) == directory]
+            self.assertEqual(inodes, sorted(inodes))
+
+
+class IngestManifestTestCase(unittest.TestCase):
+    ROW = dict(path="raw.fits", instrument="DummyCam", exposure_id=42, detector_num=1,
+               observation_id="DC_42", observation_type="science", physical_filter="d-r",
+               datetime_begin="2020-01-01T00:00:00", datetime_end="2020-01-01T00:00:30",
+               exposure_time=30.0, tracking_ra=10.0, tracking_dec=-20.0, checksum="abc")
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(dir=TESTDIR)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _check(self, rows):
+        self.assertEqual(len(rows), 1)
+        row = rows[0]
+        self.assertEqual(row["path"], os.path.join(self.root, "raw.fits"))
+        self.assertEqual(row["exposure_id"], 42)
+        self.assertEqual(row["exposure_time"], 30.0)
+        self.assertIsNone(row["dark_time"])
+        self.assertNotIn("checksum", row)
+        obsInfo = makeManifestObservationInfo(row)
+        self.assertEqual(obsInfo.instrument, "DummyCam")
+        self.assertEqual(obsInfo.detector_num, 1)
+        self.assertEqual(obsInfo.exposure_time.to_value("s"), 30.0)
+        self.assertAlmostEqual(obsInfo.tracking_radec.ra.degree, 10.0)
+        self.assertEqual(obsInfo.datetime_begin.scale, "tai")
+
+    def testJson(self):
+        manifest = os.path.join(self.root, "manifest.json")
+        with open(manifest, "w") as stream:
+            json.dump([self.ROW], stream)
+        self._check(readManifest(manifest))
+
+    def testCsv(self):
+        manifest = os.path.join(self.root, "manifest.csv")
+        with open(manifest, "w") as stream:
+            stream.write(",".join(self.ROW) + ",dark_time\n")
+            stream.write(",".join(str(v) for v in self.ROW.values()) + ",\n")
+        self._check(readManifest(manifest))
+
+    def testInvalid(self):
+        manifest = os.path.join(self.root, "manifest.json")
+        for row in ({k: v for k, v in self.ROW.items() if k != "exposure_time"},
+                    dict(self.ROW, exposure_id="forty-two")):
+            with self.subTest(row=row):
+                with open(manifest, "w") as stream:
+                    json.dump([row], stream)
+                with self.assertRaises(ValueError):
+                    readManifest(manifest)
+        with self.assertRaises(ValueError):
+            readManifest(os.path.join(self.root, "manifest.txt"))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,127 @@
+# This file is part of daf_butler.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (http://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import lsst.log
+
+from lsst.obs.base.ingestWatcher import RawIngestWatcher, inotify_simple
+
+TESTDIR = os.path.dirname(__file__)
+
+
+class _RecordingTask:
+    """Stand-in for RawIngestTask that records what it is asked to ingest.
+    """
+
+    def __init__(self):
+        self.log = lsst.log.Log.getLogger("test_ingestWatcher")
+        self.batches = []
+
+    def run(self, files, run=None):
+        self.batches.append(sorted(files))
+        return files
+
+
+class RawIngestWatcherTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(dir=TESTDIR)
+        self.task = _RecordingTask()
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def write(self, name, content="data"):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a") as stream:
+            stream.write(content)
+        return path
+
+    def testPolling(self):
+        old = self.write("old.fits")
+        self.write("notes.txt")
+        watcher = RawIngestWatcher(self.task, [self.root], useInotify=False, settleTime=0.0, batchSize=2)
+        watcher.run(duration=0.0)
+        self.assertEqual(self.task.batches, [[old]])
+        # New files are only ingested once they have been seen unchanged on
+        # two scans.
+        new = [self.write("a.fits"), self.write(os.path.join("sub", "b.fits")), self.write("c.fits")]
+        self.assertEqual(watcher.poll(), 0)
+        self.assertEqual(watcher.poll(), 3)
+        self.assertEqual(sorted(sum(self.task.batches[1:], [])), sorted(new))
+        self.assertEqual([len(b) for b in self.task.batches[1:]], [2, 1])
+        # Nothing is ingested twice, unless it changes.
+        self.assertEqual(watcher.poll(), 0)
+        self.write("old.fits", "more")
+        watcher.poll()
+        self.assertEqual(watcher.poll(), 1)
+        self.assertEqual(self.task.batches[-1], [old])
+
+    def testSkipExisting(self):
+        self.write("old.fits")
+        watcher = RawIngestWatcher(self.task, [self.root], useInotify=False, ingestExisting=False)
+        watcher.run(duration=0.0)
+        self.assertEqual(self.task.batches, [])
+
+    def testForgetRemoved(self):
+        old = self.write("old.fits")
+        moved = self.write(os.path.join("sub", "moved.fits"))
+        watcher = RawIngestWatcher(self.task, [self.root], useInotify=False, settleTime=0.0)
+        watcher.run(duration=0.0)
+        self.assertEqual(sorted(watcher._done), sorted([old, moved]))
+        os.remove(old)
+        os.rename(moved, os.path.join(self.root, "elsewhere"))
+        watcher.poll()
+        self.assertEqual(watcher._done, {})
+
+    def testRecentExisting(self):
+        """Test that files too recent to ingest when the watcher starts are
+        ingested once they have settled, even if no notification is ever
+        sent for them.
+        """
+        recent = self.write("recent.fits")
+        watcher = RawIngestWatcher(self.task, [self.root], useInotify=False, settleTime=0.5)
+        watcher.run(duration=0.0)
+        self.assertEqual(self.task.batches, [])
+        self.assertEqual(watcher._settledCandidates(), [])
+        time.sleep(0.6)
+        self.assertEqual(watcher._settledCandidates(), [recent])
+
+    @unittest.skipIf(inotify_simple is None, "inotify_simple is not available.")
+    def testRecentExistingNotified(self):
+        recent = self.write("recent.fits")
+        watcher = RawIngestWatcher(self.task, [self.root], useInotify=True, settleTime=0.5,
+                                   pollInterval=0.2)
+        try:
+            watcher.run(duration=1.5)
+        finally:
+            watcher.close()
+        self.assertEqual(self.task.batches, [[recent]])
+
+
+if __name__ == "__main__":
+    unittest.main()
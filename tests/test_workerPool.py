@@ -0,0 +1,125 @@
+# This file is part of obs_base.
+#
+# Developed for the LSST Data Management System.
+# This product includes software developed by the LSST Project
+# (https://www.lsst.org).
+# See the COPYRIGHT file at the top-level directory of this distribution
+# for details of code ownership.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import multiprocessing.connection
+import os
+import unittest
+import unittest.mock
+
+import lsst.utils.tests
+
+from lsst.obs.base import WorkerPool
+
+
+class _Counter:
+    """Picklable stand-in for a task, recording how often it is unpickled
+    in each process.
+    """
+
+    unpickled = 0
+
+    def __init__(self, offset, padding=b""):
+        self.offset = offset
+        self.padding = padding
+
+    def __reduce__(self):
+        return (_makeCounter, (self.offset, self.padding))
+
+    def add(self, value):
+        return value + self.offset, os.getpid(), _Counter.unpickled
+
+
+def _makeCounter(offset, padding):
+    _Counter.unpickled += 1
+    return _Counter(offset, padding)
+
+
+class WorkerPoolTestCase(lsst.utils.tests.TestCase):
+    """Tests for WorkerPool."""
+
+    def testExecutors(self):
+        counter = _Counter(10)
+        for executor in ("serial", "threads", "processes"):
+            with self.subTest(executor=executor):
+                with WorkerPool(2, executor) as pool:
+                    results = sorted(r[0] for r in pool.imap_unordered(counter.add, range(5)))
+                    self.assertEqual(results, list(range(10, 15)))
+                    self.assertEqual([r[0] for r in pool.imap(counter.add, range(3))], [10, 11, 12])
+
+    def testSerialFallback(self):
+        pool = WorkerPool(1, "processes")
+        self.assertEqual(pool.executor, "serial")
+        self.assertEqual(pool.processes, 1)
+        with self.assertRaises(ValueError):
+            WorkerPool(2, "nonsense")
+
+    def testUnpickledOncePerWorker(self):
+        counter = _Counter(0)
+        with WorkerPool(2, "processes") as pool:
+            results = list(pool.imap_unordered(counter.add, range(20)))
+            # Reusing the pool for another stage must not unpickle the task
+            # again.
+            results.extend(pool.imap_unordered(counter.add, range(20)))
+        for _, _, unpickled in results:
+            self.assertEqual(unpickled, 1)
+        self.assertLessEqual(len({pid for _, pid, _ in results}), 2)
+
+    def testPayloadNotSentPerItem(self):
+        """Test that the pickled task is not sent to workers with each item.
+        """
+        counter = _Counter(0, padding=bytes(1 << 20))
+        sent = []
+        sendBytes = multiprocessing.connection.Connection._send_bytes
+
+        def countBytes(connection, buffer):
+            sent.append(len(buffer))
+            return sendBytes(connection, buffer)
+
+        # Count everything this process writes to the pool's pipes.
+        with unittest.mock.patch.object(multiprocessing.connection.Connection, "_send_bytes",
+                                        new=countBytes):
+            with WorkerPool(2, "processes") as pool:
+                results = sorted(r[0] for r in pool.imap_unordered(counter.add, range(50)))
+                payloadDir = pool._payloadDir
+        self.assertEqual(results, list(range(50)))
+        self.assertGreaterEqual(len(sent), 50)
+        self.assertLess(sum(sent), len(counter.padding))
+        # The pickled task is cleaned up along with the pool.
+        self.assertFalse(os.path.exists(payloadDir))
+
+    def testCloseAfter(self):
+        pool = WorkerPool(2, "threads")
+        self.assertEqual(sorted(pool.closeAfter(range(3))), [0, 1, 2])
+        with self.assertRaises(ValueError):
+            pool.imap(str, range(3))
+
+
+class MemoryTester(lsst.utils.tests.MemoryTestCase):
+    pass
+
+
+def setup_module(module):
+    lsst.utils.tests.init()
+
+
+if __name__ == "__main__":
+    lsst.utils.tests.init()
+    unittest.main()